@@ -1,6 +1,98 @@
+"""
+Django admin.
+
+The time entry, photo and archive lists are built for million-row tables:
+rows render from the entries' name snapshots without joins, the paginator
+never counts the whole table (EstimatedCountPaginator), date filters and
+the review/open filters match indexes, search resolves employee names
+against the small employee table first (descriptions and captions through
+the full-text index, api/search.py), and foreign keys to large tables
+use raw id widgets. Bulk actions on time entries (close, reassign job,
+add/remove a tag) run as UPDATE/INSERT/DELETE statements over chunks of
+ids, like the archiver.
+"""
+from functools import cached_property
+
 from django import forms
-from django.contrib import admin
-from .models import Employee, JobCodeCategory, JobCode, TimeEntry, ActivityTag, TimeEntryPhoto
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.paginator import Paginator
+from django.db import connections, router, transaction
+from django.db.models import Max, Min, Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import (
+    Employee, JobCodeCategory, JobCode, TimeEntry, ActivityTag, TimeEntryPhoto, ArchivedTimeEntry, Device
+)
+from .imaging import register_heif
+from . import search
+from .sweeper import waiting_on_interruption
+
+ACTION_CHUNK_SIZE = 1000
+
+
+def estimated_row_count(model):
+    """
+    The table's row count without scanning it.
+
+    Uses sqlite_stat1 when ANALYZE has been run, otherwise the id range
+    (exact while ids are contiguous; archiving removes the oldest ones).
+    """
+    using = router.db_for_read(model)
+    table = model._meta.db_table
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+        if cursor.fetchone():
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+            row = cursor.fetchone()
+            if row:
+                return int(row[0].split()[0])
+    bounds = model._default_manager.using(using).aggregate(low=Min('pk'), high=Max('pk'))
+    return bounds['high'] - bounds['low'] + 1 if bounds['high'] is not None else 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Admin paginator that never runs COUNT(*) over a whole large table.
+
+    Unfiltered lists use estimated_row_count(); filtered lists are counted
+    exactly up to count_limit rows and stop there (narrow the filter to see
+    more). Use with show_full_result_count = False.
+    """
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            return estimated_row_count(queryset.model)
+        return queryset.order_by()[:self.count_limit].count()
+
+
+def employee_ids_matching(term):
+    """Ids of employees whose first or last name starts with each word of term ("ada lov")."""
+    query = Q()
+    for word in term.split():
+        query &= Q(first_name__istartswith=word) | Q(last_name__istartswith=word)
+    return list(Employee.objects.filter(query).values_list('id', flat=True))
+
+
+def search_matches(term, kind):
+    """Q for objects of `kind` whose full-text document matches term (api/search.py)."""
+    sql = search.matching_ids(term, kind)
+    return Q(id__in=RawSQL(*sql)) if sql else Q(pk__in=[])
+
+
+def id_chunks(queryset, chunk_size=ACTION_CHUNK_SIZE):
+    """The queryset's ids in ascending chunks (keyset, so rows updated on the way are fine)."""
+    last = 0
+    while True:
+        ids = list(queryset.filter(id__gt=last).order_by('id').values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
 
 
 class EmployeeAdminForm(forms.ModelForm):
@@ -60,7 +152,7 @@ class EmployeeAdmin(admin.ModelAdmin):
 
 @admin.register(JobCodeCategory)
 class JobCodeCategoryAdmin(admin.ModelAdmin):
-    list_display = ['name', 'alias', 'is_active']
+    list_display = ['name', 'alias', 'auto_close_hours', 'is_active']
     list_filter = ['is_active']
 
 
@@ -78,17 +170,177 @@ class ActivityTagAdmin(admin.ModelAdmin):
     search_fields = ['name']
 
 
+@admin.register(Device)
+class DeviceAdmin(admin.ModelAdmin):
+    list_display = ['name', 'key', 'is_active', 'created_at']
+    list_filter = ['is_active']
+    readonly_fields = ['key']
+
+
+class OpenEntryFilter(admin.SimpleListFilter):
+    """Open/closed, matching the timeentry_open_idx partial index."""
+    title = 'status'
+    parameter_name = 'status'
+
+    def lookups(self, request, model_admin):
+        return [('open', 'Open'), ('closed', 'Closed')]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'open':
+            return queryset.filter(end_time__isnull=True)
+        if self.value() == 'closed':
+            return queryset.filter(end_time__isnull=False)
+        return queryset
+
+
+class TimeEntryActionForm(ActionForm):
+    """Action bar with the job/tag the bulk actions apply."""
+    job_code = forms.ModelChoiceField(
+        JobCode.objects.filter(is_active=True).select_related('category'), required=False, label='Job'
+    )
+    tag = forms.ModelChoiceField(ActivityTag.objects.filter(is_active=True).select_related('role'), required=False)
+
+
 @admin.register(TimeEntry)
 class TimeEntryAdmin(admin.ModelAdmin):
-    list_display = ['employee', 'job_display_name', 'start_time', 'end_time', 'is_interruption', 'is_paused']
-    list_filter = ['is_interruption', 'is_paused', 'job_category']
+    list_display = ['employee_name', 'job_display_name', 'start_time', 'end_time', 'is_interruption', 'is_paused', 'needs_review']
+    list_filter = [OpenEntryFilter, 'needs_review', ('start_time', admin.DateFieldListFilter), 'job_category']
+    raw_id_fields = ['employee', 'job_category', 'job_code', 'interrupted_entry', 'device']
     search_fields = ['employee__first_name', 'employee__last_name']
-    date_hierarchy = 'start_time'
+    search_help_text = 'Employee first and/or last name (prefixes), or words in the description'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    action_form = TimeEntryActionForm
+    actions = ['close_entries', 'reassign_job', 'add_tag', 'remove_tag']
+
+    def get_search_results(self, request, queryset, search_term):
+        # Match names on the employee table, then use the (employee, start_time) index;
+        # descriptions through the full-text index
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        return queryset.filter(
+            Q(employee_id__in=employee_ids_matching(term)) | search_matches(term, 'time_entry')
+        ), False
+
+    def _picked(self, request, name):
+        """The action form's `name` choice, or None after telling the user to pick one."""
+        try:
+            value = self.action_form.base_fields[name].clean(request.POST.get(name))
+        except forms.ValidationError:
+            value = None
+        if value is None:
+            label = self.action_form.base_fields[name].label or name
+            self.message_user(request, f'Choose a {label.lower()} first.', messages.WARNING)
+        return value
+
+    @admin.action(description='Close selected open entries now')
+    def close_entries(self, request, queryset):
+        # Same rules as the stale-entry sweeper: a closed interruption resumes its
+        # paused parent (as /clock/interrupted-stop/ does), and a paused entry
+        # stays open while its interruption is.
+        now = timezone.now()
+        open_entries = queryset.filter(end_time__isnull=True)
+        closed = 0
+        for ids in id_chunks(open_entries.filter(is_interruption=True)):
+            with transaction.atomic():
+                interruptions = TimeEntry.objects.filter(id__in=ids, end_time__isnull=True)
+                parent_ids = list(
+                    interruptions.exclude(interrupted_entry=None).values_list('interrupted_entry_id', flat=True)
+                )
+                closed += interruptions.update(end_time=now, updated_at=now)
+                TimeEntry.objects.filter(id__in=parent_ids, end_time__isnull=True, is_paused=True).exclude(
+                    waiting_on_interruption()
+                ).update(is_paused=False, updated_at=now)
+        skipped = 0
+        for ids in id_chunks(open_entries):
+            entries = TimeEntry.objects.filter(id__in=ids, end_time__isnull=True)
+            skipped += entries.filter(waiting_on_interruption()).count()
+            closed += entries.exclude(waiting_on_interruption()).update(end_time=now, is_paused=False, updated_at=now)
+        self.message_user(request, f'Closed {closed} entries.')
+        if skipped:
+            self.message_user(
+                request, f'Left {skipped} paused entries open; close their interruptions first.', messages.WARNING
+            )
+
+    @admin.action(description='Reassign selected entries to the chosen job')
+    def reassign_job(self, request, queryset):
+        job_code = self._picked(request, 'job_code')
+        if job_code is None:
+            return
+        now = timezone.now()
+        updated = 0
+        for ids in id_chunks(queryset):
+            # The display snapshot as refresh_snapshot() sets it (update() skips save())
+            updated += TimeEntry.objects.filter(id__in=ids).update(
+                job_code=job_code, job_category_id=job_code.category_id, job_display_name=str(job_code),
+                updated_at=now
+            )
+        self.message_user(request, f'Reassigned {updated} entries to {job_code}.')
+
+    @admin.action(description='Add the chosen tag to selected entries')
+    def add_tag(self, request, queryset):
+        tag = self._picked(request, 'tag')
+        if tag is None:
+            return
+        Through = TimeEntry.activity_tags.through
+        count = 0
+        for ids in id_chunks(queryset):
+            with transaction.atomic():
+                Through.objects.bulk_create(
+                    [Through(timeentry_id=entry_id, activitytag_id=tag.id) for entry_id in ids],
+                    ignore_conflicts=True,
+                )
+            count += len(ids)
+        self.message_user(request, f'Tagged {count} entries with {tag.name}.')
+
+    @admin.action(description='Remove the chosen tag from selected entries')
+    def remove_tag(self, request, queryset):
+        tag = self._picked(request, 'tag')
+        if tag is None:
+            return
+        Through = TimeEntry.activity_tags.through
+        removed = 0
+        for ids in id_chunks(queryset):
+            removed += Through.objects.filter(timeentry_id__in=ids, activitytag_id=tag.id).delete()[0]
+        self.message_user(request, f'Removed {tag.name} from {removed} entries.')
 
 
 @admin.register(TimeEntryPhoto)
 class TimeEntryPhotoAdmin(admin.ModelAdmin):
     list_display = ['id', 'time_entry', 'caption', 'created_at']
-    list_filter = ['created_at']
-    search_fields = ['caption', 'time_entry__employee__first_name']
-    date_hierarchy = 'created_at'
+    list_filter = [('created_at', admin.DateFieldListFilter)]
+    list_select_related = ['time_entry']
+    raw_id_fields = ['time_entry']
+    search_fields = ['caption']
+    search_help_text = 'Time entry id, or words in the caption'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if term.isdigit():
+            return queryset.filter(time_entry_id=int(term)), False
+        if not term:
+            return queryset, False
+        return queryset.filter(search_matches(term, 'time_entry_photo')), False
+
+    def get_form(self, request, obj=None, **kwargs):
+        # Upload validation opens the file with Pillow, which needs the HEIC opener
+        register_heif()
+        return super().get_form(request, obj, **kwargs)
+
+
+@admin.register(ArchivedTimeEntry)
+class ArchivedTimeEntryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'employee_name', 'job_display_name', 'start_time', 'end_time', 'archived_at']
+    list_filter = ['job_category']
+    raw_id_fields = ['employee', 'job_category', 'job_code']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -1,7 +1,4 @@
 from django.apps import AppConfig
-import logging
-
-logger = logging.getLogger(__name__)
 
 
 class ApiConfig(AppConfig):
@@ -9,11 +6,16 @@ class ApiConfig(AppConfig):
     name = 'api'
 
     def ready(self):
-        # Register HEIF/HEIC support with Pillow at startup
-        # This allows ImageField to validate HEIC images
-        try:
-            import pillow_heif
-            pillow_heif.register_heif_opener()
-            logger.info("pillow_heif registered successfully")
-        except ImportError:
-            logger.warning("pillow_heif not available - HEIC support disabled")
+        from django.conf import settings
+        from . import signals  # noqa: F401
+        from . import metrics, slowlog, tracing
+
+        if settings.SLOW_QUERY_MS > 0:
+            slowlog.connect()
+        # Every connection, whichever thread opens it: under ASGI the ORM runs in
+        # sync_to_async threads. Both pass queries straight through unless their
+        # middleware is recording the request.
+        metrics.connect()
+        tracing.connect()
+
+        # HEIF/HEIC support is registered with Pillow on first upload (see imaging.py)
@@ -0,0 +1,98 @@
+"""
+Hot/cold storage for time entries.
+
+Kiosks only touch recent entries, so closed entries older than a horizon are
+moved (with their tag links and photo metadata) from TimeEntry into
+ArchivedTimeEntry in chunked transactions. Archived rows keep their ids.
+
+Reporting code reads through entry_querysets(), which returns the hot and the
+cold queryset with the same filters applied; the field names match, so
+values()/aggregates work on both and the results are merged. The
+/time-entries/ list unions the archive in whenever archived rows match its
+filters (TimeEntryViewSet.list); single entries, edits and ?expand= of
+nested objects only see live entries.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import TimeEntry, TimeEntryPhoto, ArchivedTimeEntry, ArchivedTimeEntryPhoto
+
+ENTRY_FIELDS = [
+    'id', 'employee_id', 'job_category_id', 'job_code_id', 'start_time', 'end_time',
+    'description', 'is_interruption', 'interrupted_entry_id', 'is_paused',
+    'interruption_reason', 'needs_review', 'employee_name', 'job_display_name', 'created_at', 'updated_at',
+]
+PHOTO_FIELDS = ['id', 'time_entry_id', 'image', 'caption', 'created_at']
+
+
+def entry_querysets(*args, **filters):
+    """The hot and cold entry querysets with the same filters applied."""
+    return [
+        TimeEntry.objects.filter(*args, **filters),
+        ArchivedTimeEntry.objects.filter(*args, **filters),
+    ]
+
+
+def archivable(cutoff):
+    """Closed entries that ended before cutoff, not awaiting review, with no open interruption."""
+    open_interruption = TimeEntry.objects.filter(interrupted_entry=OuterRef('pk'), end_time__isnull=True)
+    return TimeEntry.objects.filter(end_time__lt=cutoff, needs_review=False).exclude(Exists(open_interruption))
+
+
+def archive_chunk(ids):
+    """Move the given entries (and their interruptions) to the archive tables."""
+    Through = TimeEntry.activity_tags.through
+    ArchivedThrough = ArchivedTimeEntry.activity_tags.through
+
+    with transaction.atomic():
+        # Interruptions move with their parent so no hot row is left pointing at a cold one
+        ids = set(ids) | set(
+            TimeEntry.objects.filter(interrupted_entry_id__in=ids).values_list('id', flat=True)
+        )
+
+        ArchivedTimeEntry.objects.bulk_create(
+            ArchivedTimeEntry(**row)
+            for row in TimeEntry.objects.filter(id__in=ids).values(*ENTRY_FIELDS)
+        )
+        ArchivedThrough.objects.bulk_create(
+            ArchivedThrough(archivedtimeentry_id=entry_id, activitytag_id=tag_id)
+            for entry_id, tag_id in Through.objects.filter(
+                timeentry_id__in=ids
+            ).values_list('timeentry_id', 'activitytag_id')
+        )
+        ArchivedTimeEntryPhoto.objects.bulk_create(
+            ArchivedTimeEntryPhoto(**row)
+            for row in TimeEntryPhoto.objects.filter(time_entry_id__in=ids).values(*PHOTO_FIELDS)
+        )
+        # Photo rows and tag links cascade; image files stay where they are
+        TimeEntry.objects.filter(id__in=ids).delete()
+
+    return len(ids)
+
+
+def archive_entries(days=None, chunk_size=1000, dry_run=False, progress=None):
+    """
+    Archive closed entries older than `days` (default ARCHIVE_AFTER_DAYS).
+
+    Each chunk is its own transaction, so a long run never holds the write
+    lock for long. Returns the number of entries archived.
+    """
+    days = settings.ARCHIVE_AFTER_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+
+    if dry_run:
+        return archivable(cutoff).count()
+
+    archived = 0
+    while True:
+        ids = list(archivable(cutoff).order_by('id').values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            break
+        archived += archive_chunk(ids)
+        if progress:
+            progress(archived)
+    return archived
@@ -0,0 +1,156 @@
+"""
+Async versions of the polling-heavy read endpoints.
+
+Every kiosk polls the active session / current entry every 30 seconds and
+reloads reference data on start-up. Under an ASGI server these views answer
+from the event loop with the async ORM, so an idle keep-alive connection
+costs a socket instead of a worker thread. Sync DRF views keep serving
+everything else.
+
+Responses are byte-for-byte what the DRF views return: querysets load every
+relation the serializers touch up front, and the existing serializers and
+renderers produce the body.
+
+The views are mounted ahead of the router when ASYNC_READ_VIEWS is on
+(config/asgi.py enables it); under WSGI they would only add overhead.
+"""
+from asgiref.sync import sync_to_async
+from django.db.models import Prefetch, Q
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_safe
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .fieldsets import InvalidSelection, Selection
+from .models import Employee, JobCodeCategory, TimeEntry, ActivityTag
+from . import refdata
+from .refdata import _as_int
+from .renderers import MessagePackRenderer, ORJSONRenderer
+from .serializers import ActivityTagSerializer, JobCodeCategorySerializer, TimeEntryDetailSerializer
+
+# Everything TimeEntryDetailSerializer reads, so serialization never hits the database.
+# Optional relations are prefetched rather than joined: the polls usually find
+# nothing, and an empty result then costs one small query instead of a wide join.
+ENTRY_RELATED = ('employee', 'job_category')
+ENTRY_PREFETCH = (
+    Prefetch('activity_tags', queryset=ActivityTag.objects.select_related('role')),
+    'job_category__job_codes',
+    'job_code',
+    'interrupted_entry',
+    'photos',
+)
+
+
+def _render(request, data, status=200):
+    """Render like the API's default renderers: msgpack when asked for, else JSON."""
+    if MessagePackRenderer.media_type in request.headers.get('Accept', ''):
+        renderer = MessagePackRenderer()
+    else:
+        renderer = ORJSONRenderer()
+    response = HttpResponse(renderer.render(data), status=status, content_type=renderer.media_type)
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+def _selection(request, serializer_class):
+    """Selection.from_request, or the 400 response the DRF views would give."""
+    try:
+        return Selection.from_request(request, serializer_class), None
+    except InvalidSelection as exc:
+        return None, _render(request, exc.detail, status=exc.status_code)
+
+
+async def _device(request):
+    """views.request_device: the kiosk's Device (None without a key), or the 403 response."""
+    key = request.headers.get('X-Device-Key')
+    if not key:
+        return None, None
+    device = await sync_to_async(refdata.get_device)(key)
+    if device is None:
+        return None, _render(request, {'error': 'Unknown device'}, status=403)
+    return device, None
+
+
+async def _first_entry(queryset, selection):
+    if selection is not None:
+        queryset = selection.plan(queryset)
+    else:
+        queryset = queryset.select_related(*ENTRY_RELATED).prefetch_related(*ENTRY_PREFETCH)
+    entry = await queryset.order_by('-start_time').afirst()
+    if not entry:
+        return None
+    return TimeEntryDetailSerializer(entry, context={'selection': selection}).data
+
+
+@require_safe
+async def active_session(request):
+    """Async ActiveSessionView."""
+    selection, error = _selection(request, TimeEntryDetailSerializer)
+    if error:
+        return error
+    device, error = await _device(request)
+    if error:
+        return error
+    session = await _first_entry(
+        TimeEntry.objects.filter(device=device, end_time__isnull=True, is_paused=False), selection
+    )
+    return _render(request, {'active_session': session})
+
+
+@require_safe
+async def current_entry(request, pk):
+    """Async EmployeeViewSet.current_entry."""
+    if not await Employee.objects.filter(pk=pk, is_active=True).aexists():
+        return _render(request, {'detail': 'No Employee matches the given query.'}, status=404)
+
+    selection, error = _selection(request, TimeEntryDetailSerializer)
+    if error:
+        return error
+    entry = await _first_entry(TimeEntry.objects.filter(employee_id=pk, end_time__isnull=True), selection)
+    return _render(request, {'current_entry': entry})
+
+
+@require_safe
+async def job_categories(request):
+    """Async JobCodeCategoryViewSet list, paginated like PageNumberPagination."""
+    selection, error = _selection(request, JobCodeCategorySerializer)
+    if error:
+        return error
+    queryset = JobCodeCategory.objects.filter(is_active=True).prefetch_related('job_codes')
+    if selection is not None:
+        queryset = selection.plan(queryset)
+    page_size = PageNumberPagination.page_size
+
+    page = _as_int(request.GET.get('page', 1))
+    count = await queryset.acount()
+    pages = max(1, -(-count // page_size))
+    if page is None or not 1 <= page <= pages:
+        return _render(request, {'detail': 'Invalid page.'}, status=404)
+
+    offset = (page - 1) * page_size
+    categories = [category async for category in queryset[offset:offset + page_size]]
+
+    url = request.build_absolute_uri()
+    if page == 1:
+        previous = None
+    elif page == 2:
+        previous = remove_query_param(url, 'page')
+    else:
+        previous = replace_query_param(url, 'page', page - 1)
+
+    return _render(request, {
+        'count': count,
+        'next': replace_query_param(url, 'page', page + 1) if page < pages else None,
+        'previous': previous,
+        'results': JobCodeCategorySerializer(categories, many=True, context={'selection': selection}).data,
+    })
+
+
+@require_safe
+async def tags_for_role(request, role_id):
+    """Async ActivityTagViewSet.for_role."""
+    tags = ActivityTag.objects.filter(
+        Q(role__isnull=True) | Q(role_id=_as_int(role_id)), is_active=True
+    ).select_related('role').order_by('name')
+    return _render(request, ActivityTagSerializer([tag async for tag in tags], many=True).data)
@@ -0,0 +1,91 @@
+"""
+Delta feed for offline clients.
+
+    GET /api/v1/changes/?since=<cursor>&limit=500
+
+returns the employees, job codes, activity tags, time entries and photos
+created, updated or deleted after `cursor`, oldest change first:
+
+    {"cursor": 1042, "has_more": false, "changes": [
+        {"model": "time_entry", "id": 7, "deleted": false, "data": {...}},
+        {"model": "time_entry_photo", "id": 3, "deleted": true, "data": null}]}
+
+Start with since=0 (everything), then pass back the returned cursor. While
+has_more is true, ask again straight away.
+
+The change log (models.Change) is written by SQLite triggers (migration
+0009), so bulk_create(), queryset update()/delete(), the sweeper and the
+archiver are all covered without signals. Each object has one row, moved
+to the end of the sequence whenever the object changes. SQLite has a
+single writer, so sequence order is commit order and a cursor never skips
+a change committed later with a lower number.
+
+`data` is the object as the regular endpoints serialize it (time entries as
+in the /time-entries/ list). Objects are read after the change rows, so a
+change may carry newer data than its sequence number; the newer change
+will come again after the cursor, which is harmless.
+"""
+from django.conf import settings
+
+from .entry_rows import time_entry_rows
+from .models import ActivityTag, Change, Employee, JobCode, TimeEntry, TimeEntryPhoto
+from .serializers import (
+    ActivityTagSerializer, EmployeeSerializer, ChangedJobCodeSerializer, TimeEntryPhotoSerializer
+)
+
+
+def _serialize(serializer_class, queryset):
+    def rows(ids, context):
+        objects = queryset.filter(id__in=ids)
+        return serializer_class(objects, many=True, context=context).data
+    return rows
+
+
+def _time_entries(ids, context):
+    return time_entry_rows(TimeEntry.objects.filter(id__in=ids))
+
+
+FEED_MODELS = {
+    'employee': _serialize(EmployeeSerializer, Employee.objects.all()),
+    'job_code': _serialize(ChangedJobCodeSerializer, JobCode.objects.all()),
+    'activity_tag': _serialize(ActivityTagSerializer, ActivityTag.objects.select_related('role')),
+    'time_entry': _time_entries,
+    'time_entry_photo': _serialize(TimeEntryPhotoSerializer, TimeEntryPhoto.objects.all()),
+}
+
+
+def changes_since(since, limit=None, context=None):
+    """The feed page after cursor `since` (see module docstring)."""
+    limit = min(limit or settings.CHANGES_FEED_LIMIT, settings.CHANGES_FEED_MAX_LIMIT)
+    rows = list(
+        Change.objects.filter(id__gt=since).order_by('id').values_list('id', 'model', 'object_id', 'deleted')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    live = {}
+    for _, model, object_id, deleted in rows:
+        if not deleted:
+            live.setdefault(model, []).append(object_id)
+
+    data = {}
+    for model, ids in live.items():
+        for row in FEED_MODELS[model](ids, context or {}):
+            data[model, row['id']] = row
+
+    changes = []
+    for _, model, object_id, _ in rows:
+        # Deleted between the change row and the read: report it as deleted
+        row = data.get((model, object_id))
+        changes.append({
+            'model': model,
+            'id': object_id,
+            'deleted': row is None,
+            'data': row,
+        })
+
+    return {
+        'cursor': rows[-1][0] if rows else since,
+        'has_more': has_more,
+        'changes': changes,
+    }
@@ -0,0 +1,124 @@
+"""
+Read-replica routing for reporting endpoints.
+
+Requests matching REPLICA_READ_PATHS (insights, timesheets, admin list pages)
+read from the replica alias so they do not compete with clock writes on the
+primary. A client that just wrote something is pinned to the primary for
+REPLICA_PIN_SECONDS through a cookie, so it always reads its own writes even
+while the replica lags.
+
+Locally the replica is a SQLite snapshot of the primary, refreshed with
+`manage.py refresh_replica --every 30`.
+"""
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+PIN_COOKIE = 'bt_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_alias():
+    """The replica alias, or None when no replica is configured."""
+    return settings.REPLICA_DB_ALIAS or None
+
+
+def read_alias():
+    """Alias reads are routed to in the current context."""
+    if _use_replica.get() and replica_alias():
+        return replica_alias()
+    return 'default'
+
+
+@contextmanager
+def use_replica():
+    """Route ORM reads inside the block to the replica (if one is configured)."""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and replica_alias():
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary snapshot
+        return db != replica_alias()
+
+
+class ReplicaRoutingMiddleware:
+    """Send read-only reporting requests to the replica, with read-your-writes pinning."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.patterns = [re.compile(p) for p in settings.REPLICA_READ_PATHS]
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replica_alias():
+            return self.get_response(request)
+
+        if self.reads_replica(request):
+            with use_replica():
+                return self.get_response(request)
+
+        response = self.get_response(request)
+        self.pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        if not replica_alias():
+            return await self.get_response(request)
+
+        # The context variable is copied into the thread running sync views
+        if self.reads_replica(request):
+            with use_replica():
+                return await self.get_response(request)
+
+        response = await self.get_response(request)
+        self.pin(request, response)
+        return response
+
+    def reads_replica(self, request):
+        return (
+            request.method in SAFE_METHODS
+            and self.is_reporting(request.path)
+            and not self.is_pinned(request)
+        )
+
+    def pin(self, request, response):
+        """Pin the client to the primary after a successful write."""
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(PIN_COOKIE, str(int(time.time() + pin)), max_age=pin, samesite='Lax')
+
+    def is_reporting(self, path):
+        return any(pattern.match(path) for pattern in self.patterns)
+
+    def is_pinned(self, request):
+        try:
+            return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
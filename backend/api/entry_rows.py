@@ -0,0 +1,182 @@
+"""
+values()-based rows for time entry lists.
+
+TimeEntrySerializer builds each row through a dozen DRF field objects, model
+properties and a nested ActivityTagSerializer per tag. That is fine for one
+entry but dominates a 50-row page. build_rows() produces the same dicts
+(same keys, order and formatting, so the rendered bytes are identical) from
+one values() query (no joins: names come from the entry's snapshot columns)
+plus one query for the tags of the whole page.
+
+Keep this in step with TimeEntrySerializer; EntryRowsTest compares the two.
+"""
+from operator import itemgetter
+
+from django.utils import timezone
+from rest_framework.fields import DateTimeField
+from rest_framework.settings import ISO_8601, api_settings
+
+from .models import ActivityTag, ArchivedTimeEntry, TimeEntry
+
+# Output key -> the values() columns it is built from, in TimeEntrySerializer order
+ROW_COLUMNS = {
+    'id': ('id',),
+    'employee': ('employee_id',),
+    'employee_name': ('employee_name',),
+    'job_category': ('job_category_id',),
+    'job_code': ('job_code_id',),
+    'job_display_name': ('job_display_name',),
+    'start_time': ('start_time',),
+    'end_time': ('end_time',),
+    'duration_seconds': ('start_time', 'end_time'),
+    'is_active': ('end_time', 'is_paused'),
+    'description': ('description',),
+    'activity_tags': ('id',),
+    'is_interruption': ('is_interruption',),
+    'interrupted_entry': ('interrupted_entry_id',),
+    'is_paused': ('is_paused',),
+    'interruption_reason': ('interruption_reason',),
+    'needs_review': ('needs_review',),
+    'created_at': ('created_at',),
+    'updated_at': ('updated_at',),
+}
+
+
+def row_values(queryset, fields=None):
+    """The queryset reduced to the columns build_rows() needs (pageable)."""
+    columns = dict.fromkeys(
+        column for key in (fields or ROW_COLUMNS) for column in ROW_COLUMNS[key]
+    )
+    return queryset.prefetch_related(None).values(*columns)
+
+
+def _datetime_formatter():
+    if (api_settings.DATETIME_FORMAT or '').lower() != ISO_8601:
+        return DateTimeField().to_representation
+
+    tz = timezone.get_current_timezone()
+
+    def to_representation(value):
+        if not value:
+            return None
+        value = value.astimezone(tz).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return to_representation
+
+
+def tags_by_entry(entry_ids, expand=True, archived=False):
+    """
+    {entry_id: [tag dict, ...]} shaped like ActivityTagSerializer, ordered by
+    tag name; with expand=False, {entry_id: [tag id, ...]}. With archived,
+    tags of archived entries are looked up too.
+    """
+    Through = TimeEntry.activity_tags.through
+    links = list(
+        Through.objects.filter(timeentry_id__in=entry_ids)
+        .order_by('activitytag__name', 'activitytag_id')
+        .values_list('timeentry_id', 'activitytag_id')
+    )
+    if archived:
+        # An entry is in one table or the other, so each entry's tags stay in order
+        ArchivedThrough = ArchivedTimeEntry.activity_tags.through
+        links += ArchivedThrough.objects.filter(archivedtimeentry_id__in=entry_ids).order_by(
+            'activitytag__name', 'activitytag_id'
+        ).values_list('archivedtimeentry_id', 'activitytag_id')
+    if not links:
+        return {}
+    if not expand:
+        result = {}
+        for entry_id, tag_id in links:
+            result.setdefault(entry_id, []).append(tag_id)
+        return result
+
+    tags = {
+        row['id']: {
+            'id': row['id'],
+            'name': row['name'],
+            'description': row['description'],
+            'role': row['role_id'],
+            'role_name': row['role__name'],
+            'is_active': row['is_active'],
+            'color': row['color'],
+        }
+        for row in ActivityTag.objects.filter(id__in={tag_id for _, tag_id in links}).values(
+            'id', 'name', 'description', 'role_id', 'role__name', 'is_active', 'color'
+        )
+    }
+
+    result = {}
+    for entry_id, tag_id in links:
+        result.setdefault(entry_id, []).append(tags[tag_id])
+    return result
+
+
+def build_rows(values, fields=None, expand_tags=True, archived=False):
+    """
+    Serialize rows from row_values() exactly as TimeEntrySerializer would.
+
+    `fields` limits the keys, as with ?fields= (row_values() may have
+    selected more columns); expand_tags=False gives activity_tags as ids.
+    archived=True when rows may come from ArchivedTimeEntry too.
+    """
+    values = list(values)
+    keys = fields or ROW_COLUMNS
+    fmt = _datetime_formatter()
+    now = timezone.now()
+    tags = tags_by_entry([row['id'] for row in values], expand_tags, archived) if 'activity_tags' in keys else {}
+
+    if fields is None:
+        # Spelled out: a third faster than going through the getters below
+        return [{
+            'id': row['id'],
+            'employee': row['employee_id'],
+            'employee_name': row['employee_name'],
+            'job_category': row['job_category_id'],
+            'job_code': row['job_code_id'],
+            'job_display_name': row['job_display_name'],
+            'start_time': fmt(row['start_time']),
+            'end_time': fmt(row['end_time']),
+            'duration_seconds': ((row['end_time'] or now) - row['start_time']).total_seconds(),
+            'is_active': row['end_time'] is None and not row['is_paused'],
+            'description': row['description'],
+            'activity_tags': tags.get(row['id'], []),
+            'is_interruption': row['is_interruption'],
+            'interrupted_entry': row['interrupted_entry_id'],
+            'is_paused': row['is_paused'],
+            'interruption_reason': row['interruption_reason'],
+            'needs_review': row['needs_review'],
+            'created_at': fmt(row['created_at']),
+            'updated_at': fmt(row['updated_at']),
+        } for row in values]
+
+    build = {
+        'id': itemgetter('id'),
+        'employee': itemgetter('employee_id'),
+        'employee_name': itemgetter('employee_name'),
+        'job_category': itemgetter('job_category_id'),
+        'job_code': itemgetter('job_code_id'),
+        'job_display_name': itemgetter('job_display_name'),
+        'start_time': lambda row: fmt(row['start_time']),
+        'end_time': lambda row: fmt(row['end_time']),
+        'duration_seconds': lambda row: ((row['end_time'] or now) - row['start_time']).total_seconds(),
+        'is_active': lambda row: row['end_time'] is None and not row['is_paused'],
+        'description': itemgetter('description'),
+        'activity_tags': lambda row: tags.get(row['id'], []),
+        'is_interruption': itemgetter('is_interruption'),
+        'interrupted_entry': itemgetter('interrupted_entry_id'),
+        'is_paused': itemgetter('is_paused'),
+        'interruption_reason': itemgetter('interruption_reason'),
+        'needs_review': itemgetter('needs_review'),
+        'created_at': lambda row: fmt(row['created_at']),
+        'updated_at': lambda row: fmt(row['updated_at']),
+    }
+    columns = [(key, build[key]) for key in keys]
+    return [{key: get(row) for key, get in columns} for row in values]
+
+
+def time_entry_rows(queryset):
+    """Rows for every entry in the queryset."""
+    return build_rows(row_values(queryset))
@@ -0,0 +1,31 @@
+"""
+Photo decoding support, loaded on first use.
+
+Pillow and pillow_heif add tens of megabytes and a noticeable import time to
+every worker, but only photo uploads need them. Nothing imports them at
+startup; upload paths call register_heif() before Pillow opens a file.
+"""
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_heif_supported = None
+
+
+def register_heif():
+    """Register the HEIF/HEIC opener with Pillow (once). Returns whether HEIC is supported."""
+    global _heif_supported
+    if _heif_supported is None:
+        with _lock:
+            if _heif_supported is None:
+                try:
+                    import pillow_heif
+                    pillow_heif.register_heif_opener()
+                    logger.info("pillow_heif registered successfully")
+                    _heif_supported = True
+                except ImportError:
+                    logger.warning("pillow_heif not available - HEIC support disabled")
+                    _heif_supported = False
+    return _heif_supported
@@ -0,0 +1,33 @@
+"""
+Move closed time entries older than a horizon into the archive tables.
+
+Usage:
+    python manage.py archive_entries
+    python manage.py archive_entries --days 180 --chunk-size 5000
+    python manage.py archive_entries --dry-run
+"""
+from django.core.management.base import BaseCommand
+
+from api.archive import archive_entries
+
+
+class Command(BaseCommand):
+    help = 'Archive closed time entries (with tags and photo metadata) older than ARCHIVE_AFTER_DAYS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Archive entries that ended more than N days ago')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Entries per transaction (default: 1000)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count archivable entries')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = archive_entries(days=options.get('days'), dry_run=True)
+            self.stdout.write(f"{count} entries would be archived")
+            return
+
+        count = archive_entries(
+            days=options.get('days'),
+            chunk_size=options['chunk_size'],
+            progress=lambda n: self.stdout.write(f"Archived {n} entries..."),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {count} entries"))
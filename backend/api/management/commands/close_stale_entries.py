@@ -0,0 +1,31 @@
+"""
+Close time entries that were left open too long and flag them for review.
+
+Usage:
+    python manage.py close_stale_entries
+    python manage.py close_stale_entries --dry-run
+    python manage.py close_stale_entries --every 15   # keep running, sweep every 15 minutes
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.sweeper import close_stale_entries
+
+
+class Command(BaseCommand):
+    help = 'Auto-close stale open time entries (per-category thresholds) and flag them for review'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only count stale entries')
+        parser.add_argument('--every', type=int, metavar='MINUTES', help='Repeat the sweep every N minutes')
+
+    def handle(self, *args, **options):
+        while True:
+            count = close_stale_entries(dry_run=options['dry_run'])
+            verb = 'would be closed' if options['dry_run'] else 'closed'
+            self.stdout.write(self.style.SUCCESS(f"{count} stale entries {verb}"))
+
+            if not options.get('every'):
+                break
+            time.sleep(options['every'] * 60)
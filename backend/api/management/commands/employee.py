@@ -6,13 +6,17 @@ Usage:
     python manage.py employee add "First" "Last" --email user@example.com --pin 1234
     python manage.py employee setpin "First Last" 1234
     python manage.py employee delete "First Last"
+    python manage.py employee import staff.csv --workers 4
 """
+from pathlib import Path
+
 from django.core.management.base import BaseCommand, CommandError
 from api.models import Employee
+from api.employee_import import parse, import_employees
 
 
 class Command(BaseCommand):
-    help = 'Manage employees (list, add, setpin, delete)'
+    help = 'Manage employees (list, add, setpin, delete, import)'
 
     def add_arguments(self, parser):
         subparsers = parser.add_subparsers(dest='action', help='Action to perform')
@@ -36,6 +40,13 @@ class Command(BaseCommand):
         delete_parser = subparsers.add_parser('delete', help='Delete an employee')
         delete_parser.add_argument('name', type=str, help='Employee name (first last)')
 
+        # Bulk import
+        import_parser = subparsers.add_parser('import', help='Bulk import employees from CSV or JSON')
+        import_parser.add_argument('file', type=str, help='CSV (first_name,last_name,email,pin,gusto_id,is_active) or JSON file')
+        import_parser.add_argument('--format', choices=['csv', 'json'], help='File format (default: from extension)')
+        import_parser.add_argument('--workers', type=int, help='Threads for PIN hashing (default: CPU count)')
+        import_parser.add_argument('--dry-run', action='store_true', help='Validate only, write nothing')
+
     def handle(self, *args, **options):
         action = options.get('action')
 
@@ -47,8 +58,10 @@ class Command(BaseCommand):
             self.set_pin(options)
         elif action == 'delete':
             self.delete_employee(options)
+        elif action == 'import':
+            self.import_employees(options)
         else:
-            self.stdout.write(self.style.WARNING('Usage: python manage.py employee <list|add|setpin|delete>'))
+            self.stdout.write(self.style.WARNING('Usage: python manage.py employee <list|add|setpin|delete|import>'))
 
     def list_employees(self):
         employees = Employee.objects.all().order_by('first_name', 'last_name')
@@ -120,6 +133,28 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS(f'Deleted employee: {full_name}'))
 
+    def import_employees(self, options):
+        path = Path(options['file'])
+        fmt = options.get('format') or path.suffix.lstrip('.').lower()
+
+        try:
+            rows = parse(path.read_text(encoding='utf-8'), fmt)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read {path}: {e}')
+
+        result = import_employees(rows, workers=options.get('workers'), dry_run=options['dry_run'])
+
+        for error in result['errors']:
+            self.stdout.write(self.style.WARNING(f"Row {error['row']}: {error['error']}"))
+
+        if options['dry_run']:
+            self.stdout.write(f"Dry run: {result['valid']} valid, {len(result['errors'])} rejected")
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result['created']} employees ({len(result['errors'])} rows rejected)"
+        ))
+
     def _find_employee(self, name):
         """Find employee by full name or partial match."""
         parts = name.strip().split()
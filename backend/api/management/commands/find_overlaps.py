@@ -0,0 +1,44 @@
+"""
+Report overlapping time entries.
+
+Usage:
+    python manage.py find_overlaps
+    python manage.py find_overlaps --employee 12 --since 2026-01-01
+"""
+from django.core.management.base import BaseCommand
+
+from api.models import TimeEntry
+from api.overlaps import find_overlaps
+
+
+class Command(BaseCommand):
+    help = 'Find overlapping time entries per employee in a single sweep'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employee', type=int, help='Only check this employee ID')
+        parser.add_argument('--since', type=str, help='Only entries starting on or after YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        queryset = TimeEntry.objects.all()
+        if options.get('employee'):
+            queryset = queryset.filter(employee_id=options['employee'])
+        if options.get('since'):
+            queryset = queryset.filter(start_time__date__gte=options['since'])
+
+        count = 0
+        for overlap in find_overlaps(queryset):
+            count += 1
+            first, second = overlap['entry_ids']
+            duration = (
+                f"{overlap['overlap_seconds'] / 60:.0f} min"
+                if overlap['overlap_seconds'] is not None else 'open-ended'
+            )
+            self.stdout.write(
+                f"Employee {overlap['employee_id']}: entries {first} and {second} overlap "
+                f"from {overlap['overlap_start']:%Y-%m-%d %H:%M} ({duration})"
+            )
+
+        if count:
+            self.stdout.write(self.style.WARNING(f"\n{count} overlapping pairs found"))
+        else:
+            self.stdout.write(self.style.SUCCESS("No overlapping entries"))
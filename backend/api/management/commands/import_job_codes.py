@@ -1,5 +1,21 @@
+"""
+Import job categories and job codes from a CSV export.
+
+The file is streamed once and diffed in memory against the existing rows;
+only new or changed rows are written, with bulk upserts inside a single
+transaction.
+
+Usage:
+    python manage.py import_job_codes codes.csv
+    python manage.py import_job_codes codes.csv --dry-run
+    python manage.py import_job_codes codes.csv --deactivate-missing
+"""
 import csv
+
 from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import refdata
 from api.models import JobCodeCategory, JobCode
 
 
@@ -8,55 +24,158 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('csv_file', type=str, help='Path to the CSV file')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report the changes without writing them')
+        parser.add_argument('--deactivate-missing', action='store_true',
+                            help='Deactivate job codes not present in the file (and reactivate those that are)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows per bulk write (default: 1000)')
+        parser.add_argument('--progress-every', type=int, default=10000,
+                            help='Report progress every N CSV rows (default: 10000, 0 to disable)')
 
     def handle(self, *args, **options):
-        csv_file = options['csv_file']
-
-        categories_created = 0
-        categories_updated = 0
-        job_codes_created = 0
-        job_codes_updated = 0
-
-        with open(csv_file, 'r', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f)
-
-            for row in reader:
-                category_name = row.get('JobcodeLevel_0', '').strip()
-                category_alias = row.get('JobcodeLevel_0_Alias', '').strip()
-                job_code_name = row.get('JobcodeLevel_1', '').strip()
-                job_code_alias = row.get('JobcodeLevel_1_Alias', '').strip()
-
-                if not category_name:
-                    continue
-
-                # Create or update category
-                category, created = JobCodeCategory.objects.update_or_create(
-                    name=category_name,
-                    defaults={'alias': category_alias}
-                )
-
-                if created:
-                    categories_created += 1
-                    self.stdout.write(f"Created category: {category_name}")
-                else:
-                    categories_updated += 1
-
-                # Create or update job code if present
-                if job_code_name:
-                    job_code, created = JobCode.objects.update_or_create(
-                        category=category,
-                        name=job_code_name,
-                        defaults={'alias': job_code_alias}
-                    )
-
-                    if created:
-                        job_codes_created += 1
-                        self.stdout.write(f"  Created job code: {job_code_name}")
-                    else:
-                        job_codes_updated += 1
+        categories, job_codes = self.read_csv(options['csv_file'], options['progress_every'])
+        plan = self.diff(categories, job_codes, options['deactivate_missing'])
+
+        self.report(plan, verbose=options['dry_run'] or options['verbosity'] > 1)
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('\nDry run - no changes written'))
+            return
+
+        with transaction.atomic():
+            self.apply(plan, options['batch_size'], options['deactivate_missing'])
+
+        # Bulk writes bypass model signals
+        refdata.invalidate()
 
         self.stdout.write(self.style.SUCCESS(
             f"\nImport complete:\n"
-            f"  Categories: {categories_created} created, {categories_updated} updated\n"
-            f"  Job codes: {job_codes_created} created, {job_codes_updated} updated"
+            f"  Categories: {len(plan['new_categories'])} created, "
+            f"{len(plan['changed_categories'])} updated, {plan['unchanged_categories']} unchanged\n"
+            f"  Job codes: {len(plan['new_codes'])} created, "
+            f"{len(plan['changed_codes'])} updated, {plan['unchanged_codes']} unchanged, "
+            f"{len(plan['deactivated_codes'])} deactivated"
         ))
+
+    def read_csv(self, csv_file, progress_every):
+        """
+        Stream the CSV into {category: alias} and {(category, code): alias}.
+
+        Later rows win when a name repeats, as they did with update_or_create.
+        """
+        categories = {}
+        job_codes = {}
+
+        with open(csv_file, 'r', encoding='utf-8-sig', newline='') as f:
+            for count, row in enumerate(csv.DictReader(f), start=1):
+                category_name = (row.get('JobcodeLevel_0') or '').strip()
+                job_code_name = (row.get('JobcodeLevel_1') or '').strip()
+
+                if category_name:
+                    categories[category_name] = (row.get('JobcodeLevel_0_Alias') or '').strip()
+                    if job_code_name:
+                        job_codes[(category_name, job_code_name)] = (row.get('JobcodeLevel_1_Alias') or '').strip()
+
+                if progress_every and count % progress_every == 0:
+                    self.stdout.write(f"Read {count} rows...")
+
+        return categories, job_codes
+
+    def diff(self, categories, job_codes, deactivate_missing):
+        """Compare the file against existing rows without writing anything."""
+        existing_categories = {
+            c['name']: c for c in JobCodeCategory.objects.values('id', 'name', 'alias')
+        }
+        existing_codes = {
+            (c['category__name'], c['name']): c
+            for c in JobCode.objects.values('id', 'name', 'alias', 'is_active', 'category__name')
+        }
+
+        plan = {
+            'new_categories': [], 'changed_categories': [], 'unchanged_categories': 0,
+            'new_codes': [], 'changed_codes': [], 'unchanged_codes': 0,
+            'deactivated_codes': [],
+        }
+
+        for name, alias in categories.items():
+            current = existing_categories.get(name)
+            if current is None:
+                plan['new_categories'].append((name, alias))
+            elif current['alias'] != alias:
+                plan['changed_categories'].append((name, current['alias'], alias))
+            else:
+                plan['unchanged_categories'] += 1
+
+        for key, alias in job_codes.items():
+            current = existing_codes.get(key)
+            if current is None:
+                plan['new_codes'].append((key, alias))
+            elif current['alias'] != alias or (deactivate_missing and not current['is_active']):
+                plan['changed_codes'].append((key, current['alias'], alias))
+            else:
+                plan['unchanged_codes'] += 1
+
+        if deactivate_missing:
+            plan['deactivated_codes'] = [
+                key for key, current in existing_codes.items()
+                if key not in job_codes and current['is_active']
+            ]
+
+        return plan
+
+    def report(self, plan, verbose):
+        if not verbose:
+            return
+        for name, alias in plan['new_categories']:
+            self.stdout.write(f"+ category {name!r} (alias {alias!r})")
+        for name, old, new in plan['changed_categories']:
+            self.stdout.write(f"~ category {name!r} alias {old!r} -> {new!r}")
+        for (category, name), alias in plan['new_codes']:
+            self.stdout.write(f"+ job code {category} / {name!r} (alias {alias!r})")
+        for (category, name), old, new in plan['changed_codes']:
+            self.stdout.write(f"~ job code {category} / {name!r} alias {old!r} -> {new!r}")
+        for category, name in plan['deactivated_codes']:
+            self.stdout.write(f"- job code {category} / {name!r} deactivated")
+
+    def apply(self, plan, batch_size, deactivate_missing):
+        category_rows = [
+            JobCodeCategory(name=name, alias=alias) for name, alias in plan['new_categories']
+        ] + [
+            JobCodeCategory(name=name, alias=alias) for name, _, alias in plan['changed_categories']
+        ]
+        if category_rows:
+            JobCodeCategory.objects.bulk_create(
+                category_rows,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['name'],
+                update_fields=['alias'],
+            )
+
+        category_ids = dict(JobCodeCategory.objects.values_list('name', 'id'))
+        code_rows = [
+            JobCode(category_id=category_ids[category], name=name, alias=alias, is_active=True)
+            for (category, name), alias in plan['new_codes']
+        ] + [
+            JobCode(category_id=category_ids[category], name=name, alias=alias, is_active=True)
+            for (category, name), _, alias in plan['changed_codes']
+        ]
+        if code_rows:
+            JobCode.objects.bulk_create(
+                code_rows,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['category', 'name'],
+                update_fields=['alias', 'is_active'] if deactivate_missing else ['alias'],
+            )
+
+        if plan['deactivated_codes']:
+            missing = {}
+            for category, name in plan['deactivated_codes']:
+                missing.setdefault(category_ids[category], []).append(name)
+            for category_id, names in missing.items():
+                for start in range(0, len(names), batch_size):
+                    JobCode.objects.filter(
+                        category_id=category_id, name__in=names[start:start + batch_size]
+                    ).update(is_active=False)
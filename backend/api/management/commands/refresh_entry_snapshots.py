@@ -0,0 +1,33 @@
+"""
+Rewrite the employee_name/job_display_name snapshots on time entries.
+
+Saves of employees and jobs already refresh their entries; run this after
+names were changed some other way (queryset.update(), raw SQL, a restore).
+
+Usage:
+    python manage.py refresh_entry_snapshots
+    python manage.py refresh_entry_snapshots --employee 12 --employee 15
+    python manage.py refresh_entry_snapshots --category 3 --job-code 40
+"""
+from django.core.management.base import BaseCommand
+
+from api.snapshots import refresh_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Refresh the denormalized employee and job names on live and archived time entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employee', type=int, action='append', help='Only entries of this employee (repeatable)')
+        parser.add_argument('--category', type=int, action='append', help='Only entries in this job category (repeatable)')
+        parser.add_argument('--job-code', type=int, action='append', help='Only entries with this job code (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Ids per UPDATE for a full refresh (default: 5000)')
+
+    def handle(self, *args, **options):
+        count = refresh_snapshots(
+            employee_ids=options['employee'],
+            category_ids=options['category'],
+            job_code_ids=options['job_code'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {count} entries"))
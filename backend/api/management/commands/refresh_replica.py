@@ -0,0 +1,56 @@
+"""
+Refresh the local SQLite read replica from the primary database.
+
+The snapshot is written with SQLite's online backup API to a temporary file
+and swapped in atomically, so readers never see a half-written replica.
+
+Usage:
+    REPLICA_DATABASE_PATH=replica.sqlite3 python manage.py refresh_replica
+    REPLICA_DATABASE_PATH=replica.sqlite3 python manage.py refresh_replica --every 30
+"""
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.db_router import replica_alias
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database to the replica snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=int, metavar='SECONDS', help='Keep refreshing every N seconds')
+
+    def handle(self, *args, **options):
+        alias = replica_alias()
+        if not alias:
+            raise CommandError('No replica configured (set REPLICA_DATABASE_PATH)')
+
+        primary = settings.DATABASES['default']
+        replica = settings.DATABASES[alias]
+        if 'sqlite3' not in primary['ENGINE'] or 'sqlite3' not in replica['ENGINE']:
+            raise CommandError('refresh_replica only snapshots SQLite databases')
+
+        while True:
+            started = time.perf_counter()
+            self.snapshot(str(primary['NAME']), str(replica['NAME']))
+            self.stdout.write(self.style.SUCCESS(
+                f"Replica refreshed in {(time.perf_counter() - started) * 1000:.0f} ms"
+            ))
+            if not options.get('every'):
+                break
+            time.sleep(options['every'])
+
+    def snapshot(self, source_path, target_path):
+        tmp_path = f'{target_path}.tmp'
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(tmp_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        os.replace(tmp_path, target_path)
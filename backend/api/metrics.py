@@ -0,0 +1,380 @@
+"""
+Request, SQL and photo-conversion metrics in the Prometheus text format.
+
+MetricsMiddleware records, per view (the URL name, e.g. "timeentry-list"):
+
+- http_requests_total{view, method, status}
+- http_request_duration_seconds{view, method}   (histogram)
+- http_response_size_bytes{view, method}        (histogram, bytes on the wire)
+- http_request_db_queries_total{view, method}
+- http_request_db_seconds_total{view, method}
+
+SQL is timed by an execute wrapper installed on every connection as it
+opens, which adds to the current request's QueryTimer. The timer is held in
+a ContextVar, so queries that async views and the ASGI handler run in
+sync_to_async threads count too. TimeEntryPhoto conversions add
+photo_conversion_seconds.
+
+Every process keeps its own registry and writes a snapshot to METRICS_DIR
+(a file per process, replaced atomically) at most every
+METRICS_FLUSH_SECONDS. GET /metrics sums the snapshots, so a scrape sees
+every gunicorn worker whichever one answers it. Files of processes that
+have exited are folded into retired.json on the next scrape, so counters
+survive worker recycling (and runserver reloads) and the directory does
+not grow.
+"""
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+PHOTO_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    'http_requests_total': ('counter', 'HTTP requests by view, method and status.', None),
+    'http_request_duration_seconds': ('histogram', 'Time to handle a request.', LATENCY_BUCKETS),
+    'http_response_size_bytes': ('histogram', 'Response body size as sent.', SIZE_BUCKETS),
+    'http_request_db_queries_total': ('counter', 'SQL queries run while handling requests.', None),
+    'http_request_db_seconds_total': ('counter', 'Time spent in SQL while handling requests.', None),
+    'photo_conversion_seconds': ('histogram', 'Time to convert an uploaded photo to JPEG.', PHOTO_BUCKETS),
+}
+
+RETIRED_FILE = 'retired.json'
+
+
+class Registry:
+    """
+    This process's samples: {name: {labels: value}}, labels a tuple of pairs.
+
+    Counter values are numbers; histogram values are [per-bucket counts...,
+    +Inf count, sum] (not cumulative, so they merge by adding).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._samples = {}
+        self._dirty = False
+        self._last_flush = 0.0
+
+    def _check_fork(self):
+        # A preloaded master forks workers with its registry; each starts empty
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._samples = {}
+            self._dirty = False
+            self._file = f'{self._pid}-{time.time_ns()}.json'
+            _start_flusher()
+
+    def inc(self, name, amount=1, **labels):
+        key = tuple(labels.items())
+        with self._lock:
+            self._check_fork()
+            samples = self._samples.setdefault(name, {})
+            samples[key] = samples.get(key, 0) + amount
+            self._dirty = True
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        key = tuple(labels.items())
+        with self._lock:
+            self._check_fork()
+            samples = self._samples.setdefault(name, {})
+            histogram = samples.get(key)
+            if histogram is None:
+                histogram = samples[key] = [0] * (len(buckets) + 1) + [0.0]
+            histogram[bisect_left(buckets, value)] += 1
+            histogram[-1] += value
+            self._dirty = True
+
+    def snapshot(self):
+        """Samples in the on-disk form: {name: [[labels, value], ...]}."""
+        with self._lock:
+            self._check_fork()
+            return {
+                name: [[list(map(list, key)), value.copy() if isinstance(value, list) else value]
+                       for key, value in samples.items()]
+                for name, samples in self._samples.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._samples = {}
+            self._dirty = True
+
+    def flush(self, force=False):
+        """Write this process's snapshot if it changed (and the interval has passed)."""
+        now = time.monotonic()
+        if not force and (not self._dirty or now - self._last_flush < settings.METRICS_FLUSH_SECONDS):
+            return
+        data = self.snapshot()
+        with self._lock:
+            self._dirty = False
+            self._last_flush = now
+        _write_json(_metrics_dir() / self._file, data)
+
+
+registry = Registry()
+
+
+def _metrics_dir():
+    path = Path(settings.METRICS_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _write_json(path, data):
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+def _read_json(path, default):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return default
+
+
+def _merge(total, data):
+    for name, samples in data.items():
+        merged = total.setdefault(name, {})
+        for labels, value in samples:
+            key = tuple(map(tuple, labels))
+            if key not in merged:
+                merged[key] = value.copy() if isinstance(value, list) else value
+            elif isinstance(value, list):
+                merged[key] = [a + b for a, b in zip(merged[key], value)]
+            else:
+                merged[key] += value
+    return total
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+@contextmanager
+def _locked(directory):
+    with open(directory / '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def retire_dead_workers(directory):
+    """Fold the snapshots of exited processes into retired.json."""
+    dead = [path for path in directory.glob('*-*.json') if not _alive(int(path.name.split('-')[0]))]
+    if not dead:
+        return
+
+    with _locked(directory):
+        path = directory / RETIRED_FILE
+        retired = _read_json(path, {'files': [], 'samples': {}})
+        # Names of files removed by an earlier call are no longer needed
+        files = [name for name in retired['files'] if (directory / name).exists()]
+        total = _merge({}, retired['samples'])
+        for worker in dead:
+            if worker.name not in files and worker.exists():
+                _merge(total, _read_json(worker, {}))
+                files.append(worker.name)
+
+        _write_json(path, {
+            'files': files,
+            'samples': {
+                name: [[list(map(list, key)), value] for key, value in samples.items()]
+                for name, samples in total.items()
+            },
+        })
+        for worker in dead:
+            worker.unlink(missing_ok=True)
+
+
+def collect():
+    """All processes' samples, summed: {name: {labels: value}}."""
+    registry.flush(force=True)
+    directory = _metrics_dir()
+    retire_dead_workers(directory)
+
+    # Worker files are read before retired.json: a worker folded in between
+    # is then listed as retired and its file data is dropped, never counted twice.
+    workers = {path.name: _read_json(path, {}) for path in directory.glob('*-*.json')}
+    retired = _read_json(directory / RETIRED_FILE, {'files': [], 'samples': {}})
+
+    total = _merge({}, retired['samples'])
+    for name, data in workers.items():
+        if name not in retired['files']:
+            _merge(total, data)
+    return total
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(samples):
+    """The Prometheus text exposition (format 0.0.4) of collect() output."""
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for key, value in sorted(samples.get(name, {}).items()):
+            if kind == 'counter':
+                lines.append(f'{name}{_labels(key)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), value[:-1]):
+                cumulative += count
+                le = bound if bound == '+Inf' else _number(bound)
+                lines.append(f'{name}_bucket{_labels(key + (("le", le),))} {cumulative}')
+            lines.append(f'{name}_sum{_labels(key)} {_number(value[-1])}')
+            lines.append(f'{name}_count{_labels(key)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+_flusher_lock = threading.Lock()
+_flusher_pid = None
+
+
+def _start_flusher():
+    """A daemon thread per process that writes the snapshot while it is changing."""
+    global _flusher_pid
+    with _flusher_lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+
+    def run():
+        while True:
+            time.sleep(settings.METRICS_FLUSH_SECONDS)
+            try:
+                registry.flush()
+            except OSError:
+                pass
+
+    threading.Thread(target=run, name='metrics-flush', daemon=True).start()
+
+
+@atexit.register
+def _flush_at_exit():
+    if registry._pid == os.getpid() and registry._dirty:
+        try:
+            registry.flush(force=True)
+        except Exception:
+            pass
+
+
+class QueryTimer:
+    """Execute wrapper counting and timing the queries run through it."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+_timer = ContextVar('api_query_timer', default=None)
+
+
+def time_query(execute, sql, params, many, context):
+    """Execute wrapper adding the query to the current request's QueryTimer, if any."""
+    timer = _timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install(sender=None, connection=None, **kwargs):
+    """connection_created receiver: time the new connection's queries."""
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+def connect():
+    connection_created.connect(install, dispatch_uid='api.metrics')
+
+
+class MetricsMiddleware:
+    """Record per-view request metrics (outermost, so it sees the full request)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = QueryTimer()
+        token = _timer.set(timer)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _timer.reset(token)
+        self.record(request, response, time.perf_counter() - started, timer)
+        return response
+
+    async def __acall__(self, request):
+        timer = QueryTimer()
+        token = _timer.set(timer)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timer.reset(token)
+        self.record(request, response, time.perf_counter() - started, timer)
+        return response
+
+    def record(self, request, response, elapsed, timer):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        method = request.method
+
+        registry.inc('http_requests_total', view=view, method=method, status=response.status_code)
+        registry.observe('http_request_duration_seconds', elapsed, view=view, method=method)
+        if not response.streaming:
+            registry.observe('http_response_size_bytes', len(response.content), view=view, method=method)
+        if timer.count:
+            registry.inc('http_request_db_queries_total', timer.count, view=view, method=method)
+            registry.inc('http_request_db_seconds_total', timer.seconds, view=view, method=method)
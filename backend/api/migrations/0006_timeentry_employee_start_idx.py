@@ -0,0 +1,17 @@
+# Generated by Django 5.2.10 on 2026-10-19 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_add_time_entry_photo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(fields=['employee', 'start_time'], name='timeentry_employee_start_idx'),
+        ),
+    ]
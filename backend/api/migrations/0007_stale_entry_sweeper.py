@@ -0,0 +1,27 @@
+# Generated by Django 5.2.10 on 2026-10-19 04:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_timeentry_employee_start_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobcodecategory',
+            name='auto_close_hours',
+            field=models.PositiveIntegerField(blank=True, help_text='Close entries left open longer than this (blank = STALE_ENTRY_HOURS setting)', null=True),
+        ),
+        migrations.AddField(
+            model_name='timeentry',
+            name='needs_review',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(condition=models.Q(('end_time__isnull', True)), fields=['start_time'], name='timeentry_open_idx'),
+        ),
+    ]
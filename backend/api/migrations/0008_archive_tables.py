@@ -0,0 +1,61 @@
+# Generated by Django 5.2.10 on 2026-10-19 04:49
+
+import api.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_stale_entry_sweeper'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTimeEntry',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('description', models.TextField(blank=True)),
+                ('is_interruption', models.BooleanField(default=False)),
+                ('interrupted_entry_id', models.BigIntegerField(blank=True, null=True)),
+                ('is_paused', models.BooleanField(default=False)),
+                ('interruption_reason', models.TextField(blank=True)),
+                ('needs_review', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('activity_tags', models.ManyToManyField(blank=True, related_name='archived_time_entries', to='api.activitytag')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_time_entries', to='api.employee')),
+                ('job_category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_time_entries', to='api.jobcodecategory')),
+                ('job_code', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_time_entries', to='api.jobcode')),
+            ],
+            options={
+                'verbose_name_plural': 'Archived Time Entries',
+                'ordering': ['-start_time'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedTimeEntryPhoto',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('image', models.ImageField(upload_to=api.models.time_entry_photo_path)),
+                ('caption', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField()),
+                ('time_entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='photos', to='api.archivedtimeentry')),
+            ],
+            options={
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedtimeentry',
+            index=models.Index(fields=['employee', 'start_time'], name='archivedentry_emp_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedtimeentry',
+            index=models.Index(fields=['start_time'], name='archivedentry_start_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.10 on 2026-10-19 05:17
+
+from django.db import migrations, models
+
+# (feed model name, table, id column) for every table whose writes show up in the feed.
+# Tag links are recorded against their time entry.
+TRACKED = [
+    ('employee', 'api_employee', 'id'),
+    ('job_code', 'api_jobcode', 'id'),
+    ('activity_tag', 'api_activitytag', 'id'),
+    ('time_entry', 'api_timeentry', 'id'),
+    ('time_entry_photo', 'api_timeentryphoto', 'id'),
+    ('time_entry', 'api_timeentry_activity_tags', 'timeentry_id'),
+]
+
+
+def record(model, row, column, deleted):
+    return (
+        f"DELETE FROM api_change WHERE model = '{model}' AND object_id = {row}.{column}; "
+        f"INSERT INTO api_change (model, object_id, deleted) VALUES ('{model}', {row}.{column}, {deleted});"
+    )
+
+
+def triggers():
+    forward, reverse = [], []
+    for model, table, column in TRACKED:
+        for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+            name = f'{table}_change_{event.lower()}'
+            deleted = int(event == 'DELETE' and column == 'id')
+            forward.append(
+                f"CREATE TRIGGER {name} AFTER {event} ON {table} "
+                f"BEGIN {record(model, row, column, deleted)} END"
+            )
+            reverse.append(f"DROP TRIGGER IF EXISTS {name}")
+    return forward, reverse
+
+
+def backfill():
+    # Existing rows start the feed, so a client syncing from 0 gets everything
+    return [
+        f"INSERT INTO api_change (model, object_id, deleted) SELECT '{model}', id, 0 FROM {table} ORDER BY id"
+        for model, table, column in TRACKED if column == 'id'
+    ]
+
+
+TRIGGERS, DROP_TRIGGERS = triggers()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_archive_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+            ],
+            options={
+                'ordering': ['id'],
+                'constraints': [models.UniqueConstraint(fields=('model', 'object_id'), name='change_model_object_uniq')],
+            },
+        ),
+        migrations.RunSQL(backfill(), migrations.RunSQL.noop),
+        migrations.RunSQL(TRIGGERS, DROP_TRIGGERS),
+    ]
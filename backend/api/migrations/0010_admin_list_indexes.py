@@ -0,0 +1,25 @@
+# Generated by Django 5.2.10 on 2026-10-19 05:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(fields=['start_time'], name='timeentry_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(condition=models.Q(('needs_review', True)), fields=['start_time'], name='timeentry_review_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentryphoto',
+            index=models.Index(fields=['created_at'], name='timeentryphoto_created_idx'),
+        ),
+    ]
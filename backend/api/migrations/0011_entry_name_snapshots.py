@@ -0,0 +1,62 @@
+# Generated by Django 5.2.10 on 2026-10-19 05:32
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+# Adding NOT NULL columns makes SQLite rebuild api_timeentry, which drops its
+# change feed triggers (0009); they are (re)created after the backfill, and
+# after the columns are removed again in case that rebuilds the table too
+TIMEENTRY_TRIGGERS = [
+    statement
+    for sql in import_module('api.migrations.0009_change_feed').triggers()[0]
+    if sql.startswith('CREATE TRIGGER api_timeentry_change_')
+    for statement in (f"DROP TRIGGER IF EXISTS {sql.split()[2]}", sql)
+]
+
+
+def backfill(table):
+    # Same values as TimeEntry.refresh_snapshot() / api.snapshots
+    return (
+        f"UPDATE {table} SET "
+        f"employee_name = COALESCE((SELECT e.first_name || ' ' || e.last_name FROM api_employee e "
+        f"WHERE e.id = {table}.employee_id), ''), "
+        f"job_display_name = COALESCE("
+        f"(SELECT c.name || ' - ' || j.name FROM api_jobcode j JOIN api_jobcodecategory c ON c.id = j.category_id "
+        f"WHERE j.id = {table}.job_code_id), "
+        f"(SELECT c.name FROM api_jobcodecategory c WHERE c.id = {table}.job_category_id), '')"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_admin_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(migrations.RunSQL.noop, TIMEENTRY_TRIGGERS),
+        migrations.AddField(
+            model_name='archivedtimeentry',
+            name='employee_name',
+            field=models.CharField(blank=True, editable=False, max_length=201),
+        ),
+        migrations.AddField(
+            model_name='archivedtimeentry',
+            name='job_display_name',
+            field=models.CharField(blank=True, editable=False, max_length=203),
+        ),
+        migrations.AddField(
+            model_name='timeentry',
+            name='employee_name',
+            field=models.CharField(blank=True, editable=False, max_length=201),
+        ),
+        migrations.AddField(
+            model_name='timeentry',
+            name='job_display_name',
+            field=models.CharField(blank=True, editable=False, max_length=203),
+        ),
+        migrations.RunSQL(backfill('api_timeentry'), migrations.RunSQL.noop),
+        migrations.RunSQL(backfill('api_archivedtimeentry'), migrations.RunSQL.noop),
+        migrations.RunSQL(TIMEENTRY_TRIGGERS, migrations.RunSQL.noop),
+    ]
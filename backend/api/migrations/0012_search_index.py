@@ -0,0 +1,87 @@
+# Generated by Django 5.2.10 on 2026-10-19 06:05
+
+from django.db import migrations
+
+# (kind, document number, table, title SQL, body SQL, columns whose change re-indexes the row).
+# A document's rowid is <id> * 8 + <number>, so triggers replace it by rowid
+# and search results carry their kind and object id (see api/search.py).
+SOURCES = [
+    ('employee', 1, 'api_employee', "src.first_name || ' ' || src.last_name", "''",
+     ('first_name', 'last_name')),
+    ('job_category', 2, 'api_jobcodecategory', "src.name || ' ' || src.alias", "''",
+     ('name', 'alias')),
+    ('job_code', 3, 'api_jobcode',
+     "(SELECT c.name FROM api_jobcodecategory c WHERE c.id = src.category_id) || ' ' || src.name || ' ' || src.alias",
+     "''", ('name', 'alias', 'category_id')),
+    ('time_entry', 4, 'api_timeentry', "''", "trim(src.description || ' ' || src.interruption_reason)",
+     ('description', 'interruption_reason')),
+    ('time_entry_photo', 5, 'api_timeentryphoto', "''", 'src.caption', ('caption',)),
+]
+
+CREATE_TABLE = (
+    "CREATE VIRTUAL TABLE api_search USING fts5("
+    "title, body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+
+def index(number, table, title, body, where):
+    return (
+        f"INSERT INTO api_search (rowid, title, body) "
+        f"SELECT src.id * 8 + {number}, {title}, {body} FROM {table} src "
+        f"WHERE {where} AND trim({title} || {body}) != ''"
+    )
+
+
+def unindex(number, row):
+    return f"DELETE FROM api_search WHERE rowid = {row}.id * 8 + {number}"
+
+
+def triggers():
+    forward, reverse = [], []
+    for kind, number, table, title, body, columns in SOURCES:
+        changed = ' OR '.join(f'OLD.{column} IS NOT NEW.{column}' for column in columns)
+        statements = {
+            'insert': ('', [index(number, table, title, body, 'src.id = NEW.id')]),
+            'update': (f'WHEN {changed} ', [
+                unindex(number, 'OLD'), index(number, table, title, body, 'src.id = NEW.id'),
+            ]),
+            'delete': ('', [unindex(number, 'OLD')]),
+        }
+        for event, (when, body_sql) in statements.items():
+            name = f'api_search_{table}_{event}'
+            forward.append(
+                f"CREATE TRIGGER {name} AFTER {event.upper()} ON {table} {when}"
+                f"BEGIN {'; '.join(body_sql)}; END"
+            )
+            reverse.append(f"DROP TRIGGER IF EXISTS {name}")
+
+    # Job code documents include their category's name
+    _, number, table, title, body, _ = SOURCES[2]
+    forward.append(
+        "CREATE TRIGGER api_search_api_jobcodecategory_rename AFTER UPDATE ON api_jobcodecategory "
+        "WHEN OLD.name IS NOT NEW.name BEGIN "
+        f"DELETE FROM api_search WHERE rowid IN (SELECT id * 8 + {number} FROM api_jobcode WHERE category_id = NEW.id); "
+        f"{index(number, table, title, body, 'src.category_id = NEW.id')}; END"
+    )
+    reverse.append("DROP TRIGGER IF EXISTS api_search_api_jobcodecategory_rename")
+    return forward, reverse
+
+
+def backfill():
+    return [index(number, table, title, body, '1') for _, number, table, title, body, _ in SOURCES]
+
+
+TRIGGERS, DROP_TRIGGERS = triggers()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_entry_name_snapshots'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TABLE, "DROP TABLE api_search"),
+        migrations.RunSQL(backfill(), migrations.RunSQL.noop),
+        migrations.RunSQL(TRIGGERS, DROP_TRIGGERS),
+    ]
@@ -1,6 +1,10 @@
+import secrets
+
 from django.db import models
 from django.core.exceptions import ValidationError
 
+from . import tracing
+
 
 class Employee(models.Model):
     """Employee synced from Gusto payroll system."""
@@ -45,6 +49,11 @@ class JobCodeCategory(models.Model):
     name = models.CharField(max_length=100, unique=True)
     alias = models.CharField(max_length=20, blank=True)
     is_active = models.BooleanField(default=True)
+    auto_close_hours = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Close entries left open longer than this (blank = STALE_ENTRY_HOURS setting)"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -100,6 +109,28 @@ class ActivityTag(models.Model):
         return f"{self.name} (global)"
 
 
+def new_device_key():
+    return secrets.token_urlsafe(24)
+
+
+class Device(models.Model):
+    """
+    A kiosk running role-based sessions. It identifies itself with its key in
+    the X-Device-Key header, and its current session is looked up among its
+    own open entries only.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    key = models.CharField(max_length=64, unique=True, default=new_device_key, editable=False)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
 class TimeEntry(models.Model):
     """Individual clock-in/clock-out records."""
     employee = models.ForeignKey(
@@ -146,16 +177,75 @@ class TimeEntry(models.Model):
     is_paused = models.BooleanField(default=False)
     interruption_reason = models.TextField(blank=True)
 
+    # Set when an entry was closed automatically (e.g. a forgotten clock-out)
+    needs_review = models.BooleanField(default=False)
+
+    # Kiosk the session was started on (null for clock entries and unregistered kiosks)
+    device = models.ForeignKey(
+        Device,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='time_entries'
+    )
+
+    # Display snapshots, so entries render without joins. Set on save when the
+    # employee or job changes; renames are applied by api.snapshots.
+    employee_name = models.CharField(max_length=201, blank=True, editable=False)
+    job_display_name = models.CharField(max_length=203, blank=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-start_time']
         verbose_name_plural = 'Time Entries'
+        indexes = [
+            models.Index(fields=['employee', 'start_time'], name='timeentry_employee_start_idx'),
+            models.Index(
+                fields=['start_time'],
+                condition=models.Q(end_time__isnull=True),
+                name='timeentry_open_idx',
+            ),
+            # A kiosk's current session
+            models.Index(
+                fields=['device', 'start_time'],
+                condition=models.Q(end_time__isnull=True),
+                name='timeentry_device_open_idx',
+            ),
+            # Admin list: newest first, by date, and the review queue
+            models.Index(fields=['start_time'], name='timeentry_start_idx'),
+            models.Index(
+                fields=['start_time'],
+                condition=models.Q(needs_review=True),
+                name='timeentry_review_idx',
+            ),
+        ]
 
     def __str__(self):
-        job = self.job_code or self.job_category
-        return f"{self.employee} - {job} ({self.start_time.strftime('%Y-%m-%d %H:%M')})"
+        return f"{self.employee_name} - {self.job_display_name} ({self.start_time.strftime('%Y-%m-%d %H:%M')})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_source = instance._snapshot_key()
+        instance._interval_source = instance._interval_key()
+        return instance
+
+    def _snapshot_key(self):
+        # From __dict__ so deferred fields are not loaded
+        return tuple(self.__dict__.get(name) for name in ('employee_id', 'job_category_id', 'job_code_id'))
+
+    def _interval_key(self):
+        return tuple(self.__dict__.get(name) for name in ('employee_id', 'start_time', 'end_time'))
+
+    def refresh_snapshot(self):
+        """Copy the employee's name and the job's display name onto the entry."""
+        self.employee_name = self.employee.full_name
+        if self.job_code:
+            self.job_display_name = str(self.job_code)
+        else:
+            self.job_display_name = self.job_category.name if self.job_category else ''
 
     def clean(self):
         # Must have either job_category or job_code
@@ -171,24 +261,35 @@ class TimeEntry(models.Model):
         if self.job_code and not self.job_category:
             self.job_category = self.job_code.category
 
+        # Must not overlap the employee's other entries; only checked when the
+        # interval moves, so rows that already overlap can still be edited
+        interval_changed = self._interval_key() != getattr(self, '_interval_source', None)
+        if self.employee_id and self.start_time and interval_changed:
+            from .overlaps import find_conflict
+            conflict = find_conflict(
+                self.employee_id, self.start_time, self.end_time,
+                exclude_id=self.pk, interrupted_entry_id=self.interrupted_entry_id
+            )
+            if conflict:
+                raise ValidationError(f"Overlaps existing entry {conflict.pk} for this employee")
+
     def save(self, *args, **kwargs):
         # Auto-set job_category from job_code
         if self.job_code and not self.job_category:
             self.job_category = self.job_code.category
+        if self._snapshot_key() != getattr(self, '_snapshot_source', None):
+            self.refresh_snapshot()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'employee_name', 'job_display_name'}
         super().save(*args, **kwargs)
+        self._snapshot_source = self._snapshot_key()
+        self._interval_source = self._interval_key()
 
     @property
     def is_active(self):
         """Entry is active if it has no end_time and is not paused."""
         return self.end_time is None and not self.is_paused
 
-    @property
-    def job_display_name(self):
-        """Returns the display name for the job."""
-        if self.job_code:
-            return str(self.job_code)
-        return str(self.job_category)
-
     @property
     def duration_seconds(self):
         """Calculate duration in seconds."""
@@ -220,6 +321,9 @@ class TimeEntryPhoto(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='timeentryphoto_created_idx'),
+        ]
 
     def __str__(self):
         return f"Photo for {self.time_entry} ({self.created_at})"
@@ -231,17 +335,23 @@ class TimeEntryPhoto(models.Model):
             self._convert_image_to_jpeg()
         super().save(*args, **kwargs)
 
+    @tracing.traced('photo.convert')
     def _convert_image_to_jpeg(self):
         """Convert the uploaded image to JPEG format."""
         from io import BytesIO
         from django.core.files.uploadedfile import InMemoryUploadedFile
         from PIL import Image
         import logging
+        import time
+        from . import metrics
+        from .imaging import register_heif
 
         logger = logging.getLogger(__name__)
 
-        # Note: pillow_heif is registered at app startup in apps.py
+        register_heif()
 
+        started = time.perf_counter()
+        outcome = 'converted'
         try:
             # Read the image
             self.image.seek(0)
@@ -275,4 +385,104 @@ class TimeEntryPhoto(models.Model):
             logger.info(f"Converted image to JPEG: {new_name}")
         except Exception as e:
             # Log the error but keep the original image
+            outcome = 'failed'
             logger.warning(f"Image conversion failed, keeping original: {e}")
+        finally:
+            metrics.registry.observe('photo_conversion_seconds', time.perf_counter() - started, outcome=outcome)
+
+
+class ArchivedTimeEntry(models.Model):
+    """Closed time entry moved out of the hot table by the archive_entries command."""
+    # Keeps the original TimeEntry id
+    id = models.BigIntegerField(primary_key=True)
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='archived_time_entries'
+    )
+    job_category = models.ForeignKey(
+        JobCodeCategory,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_time_entries'
+    )
+    job_code = models.ForeignKey(
+        JobCode,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_time_entries'
+    )
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    description = models.TextField(blank=True)
+    activity_tags = models.ManyToManyField(
+        ActivityTag,
+        blank=True,
+        related_name='archived_time_entries'
+    )
+    is_interruption = models.BooleanField(default=False)
+    # Plain id: the interrupted entry may still be in the hot table
+    interrupted_entry_id = models.BigIntegerField(null=True, blank=True)
+    is_paused = models.BooleanField(default=False)
+    interruption_reason = models.TextField(blank=True)
+    needs_review = models.BooleanField(default=False)
+    employee_name = models.CharField(max_length=201, blank=True, editable=False)
+    job_display_name = models.CharField(max_length=203, blank=True, editable=False)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-start_time']
+        verbose_name_plural = 'Archived Time Entries'
+        indexes = [
+            models.Index(fields=['employee', 'start_time'], name='archivedentry_emp_start_idx'),
+            models.Index(fields=['start_time'], name='archivedentry_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_name} - {self.job_display_name} ({self.start_time.strftime('%Y-%m-%d %H:%M')}, archived)"
+
+    @property
+    def duration_seconds(self):
+        return (self.end_time - self.start_time).total_seconds()
+
+
+class ArchivedTimeEntryPhoto(models.Model):
+    """Photo metadata for an archived entry; the image file itself is not moved."""
+    id = models.BigIntegerField(primary_key=True)
+    time_entry = models.ForeignKey(
+        ArchivedTimeEntry,
+        on_delete=models.CASCADE,
+        related_name='photos'
+    )
+    image = models.ImageField(upload_to=time_entry_photo_path)
+    caption = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['created_at']
+
+
+class Change(models.Model):
+    """
+    Change log for the /changes/ delta feed, written by database triggers.
+
+    One row per object: each insert/update/delete replaces the object's row
+    with a new one, so `id` (AUTOINCREMENT, never reused) is the sequence a
+    client's cursor points into.
+    """
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'object_id'], name='change_model_object_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.id}: {self.model} {self.object_id}{' (deleted)' if self.deleted else ''}"
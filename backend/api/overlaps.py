@@ -0,0 +1,96 @@
+"""
+Overlap detection for time entries.
+
+An employee should never have two entries covering the same time, with one
+exception: an interruption overlaps the paused entry it interrupted by
+design, so parent/interruption pairs are never reported.
+
+find_overlaps() streams entries ordered by (employee, start_time) and finds
+every overlapping pair in a single sweep, O(n log n + overlaps).
+find_conflict() is the write-time check: with the (employee, start_time)
+index it needs a range probe and a few predecessor lookups, never a scan of
+the employee's history.
+"""
+import heapq
+from datetime import datetime, timezone as dt_timezone
+
+from .models import TimeEntry
+
+# Open entries are treated as running forever
+OPEN_END = datetime.max.replace(tzinfo=dt_timezone.utc)
+
+
+def _related(a_id, a_parent, b_id, b_parent):
+    return a_parent == b_id or b_parent == a_id
+
+
+def find_overlaps(queryset=None, chunk_size=2000):
+    """
+    Yield overlapping pairs as dicts, ordered by employee then start time.
+
+    Each dict has employee_id, entry_ids, overlap_start, overlap_end (None
+    when both entries are still open) and overlap_seconds.
+    """
+    if queryset is None:
+        queryset = TimeEntry.objects.all()
+    rows = queryset.order_by('employee_id', 'start_time', 'id').values_list(
+        'id', 'employee_id', 'start_time', 'end_time', 'interrupted_entry_id'
+    ).iterator(chunk_size=chunk_size)
+
+    current_employee = None
+    active = []  # min-heap of (end, id, start, parent) still running at the sweep position
+
+    for entry_id, employee_id, start, end, parent in rows:
+        if employee_id != current_employee:
+            current_employee = employee_id
+            active = []
+
+        end = end or OPEN_END
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+
+        for other_end, other_id, other_start, other_parent in active:
+            if _related(entry_id, parent, other_id, other_parent):
+                continue
+            overlap_end = min(end, other_end)
+            yield {
+                'employee_id': employee_id,
+                'entry_ids': [other_id, entry_id],
+                'overlap_start': start,
+                'overlap_end': None if overlap_end is OPEN_END else overlap_end,
+                'overlap_seconds': None if overlap_end is OPEN_END else (overlap_end - start).total_seconds(),
+            }
+
+        heapq.heappush(active, (end, entry_id, start, parent))
+
+
+def find_conflict(employee_id, start, end, exclude_id=None, interrupted_entry_id=None):
+    """
+    Return an existing entry that [start, end) would overlap, or None.
+
+    Any unrelated entry starting inside the new range overlaps it. Of the
+    entries starting before it, regular entries are disjoint from each other
+    and so are interruptions, so only the latest of each kind can reach into
+    the new range.
+    """
+    entries = TimeEntry.objects.filter(employee_id=employee_id)
+    if exclude_id:
+        entries = entries.exclude(id=exclude_id).exclude(interrupted_entry_id=exclude_id)
+    if interrupted_entry_id:
+        entries = entries.exclude(id=interrupted_entry_id)
+
+    inside = entries.filter(start_time__gte=start)
+    if end:
+        inside = inside.filter(start_time__lt=end)
+    conflict = inside.order_by('start_time').first()
+    if conflict:
+        return conflict
+
+    for is_interruption in (False, True):
+        previous = entries.filter(
+            start_time__lt=start, is_interruption=is_interruption
+        ).order_by('-start_time').first()
+        if previous and (previous.end_time is None or previous.end_time > start):
+            return previous
+
+    return None
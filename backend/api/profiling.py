@@ -0,0 +1,193 @@
+"""
+On-demand profiling of single requests.
+
+Add ?profile=1 to any request sent with `Authorization: Bearer
+<ADMIN_API_KEY>`. The request runs under cProfile with its SQL recorded,
+and the response comes back as usual plus an X-Profile-Id header. The
+report is kept in PROFILE_DIR (the newest PROFILE_KEEP) and served by:
+
+    GET /api/v1/admin/profiles/               recent reports (summary)
+    GET /api/v1/admin/profiles/<id>/          the report
+    GET /api/v1/admin/profiles/<id>/raw/      the .prof file (snakeviz, pstats)
+
+A report has the wall/CPU split of the request (CPU is this thread's time,
+the rest is waiting on SQLite, storage or the GIL), its queries grouped by
+fingerprint with the view line that ran them, and the top functions by
+cumulative and own time.
+
+Requests without the key, or without ?profile=1, are not affected. Async
+views (ASGI) are not profiled: cProfile follows a thread, not a coroutine.
+"""
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from . import slowlog
+
+PROFILE_ID = re.compile(r'^[0-9]{8}T[0-9]{12}-[0-9a-f]{8}$')
+
+
+def authorized(request):
+    """?profile=1 with the admin key as a Bearer token."""
+    if request.GET.get('profile') != '1':
+        return False
+    admin_key = os.environ.get('ADMIN_API_KEY')
+    auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+    if not admin_key or not auth_header.startswith('Bearer '):
+        return False
+    return hmac.compare_digest(auth_header[7:], admin_key)
+
+
+class QueryRecorder:
+    """Execute wrapper keeping each query's statement, time and call site."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            stack = slowlog.call_stack()
+            site = next((frame for frame in stack if '/views.py:' in frame), stack[0] if stack else None)
+            self.queries.append((slowlog.normalize(sql), elapsed, site))
+
+    def summary(self):
+        groups = {}
+        for statement, elapsed, site in self.queries:
+            group = groups.setdefault(slowlog.fingerprint(statement), {
+                'statement': statement, 'count': 0, 'total_ms': 0.0, 'sites': [],
+            })
+            group['count'] += 1
+            group['total_ms'] += elapsed
+            if site not in group['sites']:
+                group['sites'].append(site)
+        statements = sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True)
+        for group in statements:
+            group['total_ms'] = round(group['total_ms'], 3)
+        return {
+            'count': len(self.queries),
+            'total_ms': round(sum(elapsed for _, elapsed, _ in self.queries), 3),
+            'statements': statements,
+        }
+
+
+def _stats_text(profile, sort, limit):
+    out = io.StringIO()
+    stats = pstats.Stats(profile, stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+def _profile_dir():
+    path = Path(settings.PROFILE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def save_report(report, profile):
+    directory = _profile_dir()
+    profile.dump_stats(directory / f"{report['id']}.prof")
+    (directory / f"{report['id']}.json").write_text(json.dumps(report))
+
+    # Ids sort by time; keep the newest PROFILE_KEEP
+    for old in sorted(directory.glob('*.json'))[:-settings.PROFILE_KEEP]:
+        old.unlink(missing_ok=True)
+        old.with_suffix('.prof').unlink(missing_ok=True)
+
+
+def list_reports():
+    """Summaries of the stored reports, newest first."""
+    reports = []
+    for path in sorted(_profile_dir().glob('*.json'), reverse=True):
+        try:
+            report = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        reports.append({key: report[key] for key in ('id', 'at', 'method', 'path', 'view', 'status', 'wall_ms', 'cpu_ms')}
+                       | {'queries': report['sql']['count']})
+    return reports
+
+
+def report_path(profile_id, suffix='.json'):
+    """Path of a stored report, or None (ids are checked, so never outside PROFILE_DIR)."""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = _profile_dir() / f'{profile_id}{suffix}'
+    return path if path.exists() else None
+
+
+class ProfilerMiddleware:
+    """Profile requests that ask for it (see module docstring)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not authorized(request):
+            return self.get_response(request)
+        return self.profile(request)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if authorized(request):
+            response['X-Profile-Skipped'] = 'async request'
+        return response
+
+    def profile(self, request):
+        recorder = QueryRecorder()
+        profile = cProfile.Profile()
+        wrappers = [connections[alias].execute_wrapper(recorder) for alias in connections]
+        for wrapper in wrappers:
+            wrapper.__enter__()
+        started, cpu_started = time.perf_counter(), time.thread_time()
+        try:
+            profile.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profile.disable()
+        finally:
+            wall, cpu = time.perf_counter() - started, time.thread_time() - cpu_started
+            for wrapper in reversed(wrappers):
+                wrapper.__exit__(None, None, None)
+
+        now = datetime.now(timezone.utc)
+        match = getattr(request, 'resolver_match', None)
+        report = {
+            'id': f'{now:%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}',
+            'at': now.isoformat(timespec='milliseconds'),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'wall_ms': round(wall * 1000, 3),
+            'cpu_ms': round(cpu * 1000, 3),
+            'wait_ms': round(max(wall - cpu, 0) * 1000, 3),
+            'sql': recorder.summary(),
+            'cumulative': _stats_text(profile, 'cumulative', settings.PROFILE_TOP_FUNCTIONS),
+            'tottime': _stats_text(profile, 'tottime', settings.PROFILE_TOP_FUNCTIONS),
+        }
+        save_report(report, profile)
+        response['X-Profile-Id'] = report['id']
+        return response
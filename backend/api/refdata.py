@@ -0,0 +1,138 @@
+"""
+In-process cache of reference data: active employees, the category/job code
+hierarchy, activity tags by role and kiosk devices.
+
+This data changes maybe weekly but is looked up on every clock request. Each
+worker keeps a snapshot in memory and compares it against a version stamp in
+the shared cache; model signals replace the stamp whenever reference data
+changes, so every gunicorn worker rebuilds on its next lookup.
+"""
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+VERSION_KEY = 'refdata:version'
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+class Snapshot:
+    """Immutable view of reference data at one version."""
+
+    def __init__(self, version):
+        from .models import Employee, JobCodeCategory, JobCode, ActivityTag, Device
+
+        self.version = version
+        self.employees = {e.id: e for e in Employee.objects.filter(is_active=True)}
+        self.categories = {
+            c.id: c for c in JobCodeCategory.objects.filter(is_active=True).prefetch_related('job_codes')
+        }
+        self.job_codes = {}
+        for code in JobCode.objects.filter(is_active=True).select_related('category'):
+            # Share category instances so a code's category carries its prefetched job codes
+            if code.category_id in self.categories:
+                code.category = self.categories[code.category_id]
+            self.job_codes[code.id] = code
+
+        self.tags = {}
+        self.global_tags = []
+        self.role_tags = {}
+        for tag in ActivityTag.objects.filter(is_active=True).select_related('role'):
+            self.tags[tag.id] = tag
+            if tag.role_id is None:
+                self.global_tags.append(tag)
+            else:
+                self.role_tags.setdefault(tag.role_id, []).append(tag)
+
+        self.devices = {d.key: d for d in Device.objects.filter(is_active=True)}
+
+    def tags_for_role(self, role_id):
+        """Global tags plus tags specific to the role, ordered by name."""
+        tags = self.global_tags + self.role_tags.get(role_id, [])
+        return sorted(tags, key=lambda tag: tag.name)
+
+
+def _shared():
+    return caches[settings.REFDATA_VERSION_CACHE]
+
+
+def current_version():
+    version = _shared().get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        _shared().add(VERSION_KEY, version, None)
+        version = _shared().get(VERSION_KEY)
+    return version
+
+
+def snapshot():
+    """Return the current snapshot, rebuilding it if another worker changed the data."""
+    global _snapshot
+    version = current_version()
+    current = _snapshot
+    if current is not None and current.version == version:
+        return current
+
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = Snapshot(version)
+        return _snapshot
+
+
+def _bump():
+    global _snapshot
+    _shared().set(VERSION_KEY, uuid.uuid4().hex, None)
+    _snapshot = None
+
+
+def invalidate():
+    """
+    Mark reference data as changed.
+
+    The stamp is replaced immediately (so this process never serves stale
+    data) and again after commit, so a worker that rebuilt mid-transaction
+    does not keep pre-commit rows.
+    """
+    _bump()
+    transaction.on_commit(_bump)
+
+
+def get_employee(employee_id):
+    """Active employee by id, or None."""
+    return snapshot().employees.get(_as_int(employee_id))
+
+
+def get_category(category_id):
+    """Active job category by id, or None."""
+    return snapshot().categories.get(_as_int(category_id))
+
+
+def get_job_code(job_code_id):
+    """Active job code by id (with its category loaded), or None."""
+    return snapshot().job_codes.get(_as_int(job_code_id))
+
+
+def get_tags(tag_ids):
+    """Active tags among the given ids; unknown or inactive ids are skipped."""
+    tags = snapshot().tags
+    return [tags[i] for i in map(_as_int, tag_ids) if i in tags]
+
+
+def tags_for_role(role_id):
+    return snapshot().tags_for_role(_as_int(role_id))
+
+
+def get_device(key):
+    """Active device by key, or None."""
+    return snapshot().devices.get(key)
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,103 @@
+"""
+Renderers and parsers for the API.
+
+ORJSONRenderer/ORJSONParser are drop-in replacements for DRF's JSON pair,
+several times faster on large pages. Types orjson does not know fall back
+to DRF's encoder, and the bytes match DRF's for what the API returns, with
+two exceptions for floats: exponents are written the shortest way (1e16
+and 1e-7 where DRF writes 1e+16 and 1e-07, the same values), and NaN and
+infinities are written as null where DRF refuses to render them. The API's
+floats are durations and scores, which are always finite. Pretty printed
+output (?format=api, `; indent=`) still goes through DRF.
+
+MessagePackRenderer/MessagePackParser are selected with
+`Accept: application/msgpack` / `Content-Type: application/msgpack`.
+Values are the same as in the JSON body (datetimes are ISO strings), only
+the encoding differs.
+
+Rendering and parsing (including DRF's multipart parser, used for photo
+uploads) show up as spans in request traces (api/tracing.py).
+"""
+import msgpack
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser, MultiPartParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import tracing
+
+_encoder = JSONEncoder()
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# DRF escapes these so the output is also valid JavaScript
+_LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+def _default(obj):
+    return _encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    @tracing.traced('render application/json')
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+        if b'\xe2\x80' in ret:
+            for raw, escaped in _LINE_SEPARATORS:
+                ret = ret.replace(raw, escaped)
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    @tracing.traced('parse application/json')
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        try:
+            content = stream.read() if stream is not None else b''
+            if encoding.lower().replace('-', '') != 'utf8':
+                content = content.decode(encoding)
+            return orjson.loads(content)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    @tracing.traced('render application/msgpack')
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True, datetime=False)
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    @tracing.traced('parse application/msgpack')
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read() if stream is not None else b'', raw=False)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
+
+
+class TracedMultiPartParser(MultiPartParser):
+    @tracing.traced('parse multipart/form-data')
+    def parse(self, stream, media_type=None, parser_context=None):
+        return super().parse(stream, media_type, parser_context)
@@ -0,0 +1,206 @@
+"""
+Full-text search over names and free text.
+
+    GET /api/v1/search/?q=walk in freezer&type=time_entry,time_entry_photo&limit=20
+
+    {"query": "walk in freezer", "results": [
+        {"type": "time_entry", "id": 7, "label": "Ada Lovelace - Kitchen - Prep",
+         "snippet": "checked the [walk]-[in] [freezer] temps", "score": 8.31,
+         "employee": 1, "start_time": "2026-10-19T08:00:00Z"}]}
+
+`api_search` is an SQLite FTS5 table holding one document per employee
+(full name), job category and job code (category name, name, alias) in its
+`title` column, and per time entry (description and interruption reason)
+and photo (caption) in its `body` column. Triggers (migration 0012) keep it
+in step with every write, including bulk and raw SQL ones, and drop entries
+when they are archived. A migration that makes SQLite rebuild one of those
+tables (adding a NOT NULL column, for example) drops its triggers and must
+recreate them, as 0011 does for the change feed.
+
+A document's rowid is the object id * 8 plus its kind's number, so results
+need no join to know what they point at. Query words are matched whole
+except the last, which is matched as a prefix (two and three letter
+prefixes are indexed). Results are ordered by bm25, names weighing ten
+times as much as free text.
+
+Ranking every match of a common word takes hundreds of milliseconds on
+millions of entries, so names are ranked in full (there are few) but free
+text only among its SEARCH_CANDIDATES newest matches, which FTS5 reads off
+the end of the index. Snippets are cut from the stored text in Python:
+FTS5's snippet() would run the query again for each result.
+"""
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.fields import DateTimeField
+
+from . import db_router
+from .models import Employee, JobCode, JobCodeCategory, TimeEntry, TimeEntryPhoto
+
+KINDS = {
+    'employee': 1,
+    'job_category': 2,
+    'job_code': 3,
+    'time_entry': 4,
+    'time_entry_photo': 5,
+}
+KIND_NAMES = {number: kind for kind, number in KINDS.items()}
+# Which column each kind's documents use
+NAME_KINDS = ('employee', 'job_category', 'job_code')
+TEXT_KINDS = ('time_entry', 'time_entry_photo')
+
+MAX_TERMS = 8
+SCORE = 'bm25(api_search, 10.0, 1.0)'
+_WORD = re.compile(r'\w+')
+
+
+def fold(word):
+    """Lowercase without diacritics, as the index's tokenizer sees it."""
+    if word.isascii():
+        return word.lower()
+    return ''.join(c for c in unicodedata.normalize('NFKD', word.casefold()) if not unicodedata.combining(c))
+
+
+def match_expression(text):
+    """The FTS5 query for user text, or None if it has no words."""
+    words = _WORD.findall(text)[:MAX_TERMS]
+    if not words:
+        return None
+    # Quoted, so FTS5 operators and column filters in the input are plain words
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+
+def snippet(text, query, words=None):
+    """
+    About `words` words of text around the first match, matched words in
+    [brackets], cut ends marked with an ellipsis.
+    """
+    words = words or settings.SEARCH_SNIPPET_WORDS
+    tokens = list(_WORD.finditer(text))
+    if not tokens:
+        return text
+    terms = [fold(word) for word in _WORD.findall(query)[:MAX_TERMS]]
+    whole, prefix = set(terms[:-1]), terms[-1] if terms else None
+
+    hits = [
+        i for i, token in enumerate(tokens)
+        if (folded := fold(token.group())) in whole or (prefix and folded.startswith(prefix))
+    ]
+    start = max(0, min((hits[0] if hits else 0) - words // 3, len(tokens) - words))
+    end = min(len(tokens), start + words)
+
+    out = ['…' if start else '']
+    cursor = tokens[start].start()
+    for i in hits:
+        if start <= i < end:
+            token = tokens[i]
+            out += [text[cursor:token.start()], '[', token.group(), ']']
+            cursor = token.end()
+    if end < len(tokens):
+        out += [text[cursor:tokens[end - 1].end()], '…']
+    else:
+        out.append(text[cursor:])
+    return ''.join(out)
+
+
+def _labels(kind, ids):
+    """{id: extra result fields} for found objects (missing ones were deleted meanwhile)."""
+    if kind == 'employee':
+        rows = Employee.objects.filter(id__in=ids).values_list('id', 'first_name', 'last_name')
+        return {id_: {'label': f'{first} {last}'} for id_, first, last in rows}
+    if kind == 'job_category':
+        rows = JobCodeCategory.objects.filter(id__in=ids).values_list('id', 'name')
+        return {id_: {'label': name} for id_, name in rows}
+    if kind == 'job_code':
+        rows = JobCode.objects.filter(id__in=ids).values_list('id', 'category__name', 'name')
+        return {id_: {'label': f'{category} - {name}'} for id_, category, name in rows}
+    if kind == 'time_entry':
+        rows = TimeEntry.objects.filter(id__in=ids).values_list(
+            'id', 'employee_name', 'job_display_name', 'employee_id', 'start_time'
+        )
+        datetime = DateTimeField().to_representation
+        return {
+            id_: {'label': f'{employee} - {job}', 'employee': employee_id, 'start_time': datetime(start)}
+            for id_, employee, job, employee_id, start in rows
+        }
+    rows = TimeEntryPhoto.objects.filter(id__in=ids).values_list('id', 'caption', 'time_entry_id')
+    return {id_: {'label': caption, 'time_entry': entry_id} for id_, caption, entry_id in rows}
+
+
+def _kind_filter(kinds):
+    return f"rowid %% 8 IN ({', '.join(str(KINDS[kind]) for kind in kinds)})"
+
+
+def search(text, kinds=None, limit=None):
+    """
+    Best matches for `text`, optionally only of the given kinds, as result
+    dicts (see module docstring).
+    """
+    query = match_expression(text)
+    if query is None:
+        return []
+    limit = min(limit or settings.SEARCH_LIMIT, settings.SEARCH_MAX_LIMIT)
+    kinds = kinds or list(KINDS)
+    names = [kind for kind in NAME_KINDS if kind in kinds]
+    texts = [kind for kind in TEXT_KINDS if kind in kinds]
+
+    scored = []
+    with connections[db_router.read_alias()].cursor() as cursor:
+        if names:
+            cursor.execute(
+                f"SELECT rowid, -{SCORE} FROM api_search WHERE api_search MATCH %s AND {_kind_filter(names)} "
+                f"ORDER BY {SCORE} LIMIT %s",
+                ['{title} : (' + query + ')', limit],
+            )
+            scored += cursor.fetchall()
+        if texts:
+            cursor.execute(
+                f"SELECT rowid, -{SCORE} FROM api_search WHERE api_search MATCH %s AND {_kind_filter(texts)} "
+                f"ORDER BY rowid DESC LIMIT %s",
+                ['{body} : (' + query + ')', settings.SEARCH_CANDIDATES],
+            )
+            scored += cursor.fetchall()
+        scored = sorted(scored, key=lambda row: row[1], reverse=True)[:limit]
+        if not scored:
+            return []
+        cursor.execute(
+            f"SELECT rowid, title || body FROM api_search WHERE rowid IN ({', '.join(['%s'] * len(scored))})",
+            [rowid for rowid, _ in scored],
+        )
+        documents = dict(cursor.fetchall())
+
+    found = {}
+    for rowid, _ in scored:
+        found.setdefault(KIND_NAMES[rowid % 8], []).append(rowid // 8)
+    extra = {kind: _labels(kind, ids) for kind, ids in found.items()}
+
+    results = []
+    for rowid, score in scored:
+        kind, object_id = KIND_NAMES[rowid % 8], rowid // 8
+        fields = extra[kind].get(object_id)
+        if fields is None:
+            continue
+        results.append({
+            'type': kind,
+            'id': object_id,
+            **fields,
+            'snippet': snippet(documents.get(rowid, ''), text),
+            'score': round(score, 2),
+        })
+    return results
+
+
+def matching_ids(text, kind):
+    """
+    SQL (and params) selecting the ids of `kind` objects matching `text`,
+    for `id__in=RawSQL(...)` filters; None if the text has no words.
+    """
+    query = match_expression(text)
+    if query is None:
+        return None
+    return (
+        "SELECT rowid / 8 FROM api_search WHERE api_search MATCH %s AND rowid %% 8 = %s",
+        (query, KINDS[kind]),
+    )
@@ -1,5 +1,9 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
 from .models import Employee, JobCodeCategory, JobCode, TimeEntry, ActivityTag, TimeEntryPhoto
+from .fieldsets import FieldQuery, SelectableFieldsMixin
+from .imaging import register_heif
+from .overlaps import find_conflict
 
 
 class EmployeeSerializer(serializers.ModelSerializer):
@@ -17,13 +21,34 @@ class JobCodeSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'alias', 'is_active']
 
 
-class JobCodeCategorySerializer(serializers.ModelSerializer):
+class ChangedJobCodeSerializer(JobCodeSerializer):
+    """Job code with its category id, for the /changes/ feed."""
+
+    class Meta(JobCodeSerializer.Meta):
+        fields = JobCodeSerializer.Meta.fields + ['category']
+
+
+class JobCodeCategorySerializer(SelectableFieldsMixin, serializers.ModelSerializer):
     job_codes = JobCodeSerializer(many=True, read_only=True)
 
     class Meta:
         model = JobCodeCategory
         fields = ['id', 'name', 'alias', 'is_active', 'job_codes']
 
+    expandable_fields = {
+        'job_codes': (JobCodeSerializer, {'many': True}),
+    }
+    field_queries = {
+        'id': FieldQuery(only=('id',)),
+        'name': FieldQuery(only=('name',)),
+        'alias': FieldQuery(only=('alias',)),
+        'is_active': FieldQuery(only=('is_active',)),
+        'job_codes': FieldQuery(prefetch=(Prefetch('job_codes', queryset=JobCode.objects.only('id', 'category')),)),
+    }
+    expanded_queries = {
+        'job_codes': FieldQuery(prefetch=('job_codes',)),
+    }
+
 
 class ActivityTagSerializer(serializers.ModelSerializer):
     role_name = serializers.CharField(source='role.name', read_only=True, allow_null=True)
@@ -33,9 +58,7 @@ class ActivityTagSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'role', 'role_name', 'is_active', 'color']
 
 
-class TimeEntrySerializer(serializers.ModelSerializer):
-    employee_name = serializers.CharField(source='employee.full_name', read_only=True)
-    job_display_name = serializers.CharField(read_only=True)
+class TimeEntrySerializer(SelectableFieldsMixin, serializers.ModelSerializer):
     duration_seconds = serializers.FloatField(read_only=True)
     is_active = serializers.BooleanField(read_only=True)
     activity_tags = ActivityTagSerializer(many=True, read_only=True)
@@ -56,9 +79,81 @@ class TimeEntrySerializer(serializers.ModelSerializer):
             'description',
             'activity_tags', 'activity_tag_ids',
             'is_interruption', 'interrupted_entry', 'is_paused', 'interruption_reason',
+            'needs_review',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = ['employee_name', 'job_display_name', 'created_at', 'updated_at']
+
+    expandable_fields = {
+        'employee': (EmployeeSerializer, {}),
+        'job_category': (JobCodeCategorySerializer, {}),
+        'job_code': (JobCodeSerializer, {}),
+        'activity_tags': (ActivityTagSerializer, {'many': True}),
+    }
+    field_queries = {
+        'id': FieldQuery(only=('id',)),
+        'employee': FieldQuery(only=('employee',)),
+        'employee_name': FieldQuery(only=('employee_name',)),
+        'job_category': FieldQuery(only=('job_category',)),
+        'job_code': FieldQuery(only=('job_code',)),
+        'job_display_name': FieldQuery(only=('job_display_name',)),
+        'start_time': FieldQuery(only=('start_time',)),
+        'end_time': FieldQuery(only=('end_time',)),
+        'duration_seconds': FieldQuery(only=('start_time', 'end_time')),
+        'is_active': FieldQuery(only=('end_time', 'is_paused')),
+        'description': FieldQuery(only=('description',)),
+        'activity_tags': FieldQuery(
+            prefetch=(Prefetch('activity_tags', queryset=ActivityTag.objects.only('id')),)
+        ),
+        'is_interruption': FieldQuery(only=('is_interruption',)),
+        'interrupted_entry': FieldQuery(only=('interrupted_entry',)),
+        'is_paused': FieldQuery(only=('is_paused',)),
+        'interruption_reason': FieldQuery(only=('interruption_reason',)),
+        'needs_review': FieldQuery(only=('needs_review',)),
+        'created_at': FieldQuery(only=('created_at',)),
+        'updated_at': FieldQuery(only=('updated_at',)),
+    }
+    expanded_queries = {
+        'employee': FieldQuery(only=('employee',), select=('employee',), whole=('employee',)),
+        'job_category': FieldQuery(
+            only=('job_category',), select=('job_category',), prefetch=('job_category__job_codes',),
+            whole=('job_category',),
+        ),
+        'job_code': FieldQuery(only=('job_code',), select=('job_code',), whole=('job_code',)),
+        'activity_tags': FieldQuery(
+            prefetch=(Prefetch('activity_tags', queryset=ActivityTag.objects.select_related('role')),)
+        ),
+    }
+
+    def validate(self, data):
+        # Reject edits that would overlap the employee's other entries. Only
+        # checked when the interval moves, so rows that already overlap can
+        # still be edited otherwise.
+        instance = self.instance
+
+        def value(field):
+            if field in data:
+                return data[field]
+            return getattr(instance, field, None)
+
+        interval_changed = instance is None or any(
+            field in data and data[field] != getattr(instance, field)
+            for field in ('employee', 'start_time', 'end_time')
+        )
+        employee = value('employee')
+        start_time = value('start_time')
+        if employee and start_time and interval_changed:
+            interrupted_entry = value('interrupted_entry')
+            conflict = find_conflict(
+                employee.pk, start_time, value('end_time'),
+                exclude_id=instance.pk if instance else None,
+                interrupted_entry_id=interrupted_entry.pk if interrupted_entry else None,
+            )
+            if conflict:
+                raise serializers.ValidationError(
+                    f"Overlaps existing entry {conflict.pk} for this employee"
+                )
+        return data
 
 
 class TimeEntryDetailSerializer(TimeEntrySerializer):
@@ -74,6 +169,17 @@ class TimeEntryDetailSerializer(TimeEntrySerializer):
             'job_category_detail', 'job_code_detail', 'paused_entry', 'photos'
         ]
 
+    field_queries = {
+        **TimeEntrySerializer.field_queries,
+        'job_category_detail': TimeEntrySerializer.expanded_queries['job_category'],
+        'job_code_detail': TimeEntrySerializer.expanded_queries['job_code'],
+        'paused_entry': FieldQuery(
+            only=('interrupted_entry', 'interrupted_entry__start_time', 'interrupted_entry__job_display_name'),
+            select=('interrupted_entry',),
+        ),
+        'photos': FieldQuery(prefetch=('photos',)),
+    }
+
     def get_photos(self, obj):
         photos = obj.photos.all()
         request = self.context.get('request')
@@ -106,9 +212,9 @@ class ClockStartSerializer(serializers.Serializer):
 
 class SessionStartSerializer(serializers.Serializer):
     """Serializer for role-based session start (new API)."""
+    employee_id = serializers.IntegerField()
     role_id = serializers.IntegerField(help_text="JobCodeCategory ID")
     job_code_id = serializers.IntegerField(required=False, help_text="Optional specific job code (e.g., WRP property)")
-    performer_name = serializers.CharField(max_length=100, required=False, allow_blank=True)
     activity_tag_ids = serializers.ListField(
         child=serializers.IntegerField(),
         required=False,
@@ -118,14 +224,14 @@ class SessionStartSerializer(serializers.Serializer):
 
 class SessionStopSerializer(serializers.Serializer):
     """Serializer for stopping a session."""
-    session_id = serializers.IntegerField(required=False, help_text="If not provided, stops the most recent active session")
+    session_id = serializers.IntegerField(required=False, help_text="If not provided, stops the device's most recent active session")
 
 
 class SessionSwitchSerializer(serializers.Serializer):
     """Serializer for switching between roles (ends current, starts new)."""
+    employee_id = serializers.IntegerField()
     role_id = serializers.IntegerField(help_text="New role to switch to")
     job_code_id = serializers.IntegerField(required=False)
-    performer_name = serializers.CharField(max_length=100, required=False, allow_blank=True)
 
 
 class SessionTagUpdateSerializer(serializers.Serializer):
@@ -175,17 +281,23 @@ class SetPinSerializer(serializers.Serializer):
         return value
 
 
+class PhotoImageField(serializers.ImageField):
+    """ImageField that can validate HEIC uploads."""
+
+    def to_internal_value(self, data):
+        register_heif()
+        return super().to_internal_value(data)
+
+
 class TimeEntryPhotoSerializer(serializers.ModelSerializer):
     """Serializer for time entry photos."""
+    image = PhotoImageField(write_only=True)
     image_url = serializers.SerializerMethodField()
 
     class Meta:
         model = TimeEntryPhoto
         fields = ['id', 'time_entry', 'image', 'image_url', 'caption', 'created_at']
         read_only_fields = ['created_at']
-        extra_kwargs = {
-            'image': {'write_only': True}
-        }
 
     def get_image_url(self, obj):
         if obj.image:
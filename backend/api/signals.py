@@ -0,0 +1,36 @@
+"""Model signal receivers that keep in-process caches and entry name snapshots coherent."""
+from django.db.models.signals import post_save, post_delete
+
+from . import refdata, snapshots
+from .models import Employee, JobCodeCategory, JobCode, ActivityTag, Device
+
+REFERENCE_MODELS = (Employee, JobCodeCategory, JobCode, ActivityTag, Device)
+
+
+def reference_data_changed(sender, **kwargs):
+    refdata.invalidate()
+
+
+# Connected per sender so bulk deletes of other models can skip signal dispatch
+for model in REFERENCE_MODELS:
+    post_save.connect(reference_data_changed, sender=model)
+    post_delete.connect(reference_data_changed, sender=model)
+
+
+# Fields each model contributes to TimeEntry's employee_name/job_display_name
+SNAPSHOT_SOURCES = {
+    Employee: ('employee_ids', {'first_name', 'last_name'}),
+    JobCodeCategory: ('category_ids', {'name'}),
+    JobCode: ('job_code_ids', {'name', 'category'}),
+}
+
+
+def refresh_entry_snapshots(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    scope, fields = SNAPSHOT_SOURCES[sender]
+    if created or raw or (update_fields is not None and not fields & set(update_fields)):
+        return
+    snapshots.refresh_snapshots(**{scope: [instance.pk]})
+
+
+for model in SNAPSHOT_SOURCES:
+    post_save.connect(refresh_entry_snapshots, sender=model)
@@ -0,0 +1,216 @@
+"""
+Slow-query log with call-site attribution.
+
+Every database connection gets an execute wrapper (installed when the
+connection opens, so management commands and the sweeper are covered too).
+Statements slower than SLOW_QUERY_MS are appended as JSON lines to
+SLOW_QUERY_LOG, a rotating log every worker writes to:
+
+    {"at": "...", "ms": 412.7, "alias": "default", "fingerprint": "3f0c9a1be2d4",
+     "statement": "SELECT ... WHERE \"api_timeentry\".\"employee_id\" = ? ...",
+     "params": "(int, bool)", "site": "api/views.py:288 in post",
+     "stack": ["api/models.py:204 in save", "api/views.py:288 in post"]}
+
+Parameter values are never logged, only their types. `statement` is the
+SQL with literals and placeholders replaced by ? and IN lists collapsed, so
+the same ORM call always has the same fingerprint. `site` is the views.py
+frame that led to the query (the innermost project frame outside a
+request); `stack` lists the project frames from the query up to the view.
+
+GET /api/v1/admin/slow-queries/ (admin key) aggregates the log by
+fingerprint (summarize()).
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('api.slow_queries')
+logger.propagate = False
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE = re.compile(r'\s+')
+
+# Frames from these files are the logger itself, not the caller
+_OWN_FILES = (__file__, *(os.path.join(os.path.dirname(__file__), name) for name in ('metrics.py', 'profiling.py', 'tracing.py')))
+
+
+def normalize(sql):
+    """The statement with literals/placeholders as ? and IN lists collapsed."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _IN_LIST.sub('(...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint(statement):
+    return hashlib.sha1(statement.encode()).hexdigest()[:12]
+
+
+def params_shape(params, many=False):
+    """Parameter types without values, e.g. "(int, str)" or "executemany 40 x (int, int)"."""
+    if many:
+        params = list(params or ())
+        first = params_shape(params[0]) if params else '()'
+        return f'executemany {len(params)} x {first}'
+    if params is None:
+        return '()'
+    if isinstance(params, dict):
+        return '{' + ', '.join(f'{key}: {type(value).__name__}' for key, value in params.items()) + '}'
+    types = [type(value).__name__ for value in params]
+    if len(types) > 5 and len(set(types)) == 1:
+        return f'({types[0]} x {len(types)})'
+    return '(' + ', '.join(types) + ')'
+
+
+def call_stack(limit=8):
+    """Project frames calling into the database, innermost first, as "path:line in func"."""
+    base = str(settings.BASE_DIR) + os.sep
+    frames = []
+    frame = sys._getframe(1)
+    while frame is not None and len(frames) < limit:
+        filename = frame.f_code.co_filename
+        if filename.startswith(base) and filename not in _OWN_FILES and os.sep + 'site-packages' + os.sep not in filename:
+            frames.append(f'{filename[len(base):]}:{frame.f_lineno} in {frame.f_code.co_name}')
+            if filename.endswith(os.sep + 'views.py'):
+                break
+        frame = frame.f_back
+    return frames
+
+
+class SharedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler that several processes can append to.
+
+    Writes and rollovers happen under an flock, and a process whose file was
+    rotated by another one reopens the new file before writing.
+    """
+
+    def emit(self, record):
+        Path(self.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+        with open(self.baseFilename + '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if self.stream is not None:
+                try:
+                    rotated = os.stat(self.baseFilename).st_ino != os.fstat(self.stream.fileno()).st_ino
+                except FileNotFoundError:
+                    rotated = True
+                if rotated:
+                    self.stream.close()
+                    self.stream = None
+            super().emit(record)
+
+
+_handler_lock = threading.Lock()
+
+
+def _log(entry):
+    if not logger.handlers:
+        with _handler_lock:
+            if not logger.handlers:
+                handler = SharedRotatingFileHandler(
+                    settings.SLOW_QUERY_LOG,
+                    maxBytes=settings.SLOW_QUERY_LOG_BYTES,
+                    backupCount=settings.SLOW_QUERY_LOG_BACKUPS,
+                    delay=True,
+                )
+                logger.addHandler(handler)
+                logger.setLevel(logging.INFO)
+    logger.info(json.dumps(entry))
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        threshold = settings.SLOW_QUERY_MS
+        if 0 < threshold <= elapsed:
+            statement = normalize(sql)
+            stack = call_stack()
+            site = next((frame for frame in stack if '/views.py:' in frame), stack[0] if stack else None)
+            _log({
+                'at': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+                'ms': round(elapsed, 2),
+                'alias': context['connection'].alias,
+                'fingerprint': fingerprint(statement),
+                'statement': statement,
+                'params': params_shape(params, many),
+                'site': site,
+                'stack': stack,
+            })
+
+
+def install(sender=None, connection=None, **kwargs):
+    """connection_created receiver: wrap the new connection's queries."""
+    if slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_wrapper)
+
+
+def connect():
+    connection_created.connect(install, dispatch_uid='api.slowlog')
+
+
+def read_entries():
+    """Logged entries, oldest file first."""
+    base = settings.SLOW_QUERY_LOG
+    paths = [f'{base}.{n}' for n in range(settings.SLOW_QUERY_LOG_BACKUPS, 0, -1)] + [base]
+    for path in paths:
+        try:
+            with open(path) as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            continue
+
+
+def summarize(entries=None, limit=50):
+    """Entries aggregated by fingerprint, largest total time first."""
+    groups = {}
+    for entry in entries if entries is not None else read_entries():
+        group = groups.get(entry['fingerprint'])
+        if group is None:
+            group = groups[entry['fingerprint']] = {
+                'fingerprint': entry['fingerprint'],
+                'statement': entry['statement'],
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'last_seen': None,
+                'params': Counter(),
+                'sites': Counter(),
+            }
+        group['count'] += 1
+        group['total_ms'] += entry['ms']
+        group['max_ms'] = max(group['max_ms'], entry['ms'])
+        group['last_seen'] = max(group['last_seen'] or entry['at'], entry['at'])
+        group['params'][entry['params']] += 1
+        group['sites'][entry['site']] += 1
+
+    summary = sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True)[:limit]
+    for group in summary:
+        group['total_ms'] = round(group['total_ms'], 2)
+        group['mean_ms'] = round(group['total_ms'] / group['count'], 2)
+        group['params'] = [shape for shape, _ in group['params'].most_common(3)]
+        group['sites'] = [{'site': site, 'count': count} for site, count in group['sites'].most_common(5)]
+    return summary
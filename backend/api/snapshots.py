@@ -0,0 +1,77 @@
+"""
+Display snapshots on time entries.
+
+TimeEntry and ArchivedTimeEntry carry `employee_name` and
+`job_display_name`, so lists, the changes feed and the admin render an
+entry from its own row. An entry's save() fills them in when its employee or
+job changes. refresh_snapshots() rewrites them after renames.
+
+Employee, JobCode and JobCodeCategory saves refresh their own entries (see
+signals.py). The refresh_entry_snapshots command refreshes everything, for
+example after names were changed with queryset.update() or raw SQL.
+
+Refreshes are UPDATE statements that only touch rows whose snapshot differs,
+so an unchanged name costs one index scan and writes nothing.
+"""
+from django.db.models import OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Concat
+
+from .models import ArchivedTimeEntry, Employee, JobCode, JobCodeCategory, TimeEntry
+
+ENTRY_MODELS = (TimeEntry, ArchivedTimeEntry)
+
+
+def employee_name():
+    """The entry's employee's full name, as an expression."""
+    return Subquery(
+        Employee.objects.filter(pk=OuterRef('employee_id'))
+        .annotate(name=Concat('first_name', Value(' '), 'last_name'))
+        .values('name')[:1]
+    )
+
+
+def job_display_name():
+    """The entry's job display name (as TimeEntry.refresh_snapshot() sets it), as an expression."""
+    code = (
+        JobCode.objects.filter(pk=OuterRef('job_code_id'))
+        .annotate(name_=Concat('category__name', Value(' - '), 'name'))
+        .values('name_')[:1]
+    )
+    category = JobCodeCategory.objects.filter(pk=OuterRef('job_category_id')).values('name')[:1]
+    return Coalesce(Subquery(code), Subquery(category), Value(''))
+
+
+def _refresh(queryset):
+    names = {'employee_name': employee_name(), 'job_display_name': job_display_name()}
+    stale = Q(_negated=True, **names)
+    return queryset.filter(stale).update(**names)
+
+
+def refresh_snapshots(employee_ids=None, category_ids=None, job_code_ids=None, chunk_size=5000):
+    """
+    Rewrite stale snapshots, live and archived; returns the number of rows updated.
+
+    With ids, only entries of those employees/categories/job codes are looked
+    at (through their foreign key indexes). Without, every entry is, in id
+    ranges of chunk_size so no single statement holds the write lock for long.
+    """
+    scope = Q()
+    if employee_ids:
+        scope |= Q(employee_id__in=employee_ids)
+    if category_ids:
+        scope |= Q(job_category_id__in=category_ids)
+    if job_code_ids:
+        scope |= Q(job_code_id__in=job_code_ids)
+
+    updated = 0
+    for model in ENTRY_MODELS:
+        if scope:
+            updated += _refresh(model.objects.filter(scope))
+            continue
+        ids = model.objects.order_by('id').values_list('id', flat=True)
+        low, high = ids.first(), ids.last()
+        if low is None:
+            continue
+        for start in range(low, high + 1, chunk_size):
+            updated += _refresh(model.objects.filter(id__gte=start, id__lt=start + chunk_size))
+    return updated
@@ -0,0 +1,47 @@
+"""
+Media storage backends whose calls show up as spans in request traces.
+
+They behave exactly like the Django / django-storages backends they
+extend. Outside a traced request (api/tracing.py) the spans cost nothing.
+"""
+from django.core.files.storage import FileSystemStorage
+
+from . import tracing
+
+
+class TracedStorageMixin:
+    def _save(self, name, content):
+        with tracing.span('storage.save', {'storage.name': name, 'storage.size': getattr(content, 'size', None)}):
+            return super()._save(name, content)
+
+    def _open(self, name, mode='rb'):
+        with tracing.span('storage.open', {'storage.name': name}):
+            return super()._open(name, mode)
+
+    def delete(self, name):
+        with tracing.span('storage.delete', {'storage.name': name}):
+            return super().delete(name)
+
+    def exists(self, name):
+        with tracing.span('storage.exists', {'storage.name': name}):
+            return super().exists(name)
+
+    def url(self, name, *args, **kwargs):
+        with tracing.span('storage.url', {'storage.name': name}):
+            return super().url(name, *args, **kwargs)
+
+
+class TracedFileSystemStorage(TracedStorageMixin, FileSystemStorage):
+    pass
+
+
+def __getattr__(name):
+    # Built on first use: importing the S3 backend needs boto3, which is
+    # only installed where USE_S3_STORAGE is
+    if name == 'TracedS3Storage':
+        from storages.backends.s3boto3 import S3Boto3Storage
+
+        cls = type(name, (TracedStorageMixin, S3Boto3Storage), {'__module__': __name__})
+        globals()[name] = cls
+        return cls
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,138 @@
+"""
+Auto-close time entries left open too long (forgotten clock-outs).
+
+Each category may set its own threshold (JobCodeCategory.auto_close_hours);
+everything else uses the STALE_ENTRY_HOURS setting. All stale entries are
+closed with one UPDATE: end_time becomes start_time + threshold and the
+entry is flagged needs_review so an admin can correct it.
+
+A paused entry is left alone while its interruption is open, so the
+interruption can still resume it. Once the interruption has been closed
+(by the user or by a sweep), the next sweep closes the paused entry too.
+
+The periodic sweep runs in one process per host: gunicorn starts it from its
+post_worker_init hook (never in the preloading master, which forks workers
+with the thread's locks and connection held), and the first worker to take
+the leader lock in the shared cache dir keeps it until it exits.
+"""
+import fcntl
+import logging
+import os
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Case, DateTimeField, Exists, F, OuterRef, Q, When
+from django.utils import timezone
+
+from .models import JobCodeCategory, TimeEntry
+
+logger = logging.getLogger(__name__)
+
+
+def waiting_on_interruption():
+    """Filter for paused entries whose interruption is still open (they must stay open)."""
+    return Q(is_paused=True) & Exists(
+        TimeEntry.objects.filter(interrupted_entry=OuterRef('pk'), end_time__isnull=True)
+    )
+
+
+def stale_entries(now=None):
+    """
+    Return (queryset, end_time expression) for entries open past their threshold.
+    """
+    now = now or timezone.now()
+    default = timedelta(hours=settings.STALE_ENTRY_HOURS)
+
+    # Group categories by threshold so the UPDATE needs one branch per distinct value
+    thresholds = {}
+    for category_id, hours in JobCodeCategory.objects.filter(
+        auto_close_hours__isnull=False
+    ).values_list('id', 'auto_close_hours'):
+        thresholds.setdefault(timedelta(hours=hours), []).append(category_id)
+    custom_ids = [i for ids in thresholds.values() for i in ids]
+
+    condition = Q(start_time__lt=now - default) & ~Q(job_category_id__in=custom_ids)
+    branches = []
+    for threshold, ids in thresholds.items():
+        condition |= Q(job_category_id__in=ids, start_time__lt=now - threshold)
+        branches.append(When(job_category_id__in=ids, then=F('start_time') + threshold))
+
+    end_time = Case(*branches, default=F('start_time') + default, output_field=DateTimeField())
+    queryset = TimeEntry.objects.filter(condition, end_time__isnull=True).exclude(waiting_on_interruption())
+    return queryset, end_time
+
+
+def close_stale_entries(now=None, dry_run=False):
+    """Close stale open entries in a single UPDATE. Returns the number closed."""
+    now = now or timezone.now()
+    queryset, end_time = stale_entries(now)
+    if dry_run:
+        return queryset.count()
+
+    closed = queryset.update(
+        end_time=end_time,
+        is_paused=False,
+        needs_review=True,
+        updated_at=now,
+    )
+    if closed:
+        logger.info("Auto-closed %d stale time entries", closed)
+    return closed
+
+
+_scheduler = None
+
+
+def _take_leader_lock():
+    """
+    Return an open file holding the sweeper's leader lock, or None if another
+    process on this host holds it. The lock is released when the process exits.
+    """
+    directory = getattr(caches['shared'], '_dir', None)
+    if directory is None:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    lock = open(os.path.join(directory, 'sweeper.lock'), 'a')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return None
+    return lock
+
+
+def start_scheduler(interval_minutes=None):
+    """
+    Run the sweeper every `interval_minutes` in a daemon thread.
+
+    Uses STALE_ENTRY_SWEEP_MINUTES by default; does nothing when that is 0.
+    Call it from each worker after it has forked: only the worker that takes
+    the leader lock starts the thread.
+    """
+    global _scheduler
+    interval_minutes = interval_minutes if interval_minutes is not None else settings.STALE_ENTRY_SWEEP_MINUTES
+    if not interval_minutes or _scheduler is not None:
+        return None
+    lock = _take_leader_lock()
+    if lock is None:
+        return None
+
+    stop = threading.Event()
+
+    def run():
+        from django.db import close_old_connections
+        while not stop.wait(interval_minutes * 60):
+            try:
+                close_stale_entries()
+            except Exception:
+                logger.exception("Stale entry sweep failed")
+            finally:
+                close_old_connections()
+
+    _scheduler = threading.Thread(target=run, name='stale-entry-sweeper', daemon=True)
+    _scheduler.stop = stop
+    _scheduler.lock = lock
+    _scheduler.start()
+    return _scheduler
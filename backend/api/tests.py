@@ -1,10 +1,36 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import pstats
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+from unittest.mock import ANY, patch
+
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.conf import settings
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
-from datetime import timedelta
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
 
-from .models import Employee, JobCodeCategory, JobCode, TimeEntry
+from . import async_views, db_router, refdata, timesheets
+from .employee_import import import_employees
+from .overlaps import find_conflict
+from .sweeper import close_stale_entries
+from .archive import archive_entries
+from .models import (
+    Employee, JobCodeCategory, JobCode, TimeEntry, ActivityTag, TimeEntryPhoto, ArchivedTimeEntry, Device
+)
 
 
 class EmployeeModelTest(TestCase):
@@ -425,3 +451,1730 @@ class FullInterruptionFlowTest(APITestCase):
         self.assertEqual(TimeEntry.objects.count(), 2)
         # Entry A: Hensley (not interruption)
         # Entry B: Kitchen (interruption)
+
+
+class PinThrottleAPITest(APITestCase):
+    def setUp(self):
+        # A fresh bucket directory laid out as SHARED_CACHE_DIR would be
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache_dir = directory.name
+        override = override_settings(CACHES={
+            **settings.CACHES,
+            'pin_throttle': {
+                **settings.CACHES['pin_throttle'], 'LOCATION': os.path.join(directory.name, 'pin_throttle'),
+            },
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+        self.employee = Employee.objects.create(first_name='Test', last_name='User')
+        self.employee.set_pin('1234')
+        self.employee.save()
+
+    @override_settings(PIN_THROTTLE_EMPLOYEE_BURST=3)
+    def test_rejects_excess_attempts_before_hashing(self):
+        for _ in range(3):
+            response = self.client.post('/api/v1/auth/verify-pin/', {
+                'employee_id': self.employee.id, 'pin': '0000'
+            })
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        with patch.object(Employee, 'check_pin') as check_pin:
+            response = self.client.post('/api/v1/auth/verify-pin/', {
+                'employee_id': self.employee.id, 'pin': '1234'
+            })
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        check_pin.assert_not_called()
+
+    @override_settings(PIN_THROTTLE_EMPLOYEE_BURST=1)
+    def test_buckets_are_per_employee(self):
+        other = Employee.objects.create(first_name='Other', last_name='User')
+        other.set_pin('5678')
+        other.save()
+
+        self.client.post('/api/v1/auth/verify-pin/', {'employee_id': self.employee.id, 'pin': '0000'})
+        response = self.client.post('/api/v1/auth/verify-pin/', {'employee_id': other.id, 'pin': '5678'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(PIN_THROTTLE_EMPLOYEE_BURST=4)
+    def test_buckets_are_shared_by_workers(self):
+        # Another worker process takes tokens from the same bucket
+        script = (
+            'import time, django; django.setup()\n'
+            'from api.throttling import TokenBucket\n'
+            f"print([TokenBucket('pin_throttle:employee:{self.employee.id}', 4, 5 / 60).consume(time.time())[0] "
+            'for _ in range(3)])'
+        )
+        output = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'config.settings', 'SHARED_CACHE_DIR': self.cache_dir},
+            check=True,
+        ).stdout
+        self.assertEqual(output.strip(), '[True, True, True]')
+
+        response = self.client.post('/api/v1/auth/verify-pin/', {'employee_id': self.employee.id, 'pin': '1234'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post('/api/v1/auth/verify-pin/', {'employee_id': self.employee.id, 'pin': '1234'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_non_object_body_is_rejected_by_the_view(self):
+        response = self.client.post('/api/v1/auth/verify-pin/', [1, 2], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(PIN_THROTTLE_EMPLOYEE_BURST=1)
+    def test_stats_endpoint(self):
+        self.client.post('/api/v1/auth/verify-pin/', {'employee_id': self.employee.id, 'pin': '1234'})
+        self.client.post('/api/v1/auth/verify-pin/', {'employee_id': self.employee.id, 'pin': '1234'})
+
+        with patch.dict(os.environ, {'ADMIN_API_KEY': 'secret'}):
+            response = self.client.get('/api/v1/admin/pin-throttle/', HTTP_AUTHORIZATION='Bearer secret')
+        stats = response.data['pin_throttle']
+        self.assertEqual(stats['attempts_allowed'], 1)
+        self.assertEqual(stats['attempts_rejected'], 1)
+        self.assertEqual(stats['hash_count'], 1)
+
+
+class ReferenceDataCacheTest(APITestCase):
+    def setUp(self):
+        self.employee = Employee.objects.create(first_name='Test', last_name='User')
+        self.wrp = JobCodeCategory.objects.create(name='WRP')
+        self.job_code = JobCode.objects.create(category=self.wrp, name='Hensley')
+        self.global_tag = ActivityTag.objects.create(name='Phone call')
+        self.wrp_tag = ActivityTag.objects.create(name='Inspection', role=self.wrp)
+
+    def test_lookups_use_no_queries_once_warm(self):
+        refdata.snapshot()
+        with self.assertNumQueries(0):
+            self.assertEqual(refdata.get_employee(self.employee.id), self.employee)
+            job_code = refdata.get_job_code(str(self.job_code.id))
+            self.assertEqual(job_code.category.name, 'WRP')
+            self.assertEqual(refdata.get_category(self.wrp.id), self.wrp)
+
+    def test_for_role_served_from_cache(self):
+        refdata.snapshot()
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/api/v1/tags/for-role/{self.wrp.id}/')
+        self.assertEqual([t['name'] for t in response.data], ['Inspection', 'Phone call'])
+
+    def test_invalidated_on_change(self):
+        refdata.snapshot()
+        self.employee.is_active = False
+        self.employee.save()
+        self.assertIsNone(refdata.get_employee(self.employee.id))
+
+        JobCode.objects.create(category=self.wrp, name='Tioga')
+        self.assertEqual(len(refdata.get_category(self.wrp.id).job_codes.all()), 2)
+
+    def test_stale_version_triggers_rebuild(self):
+        old = refdata.snapshot()
+        # Another worker replacing the shared stamp
+        caches['shared'].set(refdata.VERSION_KEY, 'other-worker', None)
+        self.assertIsNot(refdata.snapshot(), old)
+
+
+class ImportJobCodesCommandTest(TestCase):
+    header = 'JobcodeLevel_0,JobcodeLevel_0_Alias,JobcodeLevel_1,JobcodeLevel_1_Alias\n'
+
+    def run_import(self, rows, *args):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write(self.header + rows)
+        self.addCleanup(os.remove, f.name)
+        out = StringIO()
+        call_command('import_job_codes', f.name, *args, stdout=out)
+        return out.getvalue()
+
+    def test_creates_and_updates(self):
+        wrp = JobCodeCategory.objects.create(name='WRP', alias='old')
+        JobCode.objects.create(category=wrp, name='Hensley', alias='31')
+
+        self.run_import('WRP,3,Hensley,32\nWRP,3,Tioga,33\nKitchen,,,\n')
+
+        self.assertEqual(JobCodeCategory.objects.get(name='WRP').alias, '3')
+        self.assertTrue(JobCodeCategory.objects.filter(name='Kitchen').exists())
+        self.assertEqual(
+            dict(JobCode.objects.values_list('name', 'alias')),
+            {'Hensley': '32', 'Tioga': '33'}
+        )
+
+    def test_dry_run_writes_nothing(self):
+        out = self.run_import('WRP,3,Hensley,31\n', '--dry-run')
+        self.assertIn("+ job code WRP / 'Hensley'", out)
+        self.assertFalse(JobCodeCategory.objects.exists())
+
+    def test_deactivate_missing(self):
+        wrp = JobCodeCategory.objects.create(name='WRP')
+        JobCode.objects.create(category=wrp, name='Gone')
+        JobCode.objects.create(category=wrp, name='Back', is_active=False)
+
+        self.run_import('WRP,,Back,\n', '--deactivate-missing')
+
+        self.assertFalse(JobCode.objects.get(name='Gone').is_active)
+        self.assertTrue(JobCode.objects.get(name='Back').is_active)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class EmployeeImportTest(APITestCase):
+    def test_parallel_hashing_and_row_errors(self):
+        Employee.objects.create(first_name='Existing', last_name='Person')
+        rows = [{'first_name': f'Staff{i}', 'last_name': 'Member', 'pin': f'{1000 + i}'} for i in range(10)]
+        rows += [
+            {'first_name': 'Existing', 'last_name': 'Person'},
+            {'first_name': 'Bad', 'last_name': 'Pin', 'pin': '12'},
+            {'first_name': '', 'last_name': 'Nameless'},
+        ]
+
+        result = import_employees(rows, workers=2)
+
+        self.assertEqual(result['created'], 10)
+        self.assertEqual([e['row'] for e in result['errors']], [11, 12, 13])
+        staff = Employee.objects.get(first_name='Staff3')
+        self.assertTrue(staff.check_pin('1003'))
+
+    def test_command_reads_csv(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('first_name,last_name,email,pin,is_active\nAnn,Lee,ann@example.com,4321,\n')
+        self.addCleanup(os.remove, f.name)
+
+        call_command('employee', 'import', f.name, stdout=StringIO())
+
+        ann = Employee.objects.get(first_name='Ann')
+        self.assertTrue(ann.is_active)
+        self.assertTrue(ann.check_pin('4321'))
+
+    def test_admin_endpoint(self):
+        with patch.dict(os.environ, {'ADMIN_API_KEY': 'secret'}):
+            response = self.client.post('/api/v1/admin/employees/import/', {
+                'employees': [
+                    {'first_name': 'Ann', 'last_name': 'Lee', 'pin': '4321'},
+                    {'first_name': 'Ann', 'last_name': 'Lee'},
+                ]
+            }, format='json', HTTP_AUTHORIZATION='Bearer secret')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'][0]['row'], 2)
+
+
+class TimesheetEngineTest(TestCase):
+    tz = ZoneInfo('America/New_York')
+
+    def ts(self, *args):
+        return datetime(*args, tzinfo=self.tz).timestamp()
+
+    def test_interruption_time_not_double_counted(self):
+        # Parent 9:00-12:00, interruption 10:00-10:30 while parent paused
+        sheet = timesheets.compute(
+            employee=[1, 1],
+            start=[self.ts(2026, 1, 5, 9), self.ts(2026, 1, 5, 10)],
+            end=[self.ts(2026, 1, 5, 12), self.ts(2026, 1, 5, 10, 30)],
+            parent=[-1, 0],
+            start_date=date(2026, 1, 5), end_date=date(2026, 1, 5),
+            tz_name='America/New_York',
+        )
+        self.assertEqual(sheet.daily_seconds[0, 0], 3 * 3600)
+
+    def test_split_at_local_midnight_across_dst(self):
+        # Clocks spring forward at 2:00 on 2026-03-08
+        sheet = timesheets.compute(
+            employee=[1],
+            start=[self.ts(2026, 3, 7, 22)],
+            end=[self.ts(2026, 3, 8, 4)],
+            parent=[-1],
+            start_date=date(2026, 3, 7), end_date=date(2026, 3, 8),
+            tz_name='America/New_York',
+        )
+        by_day = dict(zip(sheet.days, sheet.daily_seconds[0]))
+        self.assertEqual(by_day[date(2026, 3, 7)], 2 * 3600)
+        self.assertEqual(by_day[date(2026, 3, 8)], 3 * 3600)
+
+    def test_weekly_and_daily_overtime(self):
+        # Five 10-hour days in one week
+        starts = [self.ts(2026, 1, 5 + d, 8) for d in range(5)]
+        ends = [self.ts(2026, 1, 5 + d, 18) for d in range(5)]
+        args = dict(
+            employee=[7] * 5, start=starts, end=ends, parent=[-1] * 5,
+            start_date=date(2026, 1, 5), end_date=date(2026, 1, 9), tz_name='America/New_York',
+        )
+
+        weekly = timesheets.compute(**args)
+        self.assertEqual(weekly.weekly_seconds[0, 0], 50 * 3600)
+        self.assertEqual(weekly.overtime_seconds[0, 0], 10 * 3600)
+
+        daily = timesheets.compute(daily_overtime_hours=8, **args)
+        self.assertEqual(daily.overtime_seconds[0, 0], 10 * 3600)
+
+
+class TimesheetAPITest(APITestCase):
+    def test_totals_from_entries(self):
+        tz = ZoneInfo('America/New_York')
+        employee = Employee.objects.create(first_name='Test', last_name='User')
+        kitchen = JobCodeCategory.objects.create(name='Kitchen')
+        parent = TimeEntry.objects.create(
+            employee=employee, job_category=kitchen,
+            start_time=datetime(2026, 1, 5, 9, tzinfo=tz), end_time=datetime(2026, 1, 5, 12, tzinfo=tz)
+        )
+        TimeEntry.objects.create(
+            employee=employee, job_category=kitchen, is_interruption=True, interrupted_entry=parent,
+            start_time=datetime(2026, 1, 5, 10, tzinfo=tz), end_time=datetime(2026, 1, 5, 11, tzinfo=tz)
+        )
+
+        response = self.client.get('/api/v1/timesheets/?start_date=2026-01-05&end_date=2026-01-05')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        record = response.data['employees'][0]
+        self.assertEqual(record['employee_id'], employee.id)
+        self.assertEqual(record['days'], [{'date': '2026-01-05', 'seconds': 3 * 3600}])
+        self.assertEqual(record['total_seconds'], 3 * 3600)
+
+
+class OverlapDetectionTest(APITestCase):
+    def setUp(self):
+        self.employee = Employee.objects.create(first_name='Test', last_name='User')
+        self.category = JobCodeCategory.objects.create(name='Kitchen')
+        self.base = timezone.now().replace(microsecond=0) - timedelta(days=1)
+
+    def entry(self, start_hour, end_hour, **kwargs):
+        return TimeEntry.objects.create(
+            employee=self.employee, job_category=self.category,
+            start_time=self.base + timedelta(hours=start_hour),
+            end_time=self.base + timedelta(hours=end_hour) if end_hour is not None else None,
+            **kwargs
+        )
+
+    def test_sweep_finds_overlaps_but_not_interruptions(self):
+        parent = self.entry(0, 4)
+        self.entry(1, 2, is_interruption=True, interrupted_entry=parent)
+        clash = self.entry(3, 5)
+        self.entry(6, 7)
+
+        response = self.client.get('/api/v1/time-entries/overlaps/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        overlaps = response.data['overlaps']
+        self.assertEqual(len(overlaps), 1)
+        self.assertEqual(overlaps[0]['entry_ids'], [parent.id, clash.id])
+        self.assertEqual(overlaps[0]['overlap_seconds'], 3600)
+
+        response = self.client.get('/api/v1/time-entries/overlaps/', {'limit': -2})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_update_rejects_new_overlap(self):
+        self.entry(0, 2)
+        later = self.entry(3, 4)
+
+        response = self.client.patch(f'/api/v1/time-entries/{later.id}/', {
+            'start_time': (self.base + timedelta(hours=1)).isoformat()
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_existing_overlap_can_still_be_edited(self):
+        # Legacy rows (or ones written by the sweeper or an archive restore) that already overlap
+        self.entry(0, 2)
+        clash = self.entry(1, 3)
+
+        response = self.client.patch(f'/api/v1/time-entries/{clash.id}/', {'description': 'Fixed later'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        clash.refresh_from_db()
+        clash.description = 'Again'
+        clash.full_clean()
+
+        response = self.client.patch(f'/api/v1/time-entries/{clash.id}/', {
+            'end_time': (self.base + timedelta(hours=4)).isoformat()
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        clash.end_time = self.base + timedelta(hours=4)
+        with self.assertRaises(ValidationError):
+            clash.full_clean()
+
+    def test_write_check_ignores_history(self):
+        for day in range(20):
+            self.entry(-24 * (day + 1), -24 * (day + 1) + 8)
+        parent = self.entry(0, 8)
+        for hour in range(1, 6):
+            self.entry(hour, hour + 0.5, is_interruption=True, interrupted_entry=parent)
+
+        with self.assertNumQueries(2):
+            conflict = find_conflict(self.employee.id, self.base + timedelta(hours=7), self.base + timedelta(hours=9))
+        self.assertEqual(conflict, parent)
+
+        with self.assertNumQueries(3):
+            conflict = find_conflict(self.employee.id, self.base + timedelta(hours=9), self.base + timedelta(hours=10))
+        self.assertIsNone(conflict)
+
+
+class StaleEntrySweeperTest(TestCase):
+    def setUp(self):
+        self.employee = Employee.objects.create(first_name='Test', last_name='User')
+        self.kitchen = JobCodeCategory.objects.create(name='Kitchen')
+        self.events = JobCodeCategory.objects.create(name='Events', auto_close_hours=30)
+        self.now = timezone.now()
+
+    def open_entry(self, category, hours_ago):
+        return TimeEntry.objects.create(
+            employee=self.employee, job_category=category,
+            start_time=self.now - timedelta(hours=hours_ago)
+        )
+
+    @override_settings(STALE_ENTRY_HOURS=12)
+    def test_closes_with_per_category_thresholds_in_one_update(self):
+        stale = self.open_entry(self.kitchen, 20)
+        fresh = self.open_entry(self.kitchen, 2)
+        long_event = self.open_entry(self.events, 20)
+        stale_event = self.open_entry(self.events, 40)
+
+        with self.assertNumQueries(2):
+            closed = close_stale_entries(now=self.now)
+
+        self.assertEqual(closed, 2)
+        stale.refresh_from_db()
+        self.assertEqual(stale.end_time, stale.start_time + timedelta(hours=12))
+        self.assertTrue(stale.needs_review)
+        stale_event.refresh_from_db()
+        self.assertEqual(stale_event.end_time, stale_event.start_time + timedelta(hours=30))
+        for entry in (fresh, long_event):
+            entry.refresh_from_db()
+            self.assertIsNone(entry.end_time)
+            self.assertFalse(entry.needs_review)
+
+    @override_settings(STALE_ENTRY_HOURS=12)
+    def test_paused_entry_waits_for_its_interruption(self):
+        parent = self.open_entry(self.kitchen, 40)
+        parent.is_paused = True
+        parent.save()
+        interruption = TimeEntry.objects.create(
+            employee=self.employee, job_category=self.kitchen, start_time=self.now - timedelta(hours=2),
+            is_interruption=True, interrupted_entry=parent
+        )
+
+        self.assertEqual(close_stale_entries(now=self.now), 0)
+        parent.refresh_from_db()
+        self.assertIsNone(parent.end_time)
+        self.assertTrue(parent.is_paused)
+
+        interruption.end_time = self.now
+        interruption.save()
+        self.assertEqual(close_stale_entries(now=self.now), 1)
+        parent.refresh_from_db()
+        self.assertEqual(parent.end_time, parent.start_time + timedelta(hours=12))
+        self.assertFalse(parent.is_paused)
+
+    def test_dry_run(self):
+        self.open_entry(self.kitchen, 100)
+        self.assertEqual(close_stale_entries(now=self.now, dry_run=True), 1)
+        self.assertEqual(TimeEntry.objects.filter(end_time__isnull=True).count(), 1)
+
+    def test_one_scheduler_leader_per_host(self):
+        from . import sweeper
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(CACHES={
+            **settings.CACHES,
+            'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory.name},
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+
+        leader = sweeper._take_leader_lock()
+        self.assertIsNotNone(leader)
+        # Another worker (a separate open file, so a separate flock) is turned away
+        self.assertIsNone(sweeper._take_leader_lock())
+        with patch.object(sweeper, '_scheduler', None):
+            self.assertIsNone(sweeper.start_scheduler(interval_minutes=5))
+
+        # When the leader exits its lock is released and the next worker takes over
+        leader.close()
+        successor = sweeper._take_leader_lock()
+        self.assertIsNotNone(successor)
+        successor.close()
+
+
+class ArchiveTest(APITestCase):
+    def setUp(self):
+        self.employee = Employee.objects.create(first_name='Test', last_name='User')
+        self.kitchen = JobCodeCategory.objects.create(name='Kitchen')
+        self.tag = ActivityTag.objects.create(name='Walk-in')
+        self.old = timezone.now() - timedelta(days=200)
+
+    def test_moves_entries_with_tags_photos_and_interruptions(self):
+        parent = TimeEntry.objects.create(
+            employee=self.employee, job_category=self.kitchen,
+            start_time=self.old, end_time=self.old + timedelta(hours=4)
+        )
+        parent.activity_tags.add(self.tag)
+        interruption = TimeEntry.objects.create(
+            employee=self.employee, job_category=self.kitchen, is_interruption=True,
+            interrupted_entry=parent,
+            start_time=self.old + timedelta(hours=1), end_time=self.old + timedelta(hours=2)
+        )
+        TimeEntryPhoto.objects.bulk_create([
+            TimeEntryPhoto(time_entry=parent, image='time_entry_photos/a.jpg', caption='Sink')
+        ])
+        recent = TimeEntry.objects.create(
+            employee=self.employee, job_category=self.kitchen,
+            start_time=timezone.now() - timedelta(hours=3), end_time=timezone.now() - timedelta(hours=2)
+        )
+
+        self.assertEqual(archive_entries(days=90, chunk_size=1), 2)
+
+        self.assertEqual(list(TimeEntry.objects.values_list('id', flat=True)), [recent.id])
+        archived = ArchivedTimeEntry.objects.get(id=parent.id)
+        self.assertEqual(list(archived.activity_tags.all()), [self.tag])
+        self.assertEqual(archived.photos.get().caption, 'Sink')
+        self.assertEqual(
+            ArchivedTimeEntry.objects.get(id=interruption.id).interrupted_entry_id, parent.id
+        )
+
+    def test_reports_read_hot_and_cold(self):
+        TimeEntry.objects.create(
+            employee=self.employee, job_category=self.kitchen,
+            start_time=self.old, end_time=self.old + timedelta(hours=2)
+        )
+        recent_start = timezone.now() - timedelta(days=1)
+        TimeEntry.objects.create(
+            employee=self.employee, job_category=self.kitchen,
+            start_time=recent_start, end_time=recent_start + timedelta(hours=1)
+        )
+        archive_entries(days=90)
+
+        response = self.client.get('/api/v1/insights/role-hours/')
+        self.assertEqual(response.data['role_hours'][0]['total_hours'], 3)
+
+        response = self.client.get('/api/v1/insights/tag-distribution/')
+        self.assertEqual(response.data['total_sessions'], 2)
+
+    def test_entry_list_reads_hot_and_cold(self):
+        old = TimeEntry.objects.create(
+            employee=self.employee, job_category=self.kitchen, description='Deep clean',
+            start_time=self.old, end_time=self.old + timedelta(hours=2)
+        )
+        old.activity_tags.add(self.tag)
+        recent = TimeEntry.objects.create(
+            employee=self.employee, job_category=self.kitchen,
+            start_time=timezone.now() - timedelta(days=1), end_time=timezone.now() - timedelta(hours=23)
+        )
+        before = self.client.get('/api/v1/time-entries/').content
+        archive_entries(days=90)
+        self.assertEqual(self.client.get('/api/v1/time-entries/').content, before)
+
+        start_date = (self.old - timedelta(days=1)).date().isoformat()
+        response = self.client.get('/api/v1/time-entries/', {'start_date': start_date})
+        self.assertEqual([row['id'] for row in response.data['results']], [recent.id, old.id])
+        self.assertEqual(response.data['count'], 2)
+        archived = response.data['results'][1]
+        self.assertEqual(archived['description'], 'Deep clean')
+        self.assertEqual([tag['name'] for tag in archived['activity_tags']], ['Walk-in'])
+
+        response = self.client.get('/api/v1/time-entries/', {'start_date': start_date, 'fields': 'id,activity_tags'})
+        self.assertEqual(response.data['results'][1], {'id': old.id, 'activity_tags': [self.tag.id]})
+
+        # Only recent entries asked for: the archive is not read
+        response = self.client.get('/api/v1/time-entries/', {'start_date': timezone.now().date().isoformat()})
+        self.assertEqual(response.data['count'], 0)
+
+    def test_skips_entries_needing_review(self):
+        TimeEntry.objects.create(
+            employee=self.employee, job_category=self.kitchen, needs_review=True,
+            start_time=self.old, end_time=self.old + timedelta(hours=2)
+        )
+        self.assertEqual(archive_entries(days=90), 0)
+
+
+@override_settings(REPLICA_DB_ALIAS='replica')
+class ReplicaRoutingTest(TestCase):
+    def route(self, method, path, cookies=None):
+        seen = {}
+
+        def get_response(request):
+            seen['alias'] = db_router.read_alias()
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)(path)
+        request.COOKIES.update(cookies or {})
+        response = db_router.ReplicaRoutingMiddleware(get_response)(request)
+        return seen['alias'], response
+
+    def test_reporting_reads_go_to_replica(self):
+        self.assertEqual(self.route('get', '/api/v1/insights/role-hours/')[0], 'replica')
+        self.assertEqual(self.route('get', '/admin/api/timeentry/')[0], 'replica')
+        self.assertEqual(self.route('get', '/api/v1/sessions/active/')[0], 'default')
+
+    def test_write_pins_client_to_primary(self):
+        alias, response = self.route('post', '/api/v1/clock/start/')
+        self.assertEqual(alias, 'default')
+        cookie = response.cookies[db_router.PIN_COOKIE].value
+
+        alias, _ = self.route('get', '/api/v1/insights/role-hours/', {db_router.PIN_COOKIE: cookie})
+        self.assertEqual(alias, 'default')
+
+    @override_settings(REPLICA_DB_ALIAS=None)
+    def test_no_replica_configured(self):
+        self.assertEqual(self.route('get', '/api/v1/insights/role-hours/')[0], 'default')
+
+    def test_async_chain(self):
+        seen = {}
+
+        async def get_response(request):
+            seen['alias'] = db_router.read_alias()
+            return HttpResponse()
+
+        middleware = db_router.ReplicaRoutingMiddleware(get_response)
+        async_to_sync(middleware)(RequestFactory().get('/api/v1/insights/role-hours/'))
+        self.assertEqual(seen['alias'], 'replica')
+
+        response = async_to_sync(middleware)(RequestFactory().post('/api/v1/clock/start/'))
+        self.assertIn(db_router.PIN_COOKIE, response.cookies)
+
+
+class AsyncReadViewsTest(APITestCase):
+    """The async fast path must return exactly what the DRF views return."""
+
+    def setUp(self):
+        self.employee = Employee.objects.create(first_name='Test', last_name='User')
+        self.kitchen = JobCodeCategory.objects.create(name='Kitchen')
+        self.wrp = JobCodeCategory.objects.create(name='WRP')
+        self.hensley = JobCode.objects.create(category=self.wrp, name='Hensley')
+        self.tag = ActivityTag.objects.create(name='Prep', role=self.kitchen)
+        ActivityTag.objects.create(name='Break')
+
+        start = timezone.now() - timedelta(hours=1)
+        paused = TimeEntry.objects.create(
+            employee=self.employee, job_code=self.hensley, job_category=self.wrp,
+            start_time=start, is_paused=True
+        )
+        self.entry = TimeEntry.objects.create(
+            employee=self.employee, job_category=self.kitchen, start_time=start + timedelta(minutes=10),
+            is_interruption=True, interrupted_entry=paused, interruption_reason='Delivery'
+        )
+        self.entry.activity_tags.set([self.tag])
+        self.factory = RequestFactory()
+
+    def assertSameResponse(self, path, view, **kwargs):
+        # Open entries report a duration relative to now
+        with patch('django.utils.timezone.now', return_value=timezone.now()):
+            expected = self.client.get(path)
+            actual = async_to_sync(view)(self.factory.get(path), **kwargs)
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual.content, expected.content)
+
+    def test_active_session(self):
+        self.assertSameResponse('/api/v1/sessions/active/', async_views.active_session)
+
+    def test_current_entry(self):
+        self.assertSameResponse(
+            f'/api/v1/employees/{self.employee.id}/current_entry/', async_views.current_entry, pk=self.employee.id
+        )
+        self.assertSameResponse('/api/v1/employees/999/current_entry/', async_views.current_entry, pk=999)
+
+    def test_field_selection(self):
+        self.assertSameResponse(
+            '/api/v1/sessions/active/?fields=id,job_display_name,paused_entry', async_views.active_session
+        )
+        self.assertSameResponse('/api/v1/sessions/active/?fields=bogus', async_views.active_session)
+        self.assertSameResponse('/api/v1/jobs/categories/?fields=id,job_codes', async_views.job_categories)
+
+    def test_reference_data(self):
+        self.assertSameResponse('/api/v1/jobs/categories/', async_views.job_categories)
+        self.assertSameResponse('/api/v1/jobs/categories/?page=9', async_views.job_categories)
+        self.assertSameResponse(
+            f'/api/v1/tags/for-role/{self.kitchen.id}/', async_views.tags_for_role, role_id=str(self.kitchen.id)
+        )
+
+    def test_pagination_links(self):
+        from rest_framework.pagination import PageNumberPagination
+        with patch.object(PageNumberPagination, 'page_size', 1):
+            self.assertSameResponse('/api/v1/jobs/categories/?page=1', async_views.job_categories)
+            self.assertSameResponse('/api/v1/jobs/categories/?page=2', async_views.job_categories)
+
+
+class StartupImportsTest(SimpleTestCase):
+    def test_heavy_modules_load_on_first_use(self):
+        # A fresh worker loading the app and its URLs must not pay for imaging, S3 or NumPy
+        script = (
+            "import json, sys\n"
+            "from config.wsgi import application\n"
+            "from django.urls import get_resolver\n"
+            "get_resolver().url_patterns\n"
+            "print(json.dumps(sorted(m for m in ('PIL', 'pillow_heif', 'boto3', 'numpy') if m in sys.modules)))\n"
+        )
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='config.settings', USE_S3_STORAGE='True')
+        result = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(result.stdout.strip().splitlines()[-1], '[]')
+
+
+class FrontendShellTest(SimpleTestCase):
+    def setUp(self):
+        from config import frontend
+        self.frontend = frontend
+        frontend._shell = None
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.index = os.path.join(self.tmp.name, 'index.html')
+        self.write('<html><script src="/assets/index-B3x9kZ1a.js"></script></html>')
+        override = override_settings(FRONTEND_INDEX_PATH=self.index)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def write(self, html, mtime=None):
+        with open(self.index, 'w') as f:
+            f.write(html)
+        if mtime:
+            os.utime(self.index, ns=(mtime, mtime))
+
+    def get(self, **headers):
+        return self.frontend.serve_frontend(RequestFactory().get('/kiosk', **headers))
+
+    def test_serves_compressed_shell_with_validators(self):
+        response = self.get(HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn(b'index-B3x9kZ1a.js', gzip.decompress(response.content))
+
+        plain = self.get()
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertNotEqual(plain['ETag'], response['ETag'])
+
+    def test_brotli_preferred_when_accepted(self):
+        if self.frontend.brotli is None:
+            self.skipTest('brotli not installed')
+        response = self.get(HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(self.get(HTTP_ACCEPT_ENCODING='gzip, br;q=0')['Content-Encoding'], 'gzip')
+
+    def test_not_modified(self):
+        etag = self.get(HTTP_ACCEPT_ENCODING='gzip')['ETag']
+        response = self.get(HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=f'W/{etag}')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_reloads_after_rebuild(self):
+        first = self.get()
+        self.write('<html>new build</html>', mtime=os.stat(self.index).st_mtime_ns + 10**9)
+        second = self.get(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, b'<html>new build</html>')
+
+    def test_missing_build(self):
+        os.remove(self.index)
+        self.assertEqual(self.get().status_code, 404)
+
+
+class RenderersTest(APITestCase):
+    def setUp(self):
+        self.employee = Employee.objects.create(first_name='Test', last_name='User')
+        self.kitchen = JobCodeCategory.objects.create(name='Kitchen')
+        start = timezone.now() - timedelta(days=3)
+        TimeEntry.objects.bulk_create([
+            TimeEntry(
+                employee=self.employee, job_category=self.kitchen, description=f'Shift {i} \u2028 prep',
+                start_time=start + timedelta(hours=2 * i), end_time=start + timedelta(hours=2 * i + 1)
+            )
+            for i in range(30)
+        ])
+
+    def test_orjson_matches_drf_json(self):
+        from decimal import Decimal
+        from django.utils.translation import gettext_lazy
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import ORJSONRenderer
+
+        data = {
+            'utc': datetime(2026, 1, 5, 9, 30, tzinfo=ZoneInfo('UTC')),
+            'local': datetime(2026, 1, 5, 9, 30, 0, 123456, tzinfo=ZoneInfo('America/New_York')),
+            'day': date(2026, 1, 5),
+            'amount': Decimal('1.50'),
+            'lazy': gettext_lazy('Invalid page.'),
+            'elapsed': timedelta(minutes=90),
+            'nested': [{'a': 1, 'b': [1.25, None, True]}],
+            'text': 'line\u2028break',
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+        response = self.client.get('/api/v1/time-entries/')
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_orjson_float_differences(self):
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import ORJSONRenderer
+
+        # Same values, shorter exponents
+        data = {'big': 1e16, 'small': 1e-7}
+        self.assertEqual(ORJSONRenderer().render(data), b'{"big":1e16,"small":1e-7}')
+        self.assertEqual(json.loads(ORJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+
+        # Non-finite floats: null rather than DRF's error
+        self.assertEqual(ORJSONRenderer().render({'x': float('nan'), 'y': float('inf')}), b'{"x":null,"y":null}')
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({'x': float('nan')})
+
+    def test_msgpack_negotiation(self):
+        import msgpack
+
+        response = self.client.get('/api/v1/time-entries/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), self.client.get('/api/v1/time-entries/').json())
+
+    def test_msgpack_request_body(self):
+        import msgpack
+        caches[settings.PIN_THROTTLE_CACHE].clear()
+
+        response = self.client.post(
+            '/api/v1/auth/verify-pin/',
+            msgpack.packb({'employee_id': self.employee.id, 'pin': '1234'}),
+            content_type='application/msgpack',
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Employee has no PIN set')
+
+    def test_large_api_responses_are_compressed(self):
+        response = self.client.get('/api/v1/time-entries/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        plain = self.client.get('/api/v1/time-entries/')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+        small = self.client.get('/api/v1/jobs/categories/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', small)
+
+
+class EntryRowsTest(APITestCase):
+    def setUp(self):
+        from .entry_rows import time_entry_rows
+        self.time_entry_rows = time_entry_rows
+
+        ada = Employee.objects.create(first_name='Ada', last_name='Lovelace')
+        bo = Employee.objects.create(first_name='Bo', last_name='Ng')
+        kitchen = JobCodeCategory.objects.create(name='Kitchen')
+        wrp = JobCodeCategory.objects.create(name='WRP')
+        hensley = JobCode.objects.create(category=wrp, name='HEN - Hensley')
+        prep = ActivityTag.objects.create(name='Prep', role=kitchen, color='#ff0000')
+        brk = ActivityTag.objects.create(name='Break', description='Lunch')
+
+        start = timezone.now() - timedelta(days=2)
+        paused = TimeEntry.objects.create(
+            employee=ada, job_category=wrp, job_code=hensley, start_time=start, is_paused=True,
+            description='Café \u2028 notes'
+        )
+        interruption = TimeEntry.objects.create(
+            employee=ada, job_category=kitchen, start_time=start + timedelta(minutes=5),
+            end_time=start + timedelta(minutes=35), is_interruption=True,
+            interrupted_entry=paused, interruption_reason='Delivery'
+        )
+        interruption.activity_tags.set([prep, brk])
+        TimeEntry.objects.create(employee=bo, job_category=None, start_time=start, needs_review=True,
+                                 end_time=start + timedelta(hours=3, microseconds=250))
+        TimeEntry.objects.create(employee=bo, job_category=kitchen, start_time=timezone.now() - timedelta(hours=1))
+
+    def test_rows_match_serializer_bytes(self):
+        from rest_framework.renderers import JSONRenderer
+        from .serializers import TimeEntrySerializer
+
+        queryset = TimeEntry.objects.all()
+        with patch('django.utils.timezone.now', return_value=timezone.now()):
+            expected = JSONRenderer().render(TimeEntrySerializer(queryset, many=True).data)
+            actual = JSONRenderer().render(self.time_entry_rows(queryset))
+        self.assertEqual(actual, expected)
+
+    def test_sparse_rows_match_full_rows(self):
+        from .entry_rows import ROW_COLUMNS, build_rows, row_values
+
+        queryset = TimeEntry.objects.all()
+        with patch('django.utils.timezone.now', return_value=timezone.now()):
+            full = self.time_entry_rows(queryset)
+            for key in ROW_COLUMNS:
+                rows = build_rows(row_values(queryset, [key]), [key])
+                self.assertEqual(rows, [{key: row[key]} for row in full], key)
+
+    def test_list_endpoint_uses_constant_queries(self):
+        # archive probe, count, page of rows, tag links, tags
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/v1/time-entries/')
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(response.data['results'][1]['activity_tags'][0]['name'], 'Break')
+
+
+class FieldSelectionTest(APITestCase):
+    """?fields= / ?expand= shrink both the payload and the queries."""
+
+    def setUp(self):
+        self.employee = Employee.objects.create(first_name='Ada', last_name='Lovelace')
+        self.kitchen = JobCodeCategory.objects.create(name='Kitchen')
+        self.wrp = JobCodeCategory.objects.create(name='WRP')
+        self.hensley = JobCode.objects.create(category=self.wrp, name='Hensley')
+        tag = ActivityTag.objects.create(name='Prep', role=self.kitchen)
+
+        start = timezone.now() - timedelta(hours=2)
+        paused = TimeEntry.objects.create(
+            employee=self.employee, job_category=self.wrp, job_code=self.hensley,
+            start_time=start, is_paused=True
+        )
+        self.entry = TimeEntry.objects.create(
+            employee=self.employee, job_category=self.kitchen, start_time=start + timedelta(minutes=5),
+            is_interruption=True, interrupted_entry=paused, interruption_reason='Delivery'
+        )
+        self.entry.activity_tags.set([tag])
+
+    def test_list_sparse_fields(self):
+        # archive probe, count, rows; no tag queries
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/time-entries/?fields=id,start_time,end_time,job_display_name')
+        self.assertEqual(
+            list(response.data['results'][0]), ['id', 'job_display_name', 'start_time', 'end_time']
+        )
+        self.assertEqual(response.data['results'][1]['job_display_name'], 'WRP - Hensley')
+
+    def test_relations_are_ids_unless_expanded(self):
+        response = self.client.get('/api/v1/time-entries/?fields=id,employee,activity_tags')
+        self.assertEqual(response.data['results'][0]['employee'], self.employee.id)
+        self.assertEqual(response.data['results'][0]['activity_tags'], [self.entry.activity_tags.get().id])
+
+        response = self.client.get('/api/v1/time-entries/?fields=id,employee&expand=employee')
+        self.assertEqual(response.data['results'][0]['employee']['full_name'], 'Ada Lovelace')
+
+    def test_expand_keeps_default_shape(self):
+        default = self.client.get('/api/v1/time-entries/').data['results'][0]
+        expanded = self.client.get('/api/v1/time-entries/?expand=job_category').data['results'][0]
+        self.assertEqual(list(expanded), list(default))
+        self.assertEqual(expanded['activity_tags'], default['activity_tags'])
+        self.assertEqual(expanded['job_category']['name'], 'Kitchen')
+
+    def test_each_detail_field_alone(self):
+        with patch('django.utils.timezone.now', return_value=timezone.now()):
+            full = self.client.get(f'/api/v1/time-entries/{self.entry.id}/').data
+            for name in full:
+                path = f'/api/v1/time-entries/{self.entry.id}/?fields={name}'
+                if name in ('employee', 'activity_tags'):
+                    path += f'&expand={name}'
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(path)
+                self.assertEqual(response.data, {name: full[name]}, name)
+                # the entry itself plus at most one prefetch; nothing deferred is loaded later
+                self.assertLessEqual(len(queries), 2, name)
+
+    def test_clock_endpoint_selection(self):
+        response = self.client.post(
+            '/api/v1/clock/start/?fields=id,nonsense', {'employee_id': self.employee.id, 'job_category_id': self.kitchen.id}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'error': 'Unknown field(s): nonsense'})
+        # rejected before anything was written
+        self.assertEqual(TimeEntry.objects.count(), 2)
+
+        response = self.client.post(
+            '/api/v1/clock/start/?fields=id,start_time,job_display_name',
+            {'employee_id': self.employee.id, 'job_category_id': self.kitchen.id}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(list(response.data), ['id', 'job_display_name', 'start_time'])
+
+    def test_job_categories(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/jobs/categories/?fields=id,name')
+        self.assertEqual(response.data['results'][0], {'id': self.kitchen.id, 'name': 'Kitchen'})
+
+        response = self.client.get('/api/v1/jobs/categories/?fields=name,job_codes')
+        self.assertEqual(response.data['results'][1], {'name': 'WRP', 'job_codes': [self.hensley.id]})
+        response = self.client.get('/api/v1/jobs/categories/?fields=name,job_codes&expand=job_codes')
+        self.assertEqual(response.data['results'][1]['job_codes'][0]['name'], 'Hensley')
+
+
+class ChangesFeedTest(APITestCase):
+    """The /changes/ feed sees every write, including bulk ones that skip signals."""
+
+    def setUp(self):
+        self.employee = Employee.objects.create(first_name='Ada', last_name='Lovelace')
+        self.kitchen = JobCodeCategory.objects.create(name='Kitchen')
+        self.code = JobCode.objects.create(category=self.kitchen, name='Prep')
+        self.tag = ActivityTag.objects.create(name='Walk-in')
+        self.entry = TimeEntry.objects.create(
+            employee=self.employee, job_category=self.kitchen, start_time=timezone.now() - timedelta(hours=20)
+        )
+
+    def feed(self, since, **params):
+        response = self.client.get('/api/v1/changes/', {'since': since, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def summary(self, data):
+        return [(change['model'], change['id'], change['deleted']) for change in data['changes']]
+
+    def test_snapshot_then_deltas(self):
+        snapshot = self.feed(0)
+        self.assertEqual(self.summary(snapshot), [
+            ('employee', self.employee.id, False),
+            ('job_code', self.code.id, False),
+            ('activity_tag', self.tag.id, False),
+            ('time_entry', self.entry.id, False),
+        ])
+        self.assertEqual(snapshot['changes'][1]['data']['category'], self.kitchen.id)
+        self.assertEqual(
+            snapshot['changes'][3]['data'],
+            self.client.get('/api/v1/time-entries/').data['results'][0] | {'duration_seconds': ANY},
+        )
+
+        cursor = snapshot['cursor']
+        self.assertEqual(self.feed(cursor)['changes'], [])
+
+        code_id = self.code.id
+        self.entry.activity_tags.add(self.tag)
+        self.code.delete()
+        data = self.feed(cursor)
+        self.assertEqual(self.summary(data), [
+            ('time_entry', self.entry.id, False),
+            ('job_code', code_id, True),
+        ])
+        self.assertEqual(data['changes'][0]['data']['activity_tags'][0]['name'], 'Walk-in')
+        self.assertIsNone(data['changes'][1]['data'])
+
+    def test_bulk_writes_are_recorded(self):
+        cursor = self.feed(0)['cursor']
+
+        close_stale_entries()
+        data = self.feed(cursor)
+        self.assertEqual(self.summary(data), [('time_entry', self.entry.id, False)])
+        self.assertTrue(data['changes'][0]['data']['needs_review'])
+
+        # reviewed, then archived: only the latest state (a tombstone) is sent
+        TimeEntry.objects.update(needs_review=False)
+        archive_entries(days=-1)
+        Employee.objects.bulk_create([Employee(first_name='Bo', last_name='Ng')])
+        data = self.feed(cursor)
+        self.assertEqual(
+            [(model, deleted) for model, _, deleted in self.summary(data)],
+            [('time_entry', True), ('employee', False)],
+        )
+
+    def test_paging(self):
+        data = self.feed(0, limit=2)
+        self.assertTrue(data['has_more'])
+        self.assertEqual(len(data['changes']), 2)
+        rest = self.feed(data['cursor'], limit=2)
+        self.assertFalse(rest['has_more'])
+        self.assertEqual(len(rest['changes']), 2)
+
+    def test_bad_cursor(self):
+        response = self.client.get('/api/v1/changes/', {'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('error', response.data)
+
+
+class MetricsTest(APITestCase):
+    def setUp(self):
+        from . import metrics
+        self.metrics = metrics
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        override = override_settings(METRICS_DIR=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        metrics.registry.clear()
+
+    def scrape(self):
+        with patch.dict(os.environ, {'ADMIN_API_KEY': 'secret'}):
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.content.decode()
+
+    def sample(self, body, line_start):
+        for line in body.splitlines():
+            if line.startswith(line_start + ' '):
+                return float(line.rsplit(' ', 1)[1])
+        self.fail(f'{line_start} not in metrics')
+
+    def test_request_metrics(self):
+        JobCodeCategory.objects.create(name='Kitchen')
+        self.client.get('/api/v1/jobs/categories/')
+        self.client.get('/api/v1/jobs/categories/')
+        self.client.get('/api/v1/no-such-endpoint/')
+
+        body = self.scrape()
+        labels = 'view="jobcodecategory-list",method="GET"'
+        self.assertEqual(self.sample(body, f'http_requests_total{{{labels},status="200"}}'), 2)
+        self.assertEqual(self.sample(body, f'http_request_duration_seconds_count{{{labels}}}'), 2)
+        self.assertEqual(self.sample(body, f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}}'), 2)
+        self.assertEqual(self.sample(body, f'http_response_size_bytes_count{{{labels}}}'), 2)
+        # count, categories, job codes
+        self.assertEqual(self.sample(body, f'http_request_db_queries_total{{{labels}}}'), 6)
+        self.assertGreater(self.sample(body, f'http_request_db_seconds_total{{{labels}}}'), 0)
+        self.assertEqual(self.sample(body, 'http_requests_total{view="unresolved",method="GET",status="404"}'), 1)
+
+    def test_async_request_queries(self):
+        # Under ASGI the ORM runs in sync_to_async threads, not where the middleware runs
+        from django.test import AsyncClient
+        JobCodeCategory.objects.create(name='Kitchen')
+        async_to_sync(AsyncClient().get)('/api/v1/jobs/categories/')
+
+        labels = 'view="jobcodecategory-list",method="GET"'
+        self.assertEqual(self.sample(self.scrape(), f'http_request_db_queries_total{{{labels}}}'), 3)
+
+    def test_workers_are_summed_and_survive_exit(self):
+        self.client.get('/api/v1/tags/')
+        key = 'http_requests_total{view="activitytag-list",method="GET",status="200"}'
+        other = {'http_requests_total': [[[['view', 'activitytag-list'], ['method', 'GET'], ['status', 200]], 5]]}
+
+        # Another worker, still running (this test's parent process stands in for it)
+        live = os.path.join(self.directory, f'{os.getppid()}-1.json')
+        with open(live, 'w') as f:
+            json.dump(other, f)
+        self.assertEqual(self.sample(self.scrape(), key), 6)
+
+        # A worker that has exited: folded into the retired totals
+        worker = subprocess.Popen([sys.executable, '-c', 'pass'])
+        worker.wait()
+        os.rename(live, os.path.join(self.directory, f'{worker.pid}-1.json'))
+        self.assertEqual(self.sample(self.scrape(), key), 6)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, f'{worker.pid}-1.json')))
+        self.assertEqual(self.sample(self.scrape(), key), 6)
+
+    def test_photo_conversion_timing(self):
+        from io import BytesIO
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from PIL import Image
+
+        buffer = BytesIO()
+        Image.new('RGBA', (8, 8)).save(buffer, format='PNG')
+        photo = TimeEntryPhoto(image=SimpleUploadedFile('shot.png', buffer.getvalue(), content_type='image/png'))
+        photo._convert_image_to_jpeg()
+
+        self.assertEqual(self.sample(self.scrape(), 'photo_conversion_seconds_count{outcome="converted"}'), 1)
+
+    def test_requires_admin_key(self):
+        with patch.dict(os.environ, {'ADMIN_API_KEY': 'secret'}):
+            response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class SlowQueryLogTest(APITestCase):
+    def setUp(self):
+        from . import slowlog
+        self.slowlog = slowlog
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log = os.path.join(directory.name, 'slow.log')
+        # every statement counts as slow
+        override = override_settings(SLOW_QUERY_MS=1e-9, SLOW_QUERY_LOG=self.log)
+        override.enable()
+        self.addCleanup(override.disable)
+        for handler in list(slowlog.logger.handlers):
+            slowlog.logger.removeHandler(handler)
+            handler.close()
+        self.addCleanup(lambda: [slowlog.logger.removeHandler(h) for h in list(slowlog.logger.handlers)])
+
+    def test_normalize(self):
+        sql = 'SELECT "t"."id" FROM "t" WHERE "t"."id" IN (%s, %s, %s) AND "t"."name" = \'x\' LIMIT 21'
+        self.assertEqual(self.slowlog.normalize(sql), 'SELECT "t"."id" FROM "t" WHERE "t"."id" IN (...) AND "t"."name" = ? LIMIT ?')
+        self.assertEqual(self.slowlog.params_shape([1, 'a']), '(int, str)')
+        self.assertEqual(self.slowlog.params_shape([[1, 2]] * 3, many=True), 'executemany 3 x (int, int)')
+
+    def test_logged_with_call_site_and_summarized(self):
+        employee = Employee.objects.create(first_name='Test', last_name='User')
+        category = JobCodeCategory.objects.create(name='Kitchen')
+        self.client.post('/api/v1/clock/start/', {'employee_id': employee.id, 'job_category_id': category.id})
+        self.client.post('/api/v1/clock/start/', {'employee_id': employee.id, 'job_category_id': category.id})
+
+        with open(self.log) as f:
+            entries = [json.loads(line) for line in f]
+        insert = [entry for entry in entries if entry['statement'].startswith('INSERT INTO "api_timeentry"')]
+        self.assertEqual(len(insert), 2)
+        self.assertRegex(insert[0]['site'], r'^api/views\.py:\d+ in post$')
+        self.assertNotIn('Test', json.dumps(entries))
+
+        with patch.dict(os.environ, {'ADMIN_API_KEY': 'secret'}):
+            response = self.client.get('/api/v1/admin/slow-queries/', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        by_fingerprint = {group['fingerprint']: group for group in response.data['statements']}
+        group = by_fingerprint[insert[0]['fingerprint']]
+        self.assertEqual(group['count'], 2)
+        self.assertEqual(group['sites'][0]['count'], 2)
+
+        with patch.dict(os.environ, {'ADMIN_API_KEY': 'secret'}):
+            response = self.client.get(
+                '/api/v1/admin/slow-queries/', {'limit': -1}, HTTP_AUTHORIZATION='Bearer secret'
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rotation(self):
+        with override_settings(SLOW_QUERY_LOG_BYTES=2000, SLOW_QUERY_LOG_BACKUPS=2):
+            for i in range(40):
+                Employee.objects.filter(first_name=f'n{i}').exists()
+            self.assertTrue(os.path.exists(self.log + '.1'))
+            self.assertLessEqual(os.path.getsize(self.log), 2000)
+            self.assertEqual(self.slowlog.summarize()[0]['count'], len(list(self.slowlog.read_entries())))
+
+
+class ProfilerTest(APITestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(PROFILE_DIR=directory.name, PROFILE_KEEP=2)
+        override.enable()
+        self.addCleanup(override.disable)
+        patcher = patch.dict(os.environ, {'ADMIN_API_KEY': 'secret'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.employee = Employee.objects.create(first_name='Test', last_name='User')
+
+    def test_profile_report(self):
+        response = self.client.get('/api/v1/employees/?profile=1', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        profile_id = response['X-Profile-Id']
+
+        response = self.client.get(f'/api/v1/admin/profiles/{profile_id}/', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        report = response.json()
+        self.assertEqual(report['view'], 'employee-list')
+        self.assertEqual(report['status'], 200)
+        self.assertGreaterEqual(report['wall_ms'], report['cpu_ms'])
+        self.assertGreaterEqual(report['sql']['count'], 1)
+        statement = report['sql']['statements'][0]
+        self.assertIn('FROM "api_employee"', statement['statement'])
+        self.assertIn('cumulative', report['cumulative'])
+
+        response = self.client.get(f'/api/v1/admin/profiles/{profile_id}/raw/', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with tempfile.NamedTemporaryFile(suffix='.prof') as f:
+            f.write(b''.join(response.streaming_content))
+            f.flush()
+            self.assertGreater(pstats.Stats(f.name).total_calls, 0)
+
+    def test_requires_admin_key(self):
+        response = self.client.get('/api/v1/employees/?profile=1', HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('X-Profile-Id', response)
+        response = self.client.get('/api/v1/employees/?profile=1')
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(os.listdir(settings.PROFILE_DIR), [])
+
+    def test_list_keeps_newest(self):
+        ids = [
+            self.client.get('/api/v1/employees/?profile=1', HTTP_AUTHORIZATION='Bearer secret')['X-Profile-Id']
+            for _ in range(3)
+        ]
+        response = self.client.get('/api/v1/admin/profiles/', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual([report['id'] for report in response.data['profiles']], ids[:0:-1])
+        response = self.client.get(f'/api/v1/admin/profiles/{ids[0]}/', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get('/api/v1/admin/profiles/..%2Fsecret/', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TracingTest(APITestCase):
+    def setUp(self):
+        from . import tracing
+        self.tracing = tracing
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.trace_file = os.path.join(directory.name, 'traces.jsonl')
+        override = override_settings(
+            TRACING_ENABLED=True, TRACE_FILE=self.trace_file, MEDIA_ROOT=os.path.join(directory.name, 'media')
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        for handler in list(tracing.logger.handlers):
+            tracing.logger.removeHandler(handler)
+            handler.close()
+        self.addCleanup(lambda: [tracing.logger.removeHandler(h) for h in list(tracing.logger.handlers)])
+
+        employee = Employee.objects.create(first_name='Test', last_name='User')
+        self.entry = TimeEntry.objects.create(employee=employee, start_time=timezone.now())
+
+    def traces(self):
+        with open(self.trace_file) as f:
+            return [json.loads(line)['resourceSpans'][0]['scopeSpans'][0]['spans'] for line in f]
+
+    def test_photo_upload_spans(self):
+        from io import BytesIO
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from PIL import Image
+
+        buffer = BytesIO()
+        Image.new('RGBA', (8, 8)).save(buffer, format='PNG')
+        response = self.client.post('/api/v1/photos/', {
+            'time_entry': self.entry.id,
+            'image': SimpleUploadedFile('shot.png', buffer.getvalue(), content_type='image/png'),
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        [spans] = self.traces()
+        by_name = {span['name']: span for span in spans}
+        server = by_name['POST /api/v1/photos/']
+        self.assertEqual(response['X-Trace-Id'], server['traceId'])
+        self.assertEqual(response['traceparent'], f"00-{server['traceId']}-{server['spanId']}-01")
+        self.assertNotIn('parentSpanId', server)
+
+        view = by_name['view TimeEntryPhotoViewSet']
+        self.assertEqual(view['parentSpanId'], server['spanId'])
+        for name in ('parse multipart/form-data', 'photo.convert', 'storage.save', 'storage.url',
+                     'db INSERT', 'render application/json'):
+            self.assertEqual(by_name[name]['parentSpanId'], view['spanId'], name)
+        self.assertEqual({span['traceId'] for span in spans}, {server['traceId']})
+        statement = next(a for a in by_name['db INSERT']['attributes'] if a['key'] == 'db.statement')
+        self.assertIn('INSERT INTO "api_timeentryphoto"', statement['value']['stringValue'])
+
+    def test_continues_caller_trace(self):
+        trace_id, parent_id = '4bf92f3577b34da6a3ce929d0e0e4736', '00f067aa0ba902b7'
+        response = self.client.get('/api/v1/employees/', HTTP_TRACEPARENT=f'00-{trace_id}-{parent_id}-01')
+        self.assertEqual(response['X-Trace-Id'], trace_id)
+        [spans] = self.traces()
+        server = next(span for span in spans if span['kind'] == self.tracing.SERVER)
+        self.assertEqual(server['parentSpanId'], parent_id)
+
+        # Not sampled by the caller: the trace id is kept but nothing is recorded
+        response = self.client.get('/api/v1/employees/', HTTP_TRACEPARENT=f'00-{trace_id}-{parent_id}-00')
+        self.assertTrue(response['traceparent'].startswith(f'00-{trace_id}-'))
+        self.assertTrue(response['traceparent'].endswith('-00'))
+        self.assertEqual(len(self.traces()), 1)
+
+    def test_async_request_query_spans(self):
+        from django.test import AsyncClient
+        async_to_sync(AsyncClient().get)('/api/v1/employees/')
+
+        [spans] = self.traces()
+        view = next(span for span in spans if span['name'].startswith('view '))
+        queries = [span for span in spans if span['name'] == 'db SELECT']
+        self.assertTrue(queries)
+        self.assertEqual({span['parentSpanId'] for span in queries}, {view['spanId']})
+
+    def test_no_spans_outside_a_request(self):
+        with self.tracing.span('outside') as span:
+            self.assertIsNone(span)
+        self.assertIsNone(self.tracing.parse_traceparent('00-' + '0' * 32 + '-00f067aa0ba902b7-01'))
+
+
+class AdminListTest(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(user)
+
+        self.category = JobCodeCategory.objects.create(name='Kitchen')
+        self.code = JobCode.objects.create(category=self.category, name='Prep')
+        self.other_code = JobCode.objects.create(category=JobCodeCategory.objects.create(name='Front'), name='Host')
+        self.tag = ActivityTag.objects.create(name='Inventory')
+        self.employee = Employee.objects.create(first_name='Test', last_name='User')
+        self.other = Employee.objects.create(first_name='Other', last_name='Person')
+        start = timezone.now() - timedelta(days=30)
+        self.entries = [
+            TimeEntry.objects.create(
+                employee=self.employee if i % 2 else self.other, job_code=self.code,
+                start_time=start + timedelta(hours=i), end_time=start + timedelta(hours=i, minutes=30),
+            )
+            for i in range(6)
+        ]
+        self.open = TimeEntry.objects.create(employee=self.employee, job_category=self.category, start_time=timezone.now())
+
+    def changelist(self, query=''):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/admin/api/timeentry/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response, [q['sql'] for q in queries]
+
+    def test_list_queries_do_not_grow_or_count_the_table(self):
+        _, few = self.changelist()
+        for entry in self.entries:
+            TimeEntry.objects.create(
+                employee=self.other, job_code=self.other_code,
+                start_time=entry.start_time - timedelta(days=1), end_time=entry.end_time - timedelta(days=1),
+            )
+        response, more = self.changelist()
+        self.assertEqual(len(few), len(more))
+        self.assertFalse([sql for sql in more if 'COUNT(' in sql and 'api_timeentry' in sql])
+        self.assertEqual(response.context['cl'].result_count, 13)
+
+    def test_filters_and_search(self):
+        response, queries = self.changelist('?status=open')
+        self.assertEqual(list(response.context['cl'].result_list), [self.open])
+        counts = [sql for sql in queries if 'COUNT(' in sql]
+        self.assertTrue(all('LIMIT' in sql for sql in counts))
+
+        response, _ = self.changelist('?q=oth')
+        self.assertEqual(response.context['cl'].result_count, 3)
+        response, _ = self.changelist('?q=Other+Person')
+        self.assertEqual(response.context['cl'].result_count, 3)
+        response, _ = self.changelist('?q=oth+user')
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'EXPLAIN QUERY PLAN ' + str(TimeEntry.objects.filter(needs_review=True).order_by('-start_time').query)
+            )
+            self.assertIn('timeentry_review_idx', str(cursor.fetchall()))
+
+    def test_bulk_actions(self):
+        ids = [str(entry.id) for entry in self.entries[:3]] + [str(self.open.id)]
+
+        def act(action, **extra):
+            return self.client.post('/admin/api/timeentry/', {
+                'action': action, '_selected_action': ids, 'index': 0, **extra,
+            })
+
+        act('close_entries')
+        self.open.refresh_from_db()
+        self.assertIsNotNone(self.open.end_time)
+
+        act('reassign_job', job_code=self.other_code.id)
+        self.assertEqual(
+            set(TimeEntry.objects.filter(id__in=ids).values_list('job_code', 'job_category')),
+            {(self.other_code.id, self.other_code.category_id)},
+        )
+        self.assertEqual(
+            set(TimeEntry.objects.filter(id__in=ids).values_list('job_display_name', flat=True)), {'Front - Host'}
+        )
+        self.assertEqual(TimeEntry.objects.filter(job_code=self.code).count(), 3)
+
+        act('add_tag', tag=self.tag.id)
+        act('add_tag', tag=self.tag.id)
+        self.assertEqual(self.tag.time_entries.count(), 4)
+        act('remove_tag', tag=self.tag.id)
+        self.assertEqual(self.tag.time_entries.count(), 0)
+
+        act('reassign_job')
+        self.assertEqual(TimeEntry.objects.filter(job_code=self.other_code).count(), 4)
+
+    def close(self, *entries):
+        return self.client.post('/admin/api/timeentry/', {
+            'action': 'close_entries', '_selected_action': [str(e.id) for e in entries], 'index': 0,
+        }, follow=True)
+
+    def interrupt(self):
+        self.open.is_paused = True
+        self.open.save()
+        return TimeEntry.objects.create(
+            employee=self.employee, job_category=self.category, start_time=timezone.now(),
+            is_interruption=True, interrupted_entry=self.open,
+        )
+
+    def test_close_skips_paused_entry_with_open_interruption(self):
+        interruption = self.interrupt()
+        response = self.close(self.open)
+        self.assertContains(response, 'Left 1 paused entries open')
+        self.open.refresh_from_db()
+        self.assertIsNone(self.open.end_time)
+        self.assertTrue(self.open.is_paused)
+
+        # Selected together, the interruption closes first and the parent with it
+        self.close(self.open, interruption)
+        self.open.refresh_from_db()
+        self.assertIsNotNone(self.open.end_time)
+        self.assertFalse(self.open.is_paused)
+
+    def test_closing_interruption_resumes_parent(self):
+        interruption = self.interrupt()
+        self.close(interruption)
+        interruption.refresh_from_db()
+        self.assertIsNotNone(interruption.end_time)
+        self.open.refresh_from_db()
+        self.assertIsNone(self.open.end_time)
+        self.assertFalse(self.open.is_paused)
+
+    def test_estimated_count(self):
+        from .admin import EstimatedCountPaginator, estimated_row_count
+        self.assertEqual(estimated_row_count(TimeEntry), 7)
+        paginator = EstimatedCountPaginator(TimeEntry.objects.filter(end_time__isnull=False), 2)
+        paginator.count_limit = 4
+        self.assertEqual(paginator.count, 4)
+
+    def test_photo_list(self):
+        TimeEntryPhoto.objects.bulk_create(
+            TimeEntryPhoto(time_entry=entry, image=f'time_entry_photos/{entry.id}.jpg') for entry in self.entries
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/admin/api/timeentryphoto/?q={self.entries[0].id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([photo.time_entry for photo in response.context['cl'].result_list], [self.entries[0]])
+        self.assertLess(len(queries), 10)
+
+
+class EntrySnapshotTest(APITestCase):
+    def setUp(self):
+        self.employee = Employee.objects.create(first_name='Ada', last_name='Lovelace')
+        self.kitchen = JobCodeCategory.objects.create(name='Kitchen')
+        self.code = JobCode.objects.create(category=self.kitchen, name='Prep')
+        self.entry = TimeEntry.objects.create(
+            employee=self.employee, job_code=self.code, start_time=timezone.now() - timedelta(hours=2)
+        )
+
+    def names(self, entry):
+        return type(entry).objects.values_list('employee_name', 'job_display_name').get(id=entry.id)
+
+    def test_set_on_save(self):
+        self.assertEqual(self.names(self.entry), ('Ada Lovelace', 'Kitchen - Prep'))
+
+        entry = TimeEntry.objects.get(id=self.entry.id)
+        entry.end_time = timezone.now()
+        with CaptureQueriesContext(connection) as queries:
+            entry.save()
+        # Unchanged employee/job: the snapshot is not rebuilt
+        self.assertFalse([q for q in queries if 'FROM "api_employee"' in q['sql']])
+
+        entry.job_code = None
+        entry.save()
+        self.assertEqual(self.names(entry), ('Ada Lovelace', 'Kitchen'))
+
+    def test_list_without_joins(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/time-entries/')
+        self.assertEqual(response.data['results'][0]['job_display_name'], 'Kitchen - Prep')
+        self.assertEqual(response.data['results'][0]['employee_name'], 'Ada Lovelace')
+        entry_queries = [q['sql'] for q in queries if 'FROM "api_timeentry"' in q['sql']]
+        self.assertTrue(entry_queries)
+        self.assertFalse([sql for sql in entry_queries if 'JOIN' in sql])
+
+    def test_renames(self):
+        self.entry.end_time = timezone.now() - timedelta(hours=1)
+        self.entry.save()
+        archived = ArchivedTimeEntry.objects.create(
+            id=999, employee=self.employee, job_category=self.kitchen, job_code=self.code,
+            start_time=self.entry.start_time, end_time=self.entry.end_time,
+            created_at=timezone.now(), updated_at=timezone.now(),
+        )
+
+        self.employee.last_name = 'King'
+        self.employee.save()
+        self.kitchen.name = 'Back of house'
+        self.kitchen.save()
+        self.assertEqual(self.names(self.entry), ('Ada King', 'Back of house - Prep'))
+        self.assertEqual(self.names(archived), ('Ada King', 'Back of house - Prep'))
+
+        # Bulk renames skip signals: the command catches up
+        JobCode.objects.filter(id=self.code.id).update(name='Dish')
+        Employee.objects.filter(id=self.employee.id).update(first_name='Augusta')
+        out = StringIO()
+        call_command('refresh_entry_snapshots', '--chunk-size', '1', stdout=out)
+        self.assertIn('Refreshed 2 entries', out.getvalue())
+        self.assertEqual(self.names(self.entry), ('Augusta King', 'Back of house - Dish'))
+        self.assertEqual(self.names(archived), ('Augusta King', 'Back of house - Dish'))
+
+
+class SearchTest(APITestCase):
+    def setUp(self):
+        self.kitchen = JobCodeCategory.objects.create(name='Kitchen', alias='KIT')
+        self.prep = JobCode.objects.create(category=self.kitchen, name='Prep', alias='PR')
+        self.freezer = Employee.objects.create(first_name='Zoë', last_name='Freezer')
+        self.entry = TimeEntry.objects.create(
+            employee=self.freezer, job_code=self.prep, start_time=timezone.now(),
+            description='Defrosted the walk-in freezer',
+        )
+
+    def search(self, **params):
+        response = self.client.get('/api/v1/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [(hit['type'], hit['id']) for hit in response.data['results']]
+
+    def test_ranked_results(self):
+        response = self.client.get('/api/v1/search/', {'q': 'freez'})
+        self.assertEqual(
+            [(hit['type'], hit['id']) for hit in response.data['results']],
+            [('employee', self.freezer.id), ('time_entry', self.entry.id)],
+        )
+        hit = response.data['results'][1]
+        self.assertEqual(hit['label'], 'Zoë Freezer - Kitchen - Prep')
+        self.assertEqual(hit['snippet'], 'Defrosted the walk-in [freezer]')
+        self.assertEqual(hit['employee'], self.freezer.id)
+
+        # Diacritics fold, FTS5 syntax in the input is just words
+        self.assertEqual(self.search(q='zoe'), [('employee', self.freezer.id)])
+        self.assertEqual(self.search(q='walk-in "OR title:'), [])
+        self.assertEqual(self.search(q='freezer', type='time_entry'), [('time_entry', self.entry.id)])
+
+    def test_index_follows_writes(self):
+        self.assertEqual(self.search(q='kit', type='job_category,job_code'), [
+            ('job_category', self.kitchen.id), ('job_code', self.prep.id),
+        ])
+        self.kitchen.name = 'Scullery'
+        self.kitchen.save()
+        self.assertEqual(self.search(q='scullery', type='job_code'), [('job_code', self.prep.id)])
+
+        TimeEntry.objects.filter(id=self.entry.id).update(description='', interruption_reason='Delivery')
+        self.assertEqual(self.search(q='delivery'), [('time_entry', self.entry.id)])
+        self.assertEqual(self.search(q='defrosted'), [])
+
+        photo = TimeEntryPhoto.objects.bulk_create([
+            TimeEntryPhoto(time_entry=self.entry, image='photos/door.jpg', caption='Door seal')
+        ])[0]
+        self.assertEqual(self.search(q='seal'), [('time_entry_photo', photo.id)])
+
+        self.entry.delete()
+        self.assertEqual(self.search(q='delivery seal'), [])
+        self.assertEqual(self.search(q='delivery'), [])
+
+    def test_free_text_ranked_among_newest_matches(self):
+        newer = TimeEntry.objects.create(
+            employee=self.freezer, job_code=self.prep, start_time=timezone.now(), description='Freezer',
+        )
+        self.assertEqual(self.search(q='freezer', type='time_entry'), [
+            ('time_entry', newer.id), ('time_entry', self.entry.id),
+        ])
+        with override_settings(SEARCH_CANDIDATES=1):
+            self.assertEqual(self.search(q='freezer', type='time_entry'), [('time_entry', newer.id)])
+            self.assertEqual(self.search(q='freezer'), [('employee', self.freezer.id), ('time_entry', newer.id)])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get('/api/v1/search/').status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/search/', {'q': 'a', 'type': 'shift'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/search/', {'q': 'a', 'limit': 'x'}).status_code, 400)
+        self.assertEqual(self.search(q='!!'), [])
+
+    def test_admin_description_search(self):
+        from django.contrib.auth import get_user_model
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(user)
+        other = TimeEntry.objects.create(employee=self.freezer, job_code=self.prep, start_time=timezone.now())
+
+        response = self.client.get('/admin/api/timeentry/', {'q': 'defrost'})
+        self.assertEqual([entry.id for entry in response.context['cl'].result_list], [self.entry.id])
+        response = self.client.get('/admin/api/timeentry/', {'q': 'Zoë'})
+        self.assertEqual({entry.id for entry in response.context['cl'].result_list}, {self.entry.id, other.id})
+
+
+class TypeaheadTest(APITestCase):
+    def setUp(self):
+        self.wrp = JobCodeCategory.objects.create(name='WRP', alias='W')
+        self.maple = JobCode.objects.create(category=self.wrp, name='Maple St', alias='MS')
+        self.marina = JobCode.objects.create(category=self.wrp, name='Marina')
+        self.kitchen = JobCodeCategory.objects.create(name='Kitchen', alias='KIT')
+        self.mara = Employee.objects.create(first_name='Mara', last_name='Zoë')
+        self.ada = Employee.objects.create(first_name='Ada', last_name='Marsh')
+        Employee.objects.create(first_name='Old', last_name='Mark', is_active=False)
+
+    def labels(self, **params):
+        response = self.client.get('/api/v1/typeahead/', params)
+        self.assertEqual(response.status_code, 200)
+        return [hit['label'] for hit in response.data['results']]
+
+    def test_ranked_prefix_matches(self):
+        # Label prefix, then first word, then other words, then the category's name
+        self.assertEqual(self.labels(q='ma'), ['Mara Zoë', 'WRP - Marina', 'WRP - Maple St', 'Ada Marsh'])
+        self.assertEqual(self.labels(q='wrp ma'), ['WRP - Marina', 'WRP - Maple St'])
+        self.assertEqual(self.labels(q='ms'), ['WRP - Maple St'])
+        self.assertEqual(self.labels(q='zoe'), ['Mara Zoë'])
+        self.assertEqual(self.labels(q='w'), ['WRP', 'WRP - Marina', 'WRP - Maple St'])
+        self.assertEqual(self.labels(q='ma', type='employee', limit=1), ['Mara Zoë'])
+        self.assertEqual(self.labels(q=''), [])
+
+        response = self.client.get('/api/v1/typeahead/', {'q': 'maple'})
+        self.assertEqual(response.data['results'], [
+            {'type': 'job_code', 'id': self.maple.id, 'label': 'WRP - Maple St', 'category': self.wrp.id},
+        ])
+
+    def test_served_from_memory_and_rebuilt_on_change(self):
+        self.labels(q='ma')
+        with self.assertNumQueries(0):
+            self.labels(q='mar')
+
+        self.ada.last_name = 'Lovelace'
+        self.ada.save()
+        self.kitchen.is_active = False
+        self.kitchen.save()
+        JobCode.objects.create(category=self.kitchen, name='Mash')
+        self.assertEqual(self.labels(q='ma'), ['Mara Zoë', 'WRP - Marina', 'WRP - Maple St'])
+        self.assertEqual(self.labels(q='kit'), [])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get('/api/v1/typeahead/', {'q': 'a', 'type': 'tag'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/typeahead/', {'q': 'a', 'limit': '-1'}).status_code, 400)
+
+
+class DeviceSessionTest(APITestCase):
+    def setUp(self):
+        self.ada = Employee.objects.create(first_name='Ada', last_name='Marsh')
+        self.bo = Employee.objects.create(first_name='Bo', last_name='Reyes')
+        self.kitchen = JobCodeCategory.objects.create(name='Kitchen')
+        self.front = JobCodeCategory.objects.create(name='Front')
+        self.bar = Device.objects.create(name='Bar kiosk')
+        self.door = Device.objects.create(name='Door kiosk')
+
+    def post(self, path, device, **data):
+        headers = {'HTTP_X_DEVICE_KEY': device.key} if device else {}
+        return self.client.post(f'/api/v1/sessions/{path}/', data, format='json', **headers)
+
+    def active(self, device):
+        headers = {'HTTP_X_DEVICE_KEY': device.key} if device else {}
+        return self.client.get('/api/v1/sessions/active/', **headers).data['active_session']
+
+    def test_sessions_are_scoped_to_their_device(self):
+        bar = self.post('start', self.bar, employee_id=self.ada.id, role_id=self.kitchen.id)
+        self.assertEqual(bar.status_code, status.HTTP_201_CREATED)
+        door = self.post('start', self.door, employee_id=self.bo.id, role_id=self.kitchen.id).data
+        self.assertEqual(TimeEntry.objects.get(id=door['id']).device, self.door)
+
+        self.assertEqual(self.active(self.bar)['id'], bar.data['id'])
+        self.assertEqual(self.active(self.door)['id'], door['id'])
+        self.assertIsNone(self.active(None))
+
+        # Switching and stopping on one kiosk leaves the other's session open
+        switched = self.post('switch', self.bar, employee_id=self.ada.id, role_id=self.front.id).data
+        self.assertEqual([s['id'] for s in switched['ended_sessions']], [bar.data['id']])
+        self.assertIsNotNone(switched['ended_sessions'][0]['end_time'])
+        self.assertIsNotNone(TimeEntry.objects.get(id=bar.data['id']).end_time)
+        self.assertIsNone(TimeEntry.objects.get(id=door['id']).end_time)
+
+        # Not even by id
+        response = self.post('stop', self.bar, session_id=door['id'])
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertIsNone(TimeEntry.objects.get(id=door['id']).end_time)
+
+        stopped = self.post('stop', self.bar, session_id=switched['new_session']['id'])
+        self.assertEqual(stopped.data['id'], switched['new_session']['id'])
+        self.assertEqual(self.post('stop', self.bar).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.active(self.door)['id'], door['id'])
+
+    def test_tags_only_on_the_device_sessions(self):
+        tag = ActivityTag.objects.create(name='Prep')
+        door = self.post('start', self.door, employee_id=self.bo.id, role_id=self.kitchen.id).data
+
+        def retag(device):
+            headers = {'HTTP_X_DEVICE_KEY': device.key} if device else {}
+            return self.client.patch(
+                f"/api/v1/sessions/{door['id']}/tags/", {'tag_ids': [tag.id]}, format='json', **headers
+            )
+
+        self.assertEqual(retag(self.bar).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(retag(None).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(TimeEntry.objects.get(id=door['id']).activity_tags.exists())
+
+        response = retag(self.door)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([t['id'] for t in response.data['activity_tags']], [tag.id])
+
+    def test_switch_updates_only_the_device_rows(self):
+        self.post('start', self.door, employee_id=self.bo.id, role_id=self.kitchen.id)
+        self.post('start', self.bar, employee_id=self.ada.id, role_id=self.kitchen.id)
+        with CaptureQueriesContext(connection) as queries:
+            self.post('switch', self.bar, employee_id=self.ada.id, role_id=self.front.id)
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "api_timeentry"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"id" IN (', updates[0])
+        self.assertEqual(TimeEntry.objects.filter(end_time__isnull=True).count(), 2)
+
+    def test_unregistered_and_unknown_devices(self):
+        shared = self.post('start', None, employee_id=self.ada.id, role_id=self.kitchen.id).data
+        self.post('start', self.bar, employee_id=self.bo.id, role_id=self.kitchen.id)
+        self.assertEqual(self.active(None)['id'], shared['id'])
+
+        response = self.client.get('/api/v1/sessions/active/', HTTP_X_DEVICE_KEY='nope')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.bar.is_active = False
+        self.bar.save()
+        self.assertEqual(self.post('stop', self.bar).status_code, status.HTTP_403_FORBIDDEN)
+
+        # Async poll agrees
+        request = RequestFactory().get('/api/v1/sessions/active/', HTTP_X_DEVICE_KEY=self.door.key)
+        self.post('start', self.door, employee_id=self.bo.id, role_id=self.front.id)
+        with patch('django.utils.timezone.now', return_value=timezone.now()):
+            expected = self.client.get('/api/v1/sessions/active/', HTTP_X_DEVICE_KEY=self.door.key)
+            actual = async_to_sync(async_views.active_session)(request)
+        self.assertEqual(actual.content, expected.content)
+
+        self.assertEqual(
+            self.post('start', self.door, employee_id=999, role_id=self.kitchen.id).status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
@@ -0,0 +1,153 @@
+"""
+Token-bucket throttling for PIN endpoints.
+
+Every PIN check or PIN change costs a full password-hash computation, so
+excess attempts are rejected before any hashing happens. Buckets are kept
+per employee and per client address in PIN_THROTTLE_CACHE, a file-based
+cache every worker uses, so the limits hold for the deployment rather than
+per worker. Updates are read-modify-write, so they hold a lock file in the
+cache directory (threads and processes alike).
+"""
+import fcntl
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+STATS_KEY = 'pin_throttle:stats'
+STATS_FIELDS = ('attempts_allowed', 'attempts_rejected', 'hash_count', 'hash_seconds')
+
+
+_thread_lock = threading.Lock()
+
+
+def _cache():
+    return caches[settings.PIN_THROTTLE_CACHE]
+
+
+@contextmanager
+def _locked():
+    """Exclusive access to the throttle state, across processes when the cache is a directory."""
+    directory = getattr(_cache(), '_dir', None)
+    with _thread_lock:
+        if directory is None:
+            yield
+            return
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'throttle.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+
+def _bump(**deltas):
+    """Add deltas to the shared throttle counters."""
+    cache = _cache()
+    with _locked():
+        stats = cache.get(STATS_KEY) or dict.fromkeys(STATS_FIELDS, 0)
+        for field, delta in deltas.items():
+            stats[field] += delta
+        cache.set(STATS_KEY, stats, None)
+
+
+def get_stats():
+    """Return throttle counters: attempts allowed/rejected and hashing cost."""
+    stats = _cache().get(STATS_KEY) or dict.fromkeys(STATS_FIELDS, 0)
+    stats = dict(stats)
+    stats['hash_seconds'] = round(stats['hash_seconds'], 4)
+    return stats
+
+
+def reset_stats():
+    _cache().delete(STATS_KEY)
+
+
+@contextmanager
+def timed_hash():
+    """Record the wall time spent computing a PIN hash."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _bump(hash_count=1, hash_seconds=time.perf_counter() - started)
+
+
+class TokenBucket:
+    """A bucket of `capacity` tokens that refills at `refill_rate` tokens/second."""
+
+    def __init__(self, key, capacity, refill_rate):
+        self.key = key
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+
+    def consume(self, now):
+        """
+        Take one token. Returns (allowed, wait_seconds).
+
+        State is stored as (tokens, last_refill) so an idle bucket costs
+        nothing and refills lazily on the next attempt.
+        """
+        cache = _cache()
+        with _locked():
+            tokens, last = cache.get(self.key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - last) * self.refill_rate)
+
+            if tokens < 1:
+                cache.set(self.key, (tokens, now), self.ttl)
+                return False, (1 - tokens) / self.refill_rate
+
+            cache.set(self.key, (tokens - 1, now), self.ttl)
+            return True, 0
+
+    @property
+    def ttl(self):
+        # Once a bucket would be full again its state is irrelevant
+        return int(self.capacity / self.refill_rate) + 1
+
+
+class PinAttemptThrottle(BaseThrottle):
+    """
+    Limit PIN attempts per employee and per client.
+
+    The employee is taken from the URL (`pk`) or the request body
+    (`employee_id`). Both buckets must have a token for the attempt to go
+    through.
+    """
+
+    def allow_request(self, request, view):
+        now = time.time()
+        buckets = [
+            TokenBucket(
+                f'pin_throttle:client:{self.get_ident(request)}',
+                settings.PIN_THROTTLE_CLIENT_BURST,
+                settings.PIN_THROTTLE_CLIENT_PER_MINUTE / 60,
+            )
+        ]
+
+        # Runs before the view validates the body, which may not be an object
+        employee_id = view.kwargs.get('pk')
+        if not employee_id and isinstance(request.data, dict):
+            employee_id = request.data.get('employee_id')
+        if employee_id:
+            buckets.append(TokenBucket(
+                f'pin_throttle:employee:{employee_id}',
+                settings.PIN_THROTTLE_EMPLOYEE_BURST,
+                settings.PIN_THROTTLE_EMPLOYEE_PER_MINUTE / 60,
+            ))
+
+        self.wait_seconds = 0
+        for bucket in buckets:
+            allowed, wait = bucket.consume(now)
+            if not allowed:
+                self.wait_seconds = wait
+                _bump(attempts_rejected=1)
+                return False
+
+        _bump(attempts_allowed=1)
+        return True
+
+    def wait(self):
+        return self.wait_seconds
@@ -0,0 +1,227 @@
+"""
+Vectorized timesheet engine.
+
+Entries for a set of employees and a date range are loaded into NumPy arrays
+and totalled in a handful of array passes:
+
+1. Interruptions: a paused parent entry keeps its wall-clock span while an
+   interruption runs, so each interruption contributes a negative segment
+   over its overlap with the parent. Parent + interruption then adds up to
+   the real time worked instead of double counting it.
+2. Day split: segments are cut at local midnights. Boundaries are computed
+   in the configured time zone, so DST days are 23 or 25 hours long.
+3. Totals: per-employee daily seconds, weekly seconds, and weekly overtime
+   (optionally with a daily overtime threshold as well).
+
+Weeks are always whole: the requested range is widened to the surrounding
+week boundaries so overtime is never computed on a partial week.
+"""
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+
+@dataclass
+class Timesheet:
+    employee_ids: np.ndarray      # (E,)
+    days: list                    # [date] of length D
+    daily_seconds: np.ndarray     # (E, D)
+    week_starts: list             # [date] of length W
+    weekly_seconds: np.ndarray    # (E, W)
+    overtime_seconds: np.ndarray  # (E, W)
+
+    def to_dict(self):
+        """JSON-ready structure, one record per employee."""
+        daily = np.round(self.daily_seconds, 1)
+        weekly = np.round(self.weekly_seconds, 1)
+        overtime = np.round(self.overtime_seconds, 1)
+        day_labels = [d.isoformat() for d in self.days]
+        week_labels = [d.isoformat() for d in self.week_starts]
+
+        employees = []
+        for i, employee_id in enumerate(self.employee_ids.tolist()):
+            employees.append({
+                'employee_id': employee_id,
+                'days': [
+                    {'date': label, 'seconds': seconds}
+                    for label, seconds in zip(day_labels, daily[i].tolist())
+                    if seconds
+                ],
+                'weeks': [
+                    {
+                        'week_start': label,
+                        'seconds': seconds,
+                        'regular_seconds': round(seconds - ot, 1),
+                        'overtime_seconds': ot,
+                    }
+                    for label, seconds, ot in zip(week_labels, weekly[i].tolist(), overtime[i].tolist())
+                ],
+                'total_seconds': round(float(weekly[i].sum()), 1),
+                'overtime_seconds': round(float(overtime[i].sum()), 1),
+            })
+
+        return {
+            'start_date': day_labels[0],
+            'end_date': day_labels[-1],
+            'employees': employees,
+        }
+
+
+def week_range(start_date, end_date, week_start=0):
+    """Widen [start_date, end_date] to whole weeks starting on `week_start` (0=Monday)."""
+    start = start_date - timedelta(days=(start_date.weekday() - week_start) % 7)
+    end = end_date + timedelta(days=(week_start - end_date.weekday() - 1) % 7)
+    return start, end
+
+
+def day_boundaries(start_date, days, tz_name):
+    """Epoch seconds of each local midnight from start_date, `days + 1` values."""
+    tz = ZoneInfo(tz_name)
+    return np.array([
+        datetime.combine(start_date + timedelta(days=i), time(0), tzinfo=tz).timestamp()
+        for i in range(days + 1)
+    ])
+
+
+def compute(employee, start, end, parent, start_date, end_date, tz_name,
+            week_start=0, weekly_overtime_hours=40, daily_overtime_hours=None):
+    """
+    Total time per employee per day and week.
+
+    employee: int array of employee ids, one per entry
+    start, end: float arrays of epoch seconds (open entries use "now" as end)
+    parent: int array; for interruptions, index of the interrupted entry in
+        these arrays, otherwise -1
+    """
+    employee = np.asarray(employee, dtype=np.int64)
+    start = np.asarray(start, dtype=np.float64)
+    end = np.asarray(end, dtype=np.float64)
+    parent = np.asarray(parent, dtype=np.int64)
+
+    range_start, range_end = week_range(start_date, end_date, week_start)
+    n_days = (range_end - range_start).days + 1
+    bounds = day_boundaries(range_start, n_days, tz_name)
+    days = [range_start + timedelta(days=i) for i in range(n_days)]
+
+    # Pass 1: positive segment per entry, negative segment per interruption overlap
+    child = np.flatnonzero(parent >= 0)
+    parent_of = parent[child]
+    seg_employee = np.concatenate([employee, employee[parent_of]])
+    seg_start = np.concatenate([start, np.maximum(start[child], start[parent_of])])
+    seg_end = np.concatenate([end, np.minimum(end[child], end[parent_of])])
+    seg_weight = np.concatenate([np.ones(len(start)), -np.ones(len(child))])
+
+    seg_start = np.maximum(seg_start, bounds[0])
+    seg_end = np.minimum(seg_end, bounds[-1])
+    keep = seg_end > seg_start
+    seg_employee, seg_start, seg_end, seg_weight = (
+        seg_employee[keep], seg_start[keep], seg_end[keep], seg_weight[keep]
+    )
+
+    employee_ids, employee_index = np.unique(seg_employee, return_inverse=True)
+    n_employees = len(employee_ids)
+
+    # Pass 2: expand each segment into one piece per local day it touches
+    first = np.searchsorted(bounds, seg_start, side='right') - 1
+    last = np.searchsorted(bounds, seg_end, side='left') - 1
+    counts = last - first + 1
+    piece_seg = np.repeat(np.arange(len(seg_start)), counts)
+    piece_day = first[piece_seg] + (
+        np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    )
+    piece_seconds = (
+        np.minimum(seg_end[piece_seg], bounds[piece_day + 1])
+        - np.maximum(seg_start[piece_seg], bounds[piece_day])
+    ) * seg_weight[piece_seg]
+
+    # Pass 3: aggregate
+    daily = np.bincount(
+        employee_index[piece_seg] * n_days + piece_day,
+        weights=piece_seconds,
+        minlength=n_employees * n_days,
+    ).reshape(n_employees, n_days)
+    # Rounding noise from the +/- segments must not leave tiny negatives
+    np.maximum(daily, 0, out=daily)
+
+    week_index = np.arange(0, n_days, 7)
+    weekly = np.add.reduceat(daily, week_index, axis=1)
+
+    if daily_overtime_hours is not None:
+        # Hours past the daily limit are overtime; weekly overtime applies to the rest
+        daily_ot = np.maximum(daily - daily_overtime_hours * 3600, 0)
+        daily_ot_weekly = np.add.reduceat(daily_ot, week_index, axis=1)
+        overtime = daily_ot_weekly + np.maximum(weekly - daily_ot_weekly - weekly_overtime_hours * 3600, 0)
+    else:
+        overtime = np.maximum(weekly - weekly_overtime_hours * 3600, 0)
+
+    return Timesheet(
+        employee_ids=employee_ids,
+        days=days,
+        daily_seconds=daily,
+        week_starts=days[::7],
+        weekly_seconds=weekly,
+        overtime_seconds=overtime,
+    )
+
+
+def load(start_date, end_date, employee_ids=None, now=None):
+    """
+    Load entries touching the (week-widened) range into arrays for compute().
+
+    Returns (employee, start, end, parent).
+    """
+    from django.conf import settings
+    from django.db.models import Q
+    from django.utils import timezone
+    from .archive import entry_querysets
+
+    range_start, range_end = week_range(start_date, end_date, settings.TIMESHEET_WEEK_START)
+    tz = ZoneInfo(settings.TIME_ZONE)
+    window_start = datetime.combine(range_start, time(0), tzinfo=tz)
+    window_end = datetime.combine(range_end + timedelta(days=1), time(0), tzinfo=tz)
+
+    filters = {'start_time__lt': window_end}
+    if employee_ids:
+        filters['employee_id__in'] = employee_ids
+
+    # Hot and archived entries
+    rows = []
+    for queryset in entry_querysets(Q(end_time__isnull=True) | Q(end_time__gt=window_start), **filters):
+        rows += queryset.order_by().values_list(
+            'id', 'employee_id', 'start_time', 'end_time', 'interrupted_entry_id'
+        )
+    now = (now or timezone.now()).timestamp()
+    count = len(rows)
+
+    ids = np.fromiter((r[0] for r in rows), np.int64, count)
+    employee = np.fromiter((r[1] for r in rows), np.int64, count)
+    start = np.fromiter((r[2].timestamp() for r in rows), np.float64, count)
+    end = np.fromiter((r[3].timestamp() if r[3] else now for r in rows), np.float64, count)
+    parent_ids = np.fromiter((r[4] or 0 for r in rows), np.int64, count)
+    if not count:
+        return employee, start, end, parent_ids
+
+    # Map interrupted_entry ids to array positions; parents outside the window are ignored
+    order = np.argsort(ids)
+    sorted_ids = ids[order]
+    pos = np.minimum(np.searchsorted(sorted_ids, parent_ids), count - 1)
+    found = (parent_ids > 0) & (sorted_ids[pos] == parent_ids)
+    parent = np.where(found, order[pos], -1)
+
+    return employee, start, end, parent
+
+
+def build(start_date, end_date, employee_ids=None, now=None):
+    """Load and compute a timesheet using the project settings."""
+    from django.conf import settings
+
+    employee, start, end, parent = load(start_date, end_date, employee_ids, now)
+    return compute(
+        employee, start, end, parent, start_date, end_date,
+        tz_name=settings.TIME_ZONE,
+        week_start=settings.TIMESHEET_WEEK_START,
+        weekly_overtime_hours=settings.OVERTIME_WEEKLY_HOURS,
+        daily_overtime_hours=settings.OVERTIME_DAILY_HOURS,
+    )
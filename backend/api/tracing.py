@@ -0,0 +1,306 @@
+"""
+Request tracing, exported in the OpenTelemetry format (OTLP/JSON).
+
+With TRACING_ENABLED, TracingMiddleware opens a server span for each
+request and returns its trace in the response headers. When the caller
+sends a W3C `traceparent` header, the request joins the caller's trace:
+
+    traceparent: 00-<trace id>-<server span id>-01
+    X-Trace-Id: <trace id>
+
+Spans are opened inside it around the view, request body parsing, each SQL
+query, photo conversion, media storage calls and response rendering. The
+view span lasts until the response is rendered. A photo upload looks like:
+
+    POST /api/v1/photos/                      server
+      view TimeEntryPhotoViewSet
+        parse multipart/form-data
+        photo.convert
+        storage.exists / storage.save
+        db INSERT
+        storage.url
+        render application/json
+
+TRACE_SAMPLE_RATE of requests are recorded. If the caller sent a
+traceparent, its sampled flag decides instead. Each finished trace is
+appended to TRACE_FILE as one line of OTLP/JSON (an
+ExportTraceServiceRequest). The OpenTelemetry Collector's otlpjsonfile
+receiver can forward that file to Jaeger, Tempo or any OTLP backend.
+TRACE_FILE rotates like the slow-query log.
+
+span() does nothing outside a recorded request, for example in management
+commands or the sweeper.
+"""
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+
+from . import slowlog
+
+# OTLP span kinds
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+STATUS_ERROR = 2
+
+TRACEPARENT = re.compile(r'^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+logger = logging.getLogger('api.traces')
+logger.propagate = False
+
+_trace = ContextVar('api_trace', default=None)
+
+
+class Span:
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'kind', 'attributes', 'start', 'end', 'error')
+
+    def __init__(self, trace, name, kind, attributes, parent_id):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.error = None
+        self.end = None
+        self.start = time.time_ns()
+
+    def finish(self, error=None):
+        self.end = time.time_ns()
+        if error is not None:
+            self.error = error
+        self.trace.close(self)
+
+
+class Trace:
+    """A request's spans: the open ones (innermost last) and the finished ones."""
+
+    def __init__(self, trace_id=None, remote_parent=None):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.remote_parent = remote_parent
+        self.open = []
+        self.finished = []
+
+    def start(self, name, attributes=None, kind=INTERNAL):
+        parent = self.open[-1].span_id if self.open else self.remote_parent
+        span = Span(self, name, kind, attributes or {}, parent)
+        self.open.append(span)
+        return span
+
+    def close(self, span):
+        if span in self.open:
+            self.open.remove(span)
+        self.finished.append(span)
+
+
+@contextmanager
+def span(name, attributes=None, kind=INTERNAL):
+    """Record the block as a span of the current trace (a no-op outside one)."""
+    trace = _trace.get()
+    if trace is None:
+        yield None
+        return
+    current = trace.start(name, attributes, kind)
+    error = None
+    try:
+        yield current
+    except Exception as exc:
+        error = f'{type(exc).__name__}: {exc}'
+        raise
+    finally:
+        current.finish(error)
+
+
+def traced(name):
+    """Decorator form of span()."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _trace.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def query_span(execute, sql, params, many, context):
+    """Execute wrapper opening a span per query (statement without values)."""
+    if _trace.get() is None:
+        return execute(sql, params, many, context)
+    statement = slowlog.normalize(sql)
+    connection = context['connection']
+    attributes = {
+        'db.system': connection.vendor,
+        'db.namespace': connection.alias,
+        'db.statement': statement,
+    }
+    with span(f"db {statement.split(' ', 1)[0].upper()}", attributes, CLIENT):
+        return execute(sql, params, many, context)
+
+
+def install(sender=None, connection=None, **kwargs):
+    """connection_created receiver: trace the new connection's queries."""
+    if query_span not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_span)
+
+
+def connect():
+    connection_created.connect(install, dispatch_uid='api.tracing')
+
+
+def parse_traceparent(header):
+    """(trace id, parent span id, sampled) from a traceparent header, or None."""
+    match = TRACEPARENT.match(header or '')
+    if not match:
+        return None
+    version, trace_id, parent_id, flags = match.groups()
+    if version == 'ff' or trace_id == '0' * 32 or parent_id == '0' * 16:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+def _value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _attributes(attributes):
+    return [{'key': key, 'value': _value(value)} for key, value in attributes.items() if value is not None]
+
+
+def _otlp_span(span):
+    data = {
+        'traceId': span.trace.trace_id,
+        'spanId': span.span_id,
+        'name': span.name,
+        'kind': span.kind,
+        'startTimeUnixNano': str(span.start),
+        'endTimeUnixNano': str(span.end),
+        'attributes': _attributes(span.attributes),
+    }
+    if span.parent_id:
+        data['parentSpanId'] = span.parent_id
+    if span.error:
+        data['status'] = {'code': STATUS_ERROR, 'message': span.error}
+    return data
+
+
+def otlp(trace):
+    """The trace's finished spans as an OTLP/JSON ExportTraceServiceRequest."""
+    return {'resourceSpans': [{
+        'resource': {'attributes': _attributes({'service.name': settings.TRACE_SERVICE_NAME})},
+        'scopeSpans': [{
+            'scope': {'name': __name__},
+            'spans': [_otlp_span(span) for span in trace.finished],
+        }],
+    }]}
+
+
+_handler_lock = threading.Lock()
+
+
+def export(trace):
+    if not logger.handlers:
+        with _handler_lock:
+            if not logger.handlers:
+                handler = slowlog.SharedRotatingFileHandler(
+                    settings.TRACE_FILE,
+                    maxBytes=settings.TRACE_FILE_BYTES,
+                    backupCount=settings.TRACE_FILE_BACKUPS,
+                    delay=True,
+                )
+                logger.addHandler(handler)
+                logger.setLevel(logging.INFO)
+    logger.info(json.dumps(otlp(trace)))
+
+
+class TracingMiddleware:
+    """Open the server span and propagate the trace (outermost, see module docstring)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.TRACING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        trace, server = self.begin(request)
+        token = _trace.set(trace if server else None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _trace.reset(token)
+        return self.end(request, response, trace, server)
+
+    async def __acall__(self, request):
+        trace, server = self.begin(request)
+        token = _trace.set(trace if server else None)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _trace.reset(token)
+        return self.end(request, response, trace, server)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        trace = _trace.get()
+        if trace is not None:
+            trace.start(f'view {view_func.__name__}', {'code.namespace': view_func.__module__})
+
+    def begin(self, request):
+        """The request's trace, and its server span if it is sampled."""
+        parent = parse_traceparent(request.META.get('HTTP_TRACEPARENT'))
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+            trace = Trace(trace_id, parent_id)
+        else:
+            trace = Trace()
+            sampled = random.random() < settings.TRACE_SAMPLE_RATE
+        if not sampled:
+            return trace, None
+        server = trace.start(request.method, {
+            'http.request.method': request.method,
+            'url.path': request.path,
+        }, SERVER)
+        return trace, server
+
+    def end(self, request, response, trace, server):
+        if server is not None:
+            # The view span, and any span a failed view left open
+            for span in reversed(trace.open[1:]):
+                span.finish()
+            match = getattr(request, 'resolver_match', None)
+            if match is not None:
+                # Router URLs are regexes ending in $
+                route = '/' + match.route.removesuffix('$')
+                server.name = f'{request.method} {route}'
+                server.attributes['http.route'] = route
+                server.attributes['django.view'] = match.view_name
+            server.attributes['http.response.status_code'] = response.status_code
+            server.finish(f'HTTP {response.status_code}' if response.status_code >= 500 else None)
+            export(trace)
+
+        span_id = server.span_id if server is not None else os.urandom(8).hex()
+        response['traceparent'] = f"00-{trace.trace_id}-{span_id}-{'01' if server is not None else '00'}"
+        response['X-Trace-Id'] = trace.trace_id
+        return response
@@ -0,0 +1,161 @@
+"""
+Typeahead over active employees and jobs, answered from memory.
+
+    GET /api/v1/typeahead/?q=wrp ma&type=job_category,job_code&limit=10
+
+    {"results": [
+        {"type": "job_code", "id": 41, "label": "WRP - Maple St", "category": 3},
+        {"type": "job_code", "id": 57, "label": "WRP - Marina", "category": 3}]}
+
+Each worker keeps a PrefixIndex built from its reference data snapshot
+(api/refdata.py). The snapshot is replaced whenever an employee, category
+or job code is saved or deleted in any worker, and the index is rebuilt
+with it on the next lookup.
+
+Names are split into words, lowercased and stripped of diacritics, and
+kept in one sorted list, so the items having a word that starts with a
+query word are a bisect away; an item matches when every query word starts
+one of its words. Employees match on first and last name,
+categories on name and alias, job codes on name, alias and their
+category's name ("wrp ma" finds WRP's Maple St).
+
+Ranking, best first: the label starts with the query (or an alias equals
+it), then the query's first word starts the item's own first word, then
+other own-word matches, then matches needing the category's name; ties go
+to the shorter label, then alphabetical.
+"""
+import re
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+
+from . import refdata
+from .search import fold
+
+KINDS = ('employee', 'job_category', 'job_code')
+
+_WORD = re.compile(r'\w+')
+_lock = threading.Lock()
+_index = None
+
+
+def words(text):
+    return _WORD.findall(fold(text))
+
+
+class Item:
+    __slots__ = ('kind', 'result', 'label', 'own', 'aliases', 'inherited', 'words')
+
+    def __init__(self, kind, result, own, aliases=(), inherited=()):
+        self.kind = kind
+        self.result = result
+        self.label = ' '.join(words(result['label']))
+        # Own words (name, then aliases), the aliases as typed, and words from the parent's name
+        self.own = words(' '.join([own, *aliases]))
+        self.aliases = {' '.join(words(alias)) for alias in aliases if alias}
+        self.inherited = words(' '.join(inherited))
+        self.words = {*self.own, *self.inherited}
+
+
+class Sorted:
+    """(key, item number) pairs sorted by key, for prefix lookups."""
+
+    def __init__(self, pairs):
+        pairs = sorted(pairs)
+        self.keys = [key for key, _ in pairs]
+        self.owners = [n for _, n in pairs]
+
+    def starting_with(self, prefix):
+        """Numbers of the items with a key starting with prefix."""
+        low = bisect_left(self.keys, prefix)
+        high = bisect_left(self.keys, prefix + '\U0010ffff', low)
+        return set(self.owners[low:high])
+
+
+class PrefixIndex:
+    """Prefix lookups over the employees and jobs of one reference data snapshot."""
+
+    def __init__(self, snapshot):
+        self.version = snapshot.version
+        items = [
+            Item('employee', {'type': 'employee', 'id': e.id, 'label': e.full_name}, f'{e.first_name} {e.last_name}')
+            for e in snapshot.employees.values()
+        ]
+        items += [
+            Item('job_category', {'type': 'job_category', 'id': c.id, 'label': c.name}, c.name, [c.alias])
+            for c in snapshot.categories.values()
+        ]
+        items += [
+            Item(
+                'job_code',
+                {'type': 'job_code', 'id': code.id, 'label': f'{code.category.name} - {code.name}',
+                 'category': code.category_id},
+                code.name, [code.alias], [code.category.name],
+            )
+            for code in snapshot.job_codes.values()
+            # Codes of inactive categories cannot be clocked into
+            if code.category_id in snapshot.categories
+        ]
+
+        # Item numbers follow the tie-break order, so each tier comes out best first
+        items.sort(key=lambda item: (len(item.label), item.label))
+        self.items = items
+        self.kinds = {kind: {n for n, item in enumerate(items) if item.kind == kind} for kind in KINDS}
+        self.words = Sorted((word, n) for n, item in enumerate(items) for word in item.words)
+        self.labels = Sorted((item.label, n) for n, item in enumerate(items))
+        self.first_words = Sorted((item.own[0], n) for n, item in enumerate(items) if item.own)
+        self.aliases = {}
+        for n, item in enumerate(items):
+            for alias in item.aliases:
+                self.aliases.setdefault(alias, set()).add(n)
+
+    def lookup(self, text, kinds=None, limit=None):
+        """The best `limit` matches for text as result dicts, optionally only of some kinds."""
+        terms = words(text)
+        if not terms:
+            return []
+        query = ' '.join(terms)
+        limit = min(limit or settings.TYPEAHEAD_LIMIT, settings.TYPEAHEAD_MAX_LIMIT)
+
+        candidates = set.intersection(*(self.words.starting_with(term) for term in set(terms)))
+        if kinds:
+            candidates &= set().union(*(self.kinds[kind] for kind in kinds))
+
+        # Tiers 0 and 1 come straight from their own sorted lists
+        found = []
+        best = candidates & (self.labels.starting_with(query) | self.aliases.get(query, set()))
+        found += sorted(best)
+        if len(found) < limit:
+            first = (candidates & self.first_words.starting_with(terms[0])) - best
+            found += sorted(first)
+            best |= first
+        # Tiers 2 and 3 are told apart item by item, only until the page is full
+        inherited = []
+        for n in sorted(candidates - best) if len(found) < limit else ():
+            if len(found) >= limit:
+                break
+            own = self.items[n].own
+            if all(any(word.startswith(term) for word in own) for term in terms):
+                found.append(n)
+            else:
+                inherited.append(n)
+        found += inherited
+        return [self.items[n].result for n in found[:limit]]
+
+
+def index():
+    """The index for the current reference data, rebuilt when it changed."""
+    global _index
+    snapshot = refdata.snapshot()
+    current = _index
+    if current is not None and current.version == snapshot.version:
+        return current
+    with _lock:
+        if _index is None or _index.version != snapshot.version:
+            _index = PrefixIndex(snapshot)
+        return _index
+
+
+def lookup(text, kinds=None, limit=None):
+    return index().lookup(text, kinds, limit)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
@@ -5,10 +6,12 @@ from .views import (
     EmployeeViewSet, JobCodeCategoryViewSet, JobCodeViewSet, TimeEntryViewSet,
     ClockStartView, ClockStopView, InterruptedStartView, InterruptedStopView,
     ActivityTagViewSet, VerifyPinView, TimeEntryPhotoViewSet,
-    SessionStartView, SessionStopView, SessionSwitchView, SessionTagsView, ActiveSessionView,
-    InsightsRoleHoursView, InsightsTagDistributionView, InsightsPatternsView,
-    admin_list_employees, admin_add_employee, admin_set_pin, admin_delete_employee, admin_seed_data
+    SessionStartView, SessionStopView, SessionSwitchView, SessionTagsView, ActiveSessionView, ChangesView, SearchView, TypeaheadView,
+    InsightsRoleHoursView, InsightsTagDistributionView, InsightsPatternsView, TimesheetView,
+    admin_list_employees, admin_add_employee, admin_import_employees, admin_set_pin, admin_delete_employee, admin_seed_data,
+    admin_pin_throttle_stats, admin_slow_queries, admin_profiles, admin_profile_detail, admin_profile_raw
 )
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'employees', EmployeeViewSet)
@@ -33,14 +36,36 @@ urlpatterns = [
     path('sessions/switch/', SessionSwitchView.as_view(), name='session-switch'),
     path('sessions/<int:session_id>/tags/', SessionTagsView.as_view(), name='session-tags'),
     path('sessions/active/', ActiveSessionView.as_view(), name='session-active'),
+    # Delta sync for offline clients
+    path('changes/', ChangesView.as_view(), name='changes'),
+    # Full-text search
+    path('search/', SearchView.as_view(), name='search'),
+    path('typeahead/', TypeaheadView.as_view(), name='typeahead'),
     # Insights endpoints
     path('insights/role-hours/', InsightsRoleHoursView.as_view(), name='insights-role-hours'),
     path('insights/tag-distribution/', InsightsTagDistributionView.as_view(), name='insights-tag-distribution'),
     path('insights/patterns/', InsightsPatternsView.as_view(), name='insights-patterns'),
+    # Timesheets
+    path('timesheets/', TimesheetView.as_view(), name='timesheets'),
     # Admin API (protected by ADMIN_API_KEY)
     path('admin/employees/', admin_list_employees, name='admin-list-employees'),
     path('admin/employees/add/', admin_add_employee, name='admin-add-employee'),
+    path('admin/employees/import/', admin_import_employees, name='admin-import-employees'),
     path('admin/employees/<int:employee_id>/set-pin/', admin_set_pin, name='admin-set-pin'),
     path('admin/employees/<int:employee_id>/delete/', admin_delete_employee, name='admin-delete-employee'),
     path('admin/seed/', admin_seed_data, name='admin-seed-data'),
+    path('admin/pin-throttle/', admin_pin_throttle_stats, name='admin-pin-throttle'),
+    path('admin/slow-queries/', admin_slow_queries, name='admin-slow-queries'),
+    path('admin/profiles/', admin_profiles, name='admin-profiles'),
+    path('admin/profiles/<str:profile_id>/', admin_profile_detail, name='admin-profile-detail'),
+    path('admin/profiles/<str:profile_id>/raw/', admin_profile_raw, name='admin-profile-raw'),
 ]
+
+# Async fast path for the polling endpoints; these shadow the sync routes above
+if settings.ASYNC_READ_VIEWS:
+    urlpatterns = [
+        path('sessions/active/', async_views.active_session, name='session-active-async'),
+        path('employees/<int:pk>/current_entry/', async_views.current_entry, name='employee-current-entry-async'),
+        path('jobs/categories/', async_views.job_categories, name='jobcodecategory-list-async'),
+        path('tags/for-role/<str:role_id>/', async_views.tags_for_role, name='activitytag-for-role-async'),
+    ] + urlpatterns
@@ -1,13 +1,14 @@
-from django.utils import timezone
+from django.db import transaction
 from django.db.models import Q
+from django.utils import timezone
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import FormParser
 
-from .models import Employee, JobCodeCategory, JobCode, TimeEntry, ActivityTag, TimeEntryPhoto
+from .models import Employee, JobCodeCategory, JobCode, TimeEntry, ActivityTag, TimeEntryPhoto, ArchivedTimeEntry
 from .serializers import (
     EmployeeSerializer, JobCodeCategorySerializer, JobCodeSerializer,
     TimeEntrySerializer, TimeEntryDetailSerializer,
@@ -17,6 +18,43 @@ from .serializers import (
     SessionStartSerializer, SessionStopSerializer, SessionSwitchSerializer, SessionTagUpdateSerializer,
     VerifyPinSerializer, SetPinSerializer, TimeEntryPhotoSerializer
 )
+from . import refdata, typeahead
+from .changes import changes_since
+from .search import KINDS as SEARCH_KINDS, search
+from .entry_rows import build_rows, row_values
+from .fieldsets import Selection, SelectionViewMixin
+from .renderers import TracedMultiPartParser
+from .employee_import import parse as parse_employee_file, import_employees
+from .throttling import PinAttemptThrottle, timed_hash, get_stats as get_pin_throttle_stats
+
+
+def entry_selection(request):
+    """?fields=/?expand= for responses built from TimeEntryDetailSerializer."""
+    return Selection.from_request(request, TimeEntryDetailSerializer)
+
+
+def entry_data(entry, selection=None):
+    return TimeEntryDetailSerializer(entry, context={'selection': selection}).data
+
+
+def request_device(request):
+    """
+    The kiosk sending the request, from its X-Device-Key header, and the
+    error response for an unknown key. Without the header the device is
+    None: unregistered kiosks share the sessions that have no device.
+    """
+    key = request.headers.get('X-Device-Key')
+    if not key:
+        return None, None
+    device = refdata.get_device(key)
+    if device is None:
+        return None, Response({'error': 'Unknown device'}, status=status.HTTP_403_FORBIDDEN)
+    return device, None
+
+
+def device_sessions(device):
+    """A device's open sessions (timeentry_device_open_idx)."""
+    return TimeEntry.objects.filter(device=device, end_time__isnull=True)
 
 
 class EmployeeViewSet(viewsets.ModelViewSet):
@@ -28,26 +66,30 @@ class EmployeeViewSet(viewsets.ModelViewSet):
     def current_entry(self, request, pk=None):
         """Get the current active time entry for an employee."""
         employee = self.get_object()
+        selection = entry_selection(request)
         # Get active entry (no end_time, not paused)
         active_entry = TimeEntry.objects.filter(
             employee=employee,
             end_time__isnull=True
-        ).order_by('-start_time').first()
+        )
+        if selection is not None:
+            active_entry = selection.plan(active_entry)
+        active_entry = active_entry.order_by('-start_time').first()
 
         if not active_entry:
             return Response({'current_entry': None})
 
-        serializer = TimeEntryDetailSerializer(active_entry)
-        return Response({'current_entry': serializer.data})
+        return Response({'current_entry': entry_data(active_entry, selection)})
 
-    @action(detail=True, methods=['post'], url_path='set-pin')
+    @action(detail=True, methods=['post'], url_path='set-pin', throttle_classes=[PinAttemptThrottle])
     def set_pin(self, request, pk=None):
         """Set the PIN for an employee."""
         employee = self.get_object()
         serializer = SetPinSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        employee.set_pin(serializer.validated_data['pin'])
+        with timed_hash():
+            employee.set_pin(serializer.validated_data['pin'])
         employee.save()
 
         return Response({'success': True, 'message': 'PIN set successfully'})
@@ -55,6 +97,7 @@ class EmployeeViewSet(viewsets.ModelViewSet):
 
 class VerifyPinView(APIView):
     """Verify an employee's PIN."""
+    throttle_classes = [PinAttemptThrottle]
 
     def post(self, request):
         serializer = VerifyPinSerializer(data=request.data)
@@ -77,7 +120,10 @@ class VerifyPinView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if employee.check_pin(pin):
+        with timed_hash():
+            valid = employee.check_pin(pin)
+
+        if valid:
             return Response({
                 'valid': True,
                 'employee': EmployeeSerializer(employee).data
@@ -89,7 +135,7 @@ class VerifyPinView(APIView):
             )
 
 
-class JobCodeCategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class JobCodeCategoryViewSet(SelectionViewMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for job code categories."""
     queryset = JobCodeCategory.objects.filter(is_active=True).prefetch_related('job_codes')
     serializer_class = JobCodeCategorySerializer
@@ -101,7 +147,7 @@ class JobCodeViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = JobCodeSerializer
 
 
-class TimeEntryViewSet(viewsets.ModelViewSet):
+class TimeEntryViewSet(SelectionViewMixin, viewsets.ModelViewSet):
     """ViewSet for time entries (admin CRUD)."""
     queryset = TimeEntry.objects.all().select_related('employee', 'job_category', 'job_code')
     serializer_class = TimeEntrySerializer
@@ -111,29 +157,81 @@ class TimeEntryViewSet(viewsets.ModelViewSet):
             return TimeEntryDetailSerializer
         return TimeEntrySerializer
 
-    def get_queryset(self):
-        queryset = super().get_queryset()
+    def entry_filters(self):
+        """The list filters as a Q, which applies to live and archived entries alike."""
+        filters = Q()
 
         # Filter by employee
         employee_id = self.request.query_params.get('employee')
         if employee_id:
-            queryset = queryset.filter(employee_id=employee_id)
+            filters &= Q(employee_id=employee_id)
 
         # Filter by job category
         job_category_id = self.request.query_params.get('job_category')
         if job_category_id:
-            queryset = queryset.filter(job_category_id=job_category_id)
+            filters &= Q(job_category_id=job_category_id)
 
         # Filter by date range
         start_date = self.request.query_params.get('start_date')
         if start_date:
-            queryset = queryset.filter(start_time__date__gte=start_date)
+            filters &= Q(start_time__date__gte=start_date)
 
         end_date = self.request.query_params.get('end_date')
         if end_date:
-            queryset = queryset.filter(start_time__date__lte=end_date)
+            filters &= Q(start_time__date__lte=end_date)
 
-        return queryset
+        # Entries auto-closed by the stale entry sweeper
+        needs_review = self.request.query_params.get('needs_review')
+        if needs_review:
+            filters &= Q(needs_review=needs_review.lower() == 'true')
+
+        return filters
+
+    def get_queryset(self):
+        return super().get_queryset().filter(self.entry_filters())
+
+    def list(self, request, *args, **kwargs):
+        selection = self.get_selection()
+        if selection is not None and selection.expanded - {'activity_tags'}:
+            # Nested objects: serialize the planned queryset
+            return super().list(request, *args, **kwargs)
+
+        # Rows are built from values() rather than TimeEntrySerializer (same output)
+        fields = selection.fields if selection is not None else None
+        expand_tags = selection is None or 'activity_tags' in selection.expanded
+        queryset = self.filter_queryset(self.get_queryset())
+
+        # Entries moved to cold storage (api/archive.py) keep their ids and columns, so
+        # when any match the filters the page is read from both tables
+        archived = ArchivedTimeEntry.objects.filter(self.entry_filters())
+        include_archive = archived.exists()
+        if include_archive:
+            queryset = row_values(queryset).order_by().union(row_values(archived).order_by()).order_by(
+                '-start_time', '-id'
+            )
+        else:
+            queryset = row_values(queryset, fields)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(build_rows(page, fields, expand_tags, include_archive))
+        return Response(build_rows(queryset, fields, expand_tags, include_archive))
+
+    @action(detail=False, methods=['get'])
+    def overlaps(self, request):
+        """Find overlapping entries per employee (honours the list filters)."""
+        from itertools import islice
+        from .overlaps import find_overlaps
+
+        try:
+            limit = int(request.query_params.get('limit', 500))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 0:
+            return Response({'error': 'limit must not be negative'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = list(islice(find_overlaps(self.get_queryset()), limit + 1))
+        return Response({'overlaps': results[:limit], 'truncated': len(results) > limit})
 
 
 class ClockStartView(APIView):
@@ -142,15 +240,15 @@ class ClockStartView(APIView):
     def post(self, request):
         serializer = ClockStartSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        selection = entry_selection(request)
 
         employee_id = serializer.validated_data['employee_id']
         job_category_id = serializer.validated_data.get('job_category_id')
         job_code_id = serializer.validated_data.get('job_code_id')
         description = serializer.validated_data.get('description', '')
 
-        try:
-            employee = Employee.objects.get(id=employee_id, is_active=True)
-        except Employee.DoesNotExist:
+        employee = refdata.get_employee(employee_id)
+        if not employee:
             return Response(
                 {'error': 'Employee not found'},
                 status=status.HTTP_404_NOT_FOUND
@@ -161,18 +259,16 @@ class ClockStartView(APIView):
         job_code = None
 
         if job_code_id:
-            try:
-                job_code = JobCode.objects.get(id=job_code_id, is_active=True)
-                job_category = job_code.category
-            except JobCode.DoesNotExist:
+            job_code = refdata.get_job_code(job_code_id)
+            if not job_code:
                 return Response(
                     {'error': 'Job code not found'},
                     status=status.HTTP_404_NOT_FOUND
                 )
+            job_category = job_code.category
         elif job_category_id:
-            try:
-                job_category = JobCodeCategory.objects.get(id=job_category_id, is_active=True)
-            except JobCodeCategory.DoesNotExist:
+            job_category = refdata.get_category(job_category_id)
+            if not job_category:
                 return Response(
                     {'error': 'Job category not found'},
                     status=status.HTTP_404_NOT_FOUND
@@ -199,7 +295,7 @@ class ClockStartView(APIView):
         )
 
         return Response(
-            TimeEntryDetailSerializer(entry).data,
+            entry_data(entry, selection),
             status=status.HTTP_201_CREATED
         )
 
@@ -210,6 +306,7 @@ class ClockStopView(APIView):
     def post(self, request):
         serializer = ClockStopSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        selection = entry_selection(request)
 
         employee_id = serializer.validated_data['employee_id']
 
@@ -244,7 +341,7 @@ class ClockStopView(APIView):
         active_entry.end_time = timezone.now()
         active_entry.save()
 
-        return Response(TimeEntryDetailSerializer(active_entry).data)
+        return Response(entry_data(active_entry, selection))
 
 
 class InterruptedStartView(APIView):
@@ -253,6 +350,7 @@ class InterruptedStartView(APIView):
     def post(self, request):
         serializer = InterruptedStartSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        selection = entry_selection(request)
 
         employee_id = serializer.validated_data['employee_id']
         job_category_id = serializer.validated_data.get('job_category_id')
@@ -327,7 +425,7 @@ class InterruptedStartView(APIView):
         )
 
         return Response(
-            TimeEntryDetailSerializer(interruption_entry).data,
+            entry_data(interruption_entry, selection),
             status=status.HTTP_201_CREATED
         )
 
@@ -338,6 +436,7 @@ class InterruptedStopView(APIView):
     def post(self, request):
         serializer = InterruptedStopSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        selection = entry_selection(request)
 
         employee_id = serializer.validated_data['employee_id']
 
@@ -375,12 +474,12 @@ class InterruptedStopView(APIView):
             original_entry.is_paused = False
             original_entry.save()
             return Response({
-                'closed_interruption': TimeEntryDetailSerializer(interruption_entry).data,
-                'resumed_entry': TimeEntryDetailSerializer(original_entry).data
+                'closed_interruption': entry_data(interruption_entry, selection),
+                'resumed_entry': entry_data(original_entry, selection)
             })
 
         return Response({
-            'closed_interruption': TimeEntryDetailSerializer(interruption_entry).data,
+            'closed_interruption': entry_data(interruption_entry, selection),
             'resumed_entry': None
         })
 
@@ -400,27 +499,37 @@ class ActivityTagViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'], url_path='for-role/(?P<role_id>[^/.]+)')
     def for_role(self, request, role_id=None):
         """Get tags available for a specific role (global + role-specific)."""
-        tags = self.queryset.filter(Q(role__isnull=True) | Q(role_id=role_id))
+        tags = refdata.tags_for_role(role_id)
         serializer = self.get_serializer(tags, many=True)
         return Response(serializer.data)
 
 
 class SessionStartView(APIView):
-    """Start a new session (role-based, no employee required)."""
+    """Start a new session (role-based) on the requesting device."""
 
     def post(self, request):
         serializer = SessionStartSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        selection = entry_selection(request)
+        device, error = request_device(request)
+        if error:
+            return error
 
+        employee_id = serializer.validated_data['employee_id']
         role_id = serializer.validated_data['role_id']
         job_code_id = serializer.validated_data.get('job_code_id')
-        performer_name = serializer.validated_data.get('performer_name', '')
         activity_tag_ids = serializer.validated_data.get('activity_tag_ids', [])
 
+        employee = refdata.get_employee(employee_id)
+        if not employee:
+            return Response(
+                {'error': 'Employee not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
         # Get role (job category)
-        try:
-            role = JobCodeCategory.objects.get(id=role_id, is_active=True)
-        except JobCodeCategory.DoesNotExist:
+        role = refdata.get_category(role_id)
+        if not role:
             return Response(
                 {'error': 'Role not found'},
                 status=status.HTTP_404_NOT_FOUND
@@ -429,36 +538,35 @@ class SessionStartView(APIView):
         # Get job code if provided
         job_code = None
         if job_code_id:
-            try:
-                job_code = JobCode.objects.get(id=job_code_id, is_active=True)
-                if job_code.category_id != role_id:
-                    return Response(
-                        {'error': 'Job code does not belong to the specified role'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            except JobCode.DoesNotExist:
+            job_code = refdata.get_job_code(job_code_id)
+            if not job_code:
                 return Response(
                     {'error': 'Job code not found'},
                     status=status.HTTP_404_NOT_FOUND
                 )
+            if job_code.category_id != role_id:
+                return Response(
+                    {'error': 'Job code does not belong to the specified role'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
         now = timezone.now()
 
         # Create new session
         session = TimeEntry.objects.create(
+            employee=employee,
             job_category=role,
             job_code=job_code,
-            start_time=now,
-            performer_name=performer_name
+            device=device,
+            start_time=now
         )
 
         # Add activity tags if provided
         if activity_tag_ids:
-            tags = ActivityTag.objects.filter(id__in=activity_tag_ids, is_active=True)
-            session.activity_tags.set(tags)
+            session.activity_tags.set(refdata.get_tags(activity_tag_ids))
 
         return Response(
-            TimeEntryDetailSerializer(session).data,
+            entry_data(session, selection),
             status=status.HTTP_201_CREATED
         )
 
@@ -469,23 +577,25 @@ class SessionStopView(APIView):
     def post(self, request):
         serializer = SessionStopSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        selection = entry_selection(request)
+        device, error = request_device(request)
+        if error:
+            return error
 
         session_id = serializer.validated_data.get('session_id')
 
         if session_id:
+            # Only this device's sessions: one kiosk must not end another's
             try:
-                session = TimeEntry.objects.get(id=session_id, end_time__isnull=True)
+                session = device_sessions(device).get(id=session_id)
             except TimeEntry.DoesNotExist:
                 return Response(
                     {'error': 'Active session not found'},
                     status=status.HTTP_404_NOT_FOUND
                 )
         else:
-            # Stop the most recent active session
-            session = TimeEntry.objects.filter(
-                end_time__isnull=True,
-                is_paused=False
-            ).order_by('-start_time').first()
+            # Stop this device's most recent active session
+            session = device_sessions(device).filter(is_paused=False).order_by('-start_time').first()
 
             if not session:
                 return Response(
@@ -496,24 +606,34 @@ class SessionStopView(APIView):
         session.end_time = timezone.now()
         session.save()
 
-        return Response(TimeEntryDetailSerializer(session).data)
+        return Response(entry_data(session, selection))
 
 
 class SessionSwitchView(APIView):
-    """Switch from current role to a new role (ends current, starts new)."""
+    """Switch the requesting device from its current role to a new one (ends current, starts new)."""
 
     def post(self, request):
         serializer = SessionSwitchSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        selection = entry_selection(request)
+        device, error = request_device(request)
+        if error:
+            return error
 
+        employee_id = serializer.validated_data['employee_id']
         role_id = serializer.validated_data['role_id']
         job_code_id = serializer.validated_data.get('job_code_id')
-        performer_name = serializer.validated_data.get('performer_name', '')
+
+        employee = refdata.get_employee(employee_id)
+        if not employee:
+            return Response(
+                {'error': 'Employee not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
 
         # Get new role
-        try:
-            role = JobCodeCategory.objects.get(id=role_id, is_active=True)
-        except JobCodeCategory.DoesNotExist:
+        role = refdata.get_category(role_id)
+        if not role:
             return Response(
                 {'error': 'Role not found'},
                 status=status.HTTP_404_NOT_FOUND
@@ -522,43 +642,44 @@ class SessionSwitchView(APIView):
         # Get job code if provided
         job_code = None
         if job_code_id:
-            try:
-                job_code = JobCode.objects.get(id=job_code_id, is_active=True)
-                if job_code.category_id != role_id:
-                    return Response(
-                        {'error': 'Job code does not belong to the specified role'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            except JobCode.DoesNotExist:
+            job_code = refdata.get_job_code(job_code_id)
+            if not job_code:
                 return Response(
                     {'error': 'Job code not found'},
                     status=status.HTTP_404_NOT_FOUND
                 )
+            if job_code.category_id != role_id:
+                return Response(
+                    {'error': 'Job code does not belong to the specified role'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
         now = timezone.now()
 
-        # End current active session(s)
+        with transaction.atomic():
+            # End this device's active session(s) in one statement; other kiosks' rows are not touched
+            active_sessions = list(device_sessions(device).filter(is_paused=False))
+            TimeEntry.objects.filter(id__in=[session.id for session in active_sessions]).update(
+                end_time=now, updated_at=now
+            )
+
+            # Start new session
+            new_session = TimeEntry.objects.create(
+                employee=employee,
+                job_category=role,
+                job_code=job_code,
+                device=device,
+                start_time=now
+            )
+
         ended_sessions = []
-        active_sessions = TimeEntry.objects.filter(
-            end_time__isnull=True,
-            is_paused=False
-        )
         for session in active_sessions:
-            session.end_time = now
-            session.save()
-            ended_sessions.append(TimeEntryDetailSerializer(session).data)
-
-        # Start new session
-        new_session = TimeEntry.objects.create(
-            job_category=role,
-            job_code=job_code,
-            start_time=now,
-            performer_name=performer_name
-        )
+            session.end_time = session.updated_at = now
+            ended_sessions.append(entry_data(session, selection))
 
         return Response({
             'ended_sessions': ended_sessions,
-            'new_session': TimeEntryDetailSerializer(new_session).data
+            'new_session': entry_data(new_session, selection)
         }, status=status.HTTP_201_CREATED)
 
 
@@ -568,11 +689,15 @@ class SessionTagsView(APIView):
     def patch(self, request, session_id):
         serializer = SessionTagUpdateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        selection = entry_selection(request)
+        device, error = request_device(request)
+        if error:
+            return error
 
         tag_ids = serializer.validated_data['tag_ids']
 
         try:
-            session = TimeEntry.objects.get(id=session_id, end_time__isnull=True)
+            session = device_sessions(device).get(id=session_id)
         except TimeEntry.DoesNotExist:
             return Response(
                 {'error': 'Active session not found'},
@@ -583,68 +708,145 @@ class SessionTagsView(APIView):
         tags = ActivityTag.objects.filter(id__in=tag_ids, is_active=True)
         session.activity_tags.set(tags)
 
-        return Response(TimeEntryDetailSerializer(session).data)
+        return Response(entry_data(session, selection))
 
 
 class ActiveSessionView(APIView):
-    """Get the current active session (for role-based tracking without employee)."""
+    """Get the requesting device's current active session."""
 
     def get(self, request):
-        # Get the most recent active session
-        session = TimeEntry.objects.filter(
-            end_time__isnull=True,
+        # Get the device's most recent active session
+        selection = entry_selection(request)
+        device, error = request_device(request)
+        if error:
+            return error
+        session = device_sessions(device).filter(
             is_paused=False
         ).select_related(
             'employee', 'job_category', 'job_code'
-        ).prefetch_related('activity_tags').order_by('-start_time').first()
+        ).prefetch_related('activity_tags')
+        if selection is not None:
+            session = selection.plan(session)
+        session = session.order_by('-start_time').first()
 
         if not session:
             return Response({'active_session': None})
 
         return Response({
-            'active_session': TimeEntryDetailSerializer(session).data
+            'active_session': entry_data(session, selection)
         })
 
 
+class ChangesView(APIView):
+    """Delta feed of changed and deleted rows since a cursor (see api/changes.py)."""
+
+    def get(self, request):
+        try:
+            since = int(request.query_params.get('since', 0))
+            limit = int(request.query_params.get('limit', 0))
+        except ValueError:
+            return Response(
+                {'error': 'since and limit must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if since < 0 or limit < 0:
+            return Response(
+                {'error': 'since and limit must not be negative'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(changes_since(since, limit, {'request': request}))
+
+
+class SearchView(APIView):
+    """Ranked full-text search over people, jobs, entry descriptions and photo captions (see api/search.py)."""
+
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        kinds = [kind for kind in request.query_params.get('type', '').split(',') if kind]
+        unknown = [kind for kind in kinds if kind not in SEARCH_KINDS]
+        if unknown:
+            return Response(
+                {'error': f"Unknown type: {', '.join(unknown)} (one of {', '.join(SEARCH_KINDS)})"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = int(request.query_params.get('limit', 0))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 0:
+            return Response({'error': 'limit must not be negative'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'query': text, 'results': search(text, kinds, limit)})
+
+
+class TypeaheadView(APIView):
+    """Ranked name-prefix matches over active employees and jobs, from memory (see api/typeahead.py)."""
+
+    def get(self, request):
+        text = request.query_params.get('q', '')
+        kinds = [kind for kind in request.query_params.get('type', '').split(',') if kind]
+        unknown = [kind for kind in kinds if kind not in typeahead.KINDS]
+        if unknown:
+            return Response(
+                {'error': f"Unknown type: {', '.join(unknown)} (one of {', '.join(typeahead.KINDS)})"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = int(request.query_params.get('limit', 0))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 0:
+            return Response({'error': 'limit must not be negative'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'results': typeahead.lookup(text, kinds, limit)})
+
+
 class InsightsRoleHoursView(APIView):
     """Get hours breakdown by role for a date range."""
 
     def get(self, request):
+        from django.db import models
         from django.db.models import Sum, F
-        from django.db.models.functions import Coalesce
-        from datetime import timedelta
+        from .archive import entry_querysets
 
         # Parse date range (default: last 7 days)
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
 
-        queryset = TimeEntry.objects.filter(end_time__isnull=False)
-
+        filters = {'end_time__isnull': False}
         if start_date:
-            queryset = queryset.filter(start_time__date__gte=start_date)
+            filters['start_time__date__gte'] = start_date
         if end_date:
-            queryset = queryset.filter(start_time__date__lte=end_date)
-
-        # Aggregate hours by role (job_category)
-        role_hours = queryset.values(
-            'job_category__id', 'job_category__name'
-        ).annotate(
-            total_seconds=Sum(
-                F('end_time') - F('start_time'),
-                output_field=models.DurationField()
-            )
-        ).order_by('-total_seconds')
-
-        results = []
-        for item in role_hours:
-            if item['total_seconds']:
-                total_seconds = item['total_seconds'].total_seconds()
-                results.append({
-                    'role_id': item['job_category__id'],
-                    'role_name': item['job_category__name'],
-                    'total_hours': round(total_seconds / 3600, 2),
-                    'total_seconds': total_seconds
-                })
+            filters['start_time__date__lte'] = end_date
+
+        # Aggregate hours by role (job_category), across hot and archived entries
+        totals = {}
+        for queryset in entry_querysets(**filters):
+            role_hours = queryset.values(
+                'job_category__id', 'job_category__name'
+            ).annotate(
+                total_seconds=Sum(
+                    F('end_time') - F('start_time'),
+                    output_field=models.DurationField()
+                )
+            ).order_by()
+            for item in role_hours:
+                if item['total_seconds']:
+                    key = (item['job_category__id'], item['job_category__name'])
+                    totals[key] = totals.get(key, 0) + item['total_seconds'].total_seconds()
+
+        results = [
+            {
+                'role_id': role_id,
+                'role_name': role_name,
+                'total_hours': round(total_seconds / 3600, 2),
+                'total_seconds': total_seconds
+            }
+            for (role_id, role_name), total_seconds in sorted(totals.items(), key=lambda kv: -kv[1])
+        ]
 
         return Response({'role_hours': results})
 
@@ -654,34 +856,45 @@ class InsightsTagDistributionView(APIView):
 
     def get(self, request):
         from django.db.models import Count
+        from .archive import entry_querysets
 
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
         role_id = request.query_params.get('role_id')
 
-        queryset = TimeEntry.objects.filter(end_time__isnull=False)
-
+        filters = {'end_time__isnull': False}
         if start_date:
-            queryset = queryset.filter(start_time__date__gte=start_date)
+            filters['start_time__date__gte'] = start_date
         if end_date:
-            queryset = queryset.filter(start_time__date__lte=end_date)
+            filters['start_time__date__lte'] = end_date
         if role_id:
-            queryset = queryset.filter(job_category_id=role_id)
+            filters['job_category_id'] = role_id
+
+        hot, cold = entry_querysets(**filters)
 
         # Count sessions by tag
-        tag_counts = ActivityTag.objects.filter(
-            time_entries__in=queryset
-        ).annotate(
-            session_count=Count('time_entries')
-        ).values('id', 'name', 'color', 'session_count').order_by('-session_count')
+        tag_counts = {}
+        for relation, queryset in (('time_entries', hot), ('archived_time_entries', cold)):
+            counts = ActivityTag.objects.filter(
+                **{f'{relation}__in': queryset}
+            ).annotate(
+                session_count=Count(relation)
+            ).values('id', 'name', 'color', 'session_count')
+            for tag in counts:
+                if tag['id'] in tag_counts:
+                    tag_counts[tag['id']]['session_count'] += tag['session_count']
+                else:
+                    tag_counts[tag['id']] = tag
 
         # Also count sessions without tags
-        sessions_with_tags = queryset.filter(activity_tags__isnull=False).distinct().count()
-        total_sessions = queryset.count()
+        sessions_with_tags = sum(
+            queryset.filter(activity_tags__isnull=False).distinct().count() for queryset in (hot, cold)
+        )
+        total_sessions = hot.count() + cold.count()
         sessions_without_tags = total_sessions - sessions_with_tags
 
         return Response({
-            'tag_distribution': list(tag_counts),
+            'tag_distribution': sorted(tag_counts.values(), key=lambda tag: -tag['session_count']),
             'sessions_without_tags': sessions_without_tags,
             'total_sessions': total_sessions
         })
@@ -693,54 +906,90 @@ class InsightsPatternsView(APIView):
     def get(self, request):
         from django.db.models import Count
         from django.db.models.functions import ExtractHour, ExtractWeekDay
+        from .archive import entry_querysets
 
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
         role_id = request.query_params.get('role_id')
 
-        queryset = TimeEntry.objects.filter(end_time__isnull=False)
-
+        filters = {'end_time__isnull': False}
         if start_date:
-            queryset = queryset.filter(start_time__date__gte=start_date)
+            filters['start_time__date__gte'] = start_date
         if end_date:
-            queryset = queryset.filter(start_time__date__lte=end_date)
+            filters['start_time__date__lte'] = end_date
         if role_id:
-            queryset = queryset.filter(job_category_id=role_id)
-
-        # Hour distribution (0-23)
-        hour_distribution = queryset.annotate(
-            hour=ExtractHour('start_time')
-        ).values('hour').annotate(
-            count=Count('id')
-        ).order_by('hour')
-
-        # Day of week distribution (1=Sunday, 7=Saturday in Django)
-        day_distribution = queryset.annotate(
-            day=ExtractWeekDay('start_time')
-        ).values('day').annotate(
-            count=Count('id')
-        ).order_by('day')
+            filters['job_category_id'] = role_id
+
+        hour_counts = {}
+        day_counts = {}
+        for queryset in entry_querysets(**filters):
+            # Hour distribution (0-23)
+            hour_distribution = queryset.annotate(
+                hour=ExtractHour('start_time')
+            ).values('hour').annotate(
+                count=Count('id')
+            ).order_by()
+            for item in hour_distribution:
+                hour_counts[item['hour']] = hour_counts.get(item['hour'], 0) + item['count']
+
+            # Day of week distribution (1=Sunday, 7=Saturday in Django)
+            day_distribution = queryset.annotate(
+                day=ExtractWeekDay('start_time')
+            ).values('day').annotate(
+                count=Count('id')
+            ).order_by()
+            for item in day_distribution:
+                day_counts[item['day']] = day_counts.get(item['day'], 0) + item['count']
 
         # Map day numbers to names
         day_names = {1: 'Sunday', 2: 'Monday', 3: 'Tuesday', 4: 'Wednesday',
                      5: 'Thursday', 6: 'Friday', 7: 'Saturday'}
 
         day_data = [
-            {'day': day_names.get(item['day'], item['day']), 'day_number': item['day'], 'count': item['count']}
-            for item in day_distribution
+            {'day': day_names.get(day, day), 'day_number': day, 'count': count}
+            for day, count in sorted(day_counts.items())
         ]
 
         return Response({
-            'hour_distribution': list(hour_distribution),
+            'hour_distribution': [{'hour': hour, 'count': count} for hour, count in sorted(hour_counts.items())],
             'day_distribution': day_data
         })
 
 
+class TimesheetView(APIView):
+    """Daily and weekly totals with overtime, interruption time not double counted."""
+
+    def get(self, request):
+        from django.utils.dateparse import parse_date
+        from .timesheets import build
+
+        today = timezone.localdate()
+        try:
+            start_date = parse_date(request.query_params.get('start_date', '')) or today
+            end_date = parse_date(request.query_params.get('end_date', '')) or start_date
+            employee_ids = [
+                int(i) for i in request.query_params.get('employee', '').split(',') if i
+            ]
+        except ValueError:
+            return Response(
+                {'error': 'Invalid date or employee id'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if end_date < start_date:
+            return Response(
+                {'error': 'end_date must not be before start_date'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(build(start_date, end_date, employee_ids).to_dict())
+
+
 class TimeEntryPhotoViewSet(viewsets.ModelViewSet):
     """ViewSet for time entry photos."""
     queryset = TimeEntryPhoto.objects.all().select_related('time_entry')
     serializer_class = TimeEntryPhotoSerializer
-    parser_classes = [MultiPartParser, FormParser]
+    parser_classes = [TracedMultiPartParser, FormParser]
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -862,6 +1111,38 @@ def admin_add_employee(request):
     }, status=status.HTTP_201_CREATED)
 
 
+@api_view(['POST'])
+@require_admin_key
+def admin_import_employees(request):
+    """Bulk import employees from a JSON list or an uploaded CSV/JSON file."""
+    upload = request.FILES.get('file')
+    if upload:
+        fmt = request.data.get('format') or upload.name.rsplit('.', 1)[-1].lower()
+        try:
+            rows = parse_employee_file(upload.read().decode('utf-8'), fmt)
+        except (UnicodeDecodeError, ValueError) as e:
+            return Response(
+                {'error': f'Could not parse file: {e}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    else:
+        rows = request.data.get('employees')
+        if not isinstance(rows, list):
+            return Response(
+                {'error': 'Provide an "employees" list or a CSV/JSON "file"'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    result = import_employees(rows)
+
+    return Response({
+        'message': f"Created {result['created']} employees",
+        'created': result['created'],
+        'errors': result['errors'],
+        'employees': result['employees'],
+    }, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK)
+
+
 @api_view(['POST'])
 @require_admin_key
 def admin_set_pin(request, employee_id):
@@ -919,6 +1200,81 @@ def admin_delete_employee(request, employee_id):
     return Response({'message': f'Deleted employee: {full_name}'})
 
 
+@api_view(['GET'])
+@require_admin_key
+def admin_pin_throttle_stats(request):
+    """PIN throttle counters: attempts allowed/rejected vs hashing cost."""
+    return Response({'pin_throttle': get_pin_throttle_stats()})
+
+
+@api_view(['GET'])
+@require_admin_key
+def admin_slow_queries(request):
+    """Slow-query log aggregated by statement fingerprint, largest total time first."""
+    from django.conf import settings
+    from . import slowlog
+
+    try:
+        limit = int(request.query_params.get('limit', 50))
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    if limit < 0:
+        return Response({'error': 'limit must not be negative'}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'threshold_ms': settings.SLOW_QUERY_MS,
+        'statements': slowlog.summarize(limit=limit),
+    })
+
+
+@api_view(['GET'])
+@require_admin_key
+def admin_profiles(request):
+    """Stored ?profile=1 reports, newest first."""
+    from . import profiling
+
+    return Response({'profiles': profiling.list_reports()})
+
+
+@api_view(['GET'])
+@require_admin_key
+def admin_profile_detail(request, profile_id):
+    """One ?profile=1 report: wall/CPU split, SQL by statement, top functions."""
+    from django.http import HttpResponse
+    from . import profiling
+
+    path = profiling.report_path(profile_id)
+    if path is None:
+        return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+    return HttpResponse(path.read_bytes(), content_type='application/json')
+
+
+@api_view(['GET'])
+@require_admin_key
+def admin_profile_raw(request, profile_id):
+    """The report's cProfile data (load with pstats or snakeviz)."""
+    from django.http import FileResponse
+    from . import profiling
+
+    path = profiling.report_path(profile_id, '.prof')
+    if path is None:
+        return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+    return FileResponse(path.open('rb'), as_attachment=True, filename=path.name)
+
+
+@api_view(['GET'])
+@require_admin_key
+def metrics_view(request):
+    """Request/SQL metrics from every worker, in the Prometheus text format."""
+    from django.http import HttpResponse
+    from . import metrics
+
+    return HttpResponse(
+        metrics.render(metrics.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
 @api_view(['POST'])
 @require_admin_key
 def admin_seed_data(request):
@@ -952,21 +1308,9 @@ def admin_seed_data(request):
         except JobCodeCategory.DoesNotExist:
             pass
 
-    # Seed employees (optional)
-    for emp_data in data.get('employees', []):
-        emp, created = Employee.objects.get_or_create(
-            first_name=emp_data['first_name'],
-            last_name=emp_data['last_name'],
-            defaults={
-                'email': emp_data.get('email', ''),
-                'is_active': emp_data.get('is_active', True)
-            }
-        )
-        if created:
-            results['employees'] += 1
-            if emp_data.get('pin'):
-                emp.set_pin(str(emp_data['pin']))
-                emp.save()
+    # Seed employees (optional); existing employees are skipped
+    if data.get('employees'):
+        results['employees'] = import_employees(data['employees'])['created']
 
     return Response({
         'message': 'Data seeded successfully',
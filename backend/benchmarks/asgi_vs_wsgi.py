@@ -0,0 +1,204 @@
+"""
+Compare the polling endpoints under the WSGI and ASGI deployments.
+
+Starts `gunicorn config.wsgi` (the deployment, with gunicorn.conf.py) and
+`uvicorn config.asgi:application` (async views enabled) against the
+project database, then holds N concurrent keep-alive connections polling
+an endpoint for a fixed time. Reports throughput, latency, and the
+server's resident memory per open connection (process tree RSS from /proc,
+so Linux only).
+
+Usage (from backend/, after `python manage.py migrate`):
+    python benchmarks/asgi_vs_wsgi.py --connections 10,100,500 --duration 10
+    python benchmarks/asgi_vs_wsgi.py --path /api/v1/jobs/categories/ --workers 2
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def tree_rss(pid):
+    """Resident memory (bytes) of a process and all its descendants."""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            pass
+        stack.extend(children.get(current, []))
+    return total
+
+
+class Server:
+    def __init__(self, kind, workers):
+        self.kind = kind
+        self.port = free_port()
+        env = dict(os.environ, ALLOWED_HOSTS='127.0.0.1,localhost', DEBUG='False', GUNICORN_ACCESS_LOG='')
+        if kind == 'wsgi':
+            command = [
+                sys.executable, '-m', 'gunicorn', 'config.wsgi',
+                '--bind', f'127.0.0.1:{self.port}', '--workers', str(workers),
+                '--log-level', 'warning',
+            ]
+        else:
+            command = [
+                sys.executable, '-m', 'uvicorn', 'config.asgi:application',
+                '--host', '127.0.0.1', '--port', str(self.port), '--workers', str(workers),
+                '--log-level', 'warning', '--no-access-log',
+            ]
+        self.process = subprocess.Popen(command, cwd=BACKEND, env=env, start_new_session=True)
+
+    def wait_ready(self, path, timeout=30):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                with socket.create_connection(('127.0.0.1', self.port), timeout=1) as sock:
+                    sock.sendall(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'.encode())
+                    if sock.recv(16).startswith(b'HTTP/1.1 200'):
+                        return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f'{self.kind} server did not answer {path} with 200')
+
+    def rss(self):
+        return tree_rss(self.process.pid)
+
+    def stop(self):
+        os.killpg(self.process.pid, signal.SIGTERM)
+        try:
+            self.process.wait(10)
+        except subprocess.TimeoutExpired:
+            os.killpg(self.process.pid, signal.SIGKILL)
+
+
+async def poll(port, path, deadline, stats):
+    """One client: keep a connection open and issue requests back to back."""
+    request = f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode()
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                stats['connects'] += 1
+            started = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b'\r\n\r\n')
+            headers = head.decode('latin-1').lower()
+            if 'transfer-encoding: chunked' in headers:
+                while True:
+                    size = int(await reader.readuntil(b'\r\n'), 16)
+                    await reader.readexactly(size + 2)
+                    if not size:
+                        break
+            else:
+                length = int(headers.split('content-length:', 1)[1].split('\r\n', 1)[0])
+                await reader.readexactly(length)
+            stats['latencies'].append(time.perf_counter() - started)
+            if not headers.startswith('http/1.1 200'):
+                stats['errors'] += 1
+            if 'connection: close' in headers:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, IndexError, ValueError):
+            stats['errors'] += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.01)
+    if writer is not None:
+        writer.close()
+
+
+def run_load(server, path, connections, duration):
+    stats = {'latencies': [], 'errors': 0, 'connects': 0}
+    peak = [server.rss()]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.25):
+            peak[0] = max(peak[0], server.rss())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+
+    async def main():
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(poll(server.port, path, deadline, stats) for _ in range(connections)))
+
+    asyncio.run(main())
+    done.set()
+    sampler.join()
+    return stats, peak[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', default='/api/v1/sessions/active/')
+    parser.add_argument('--connections', default='10,100,500', help='Comma-separated concurrency levels')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per run')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes for both servers')
+    parser.add_argument('--servers', default='wsgi,asgi')
+    args = parser.parse_args()
+
+    levels = [int(n) for n in args.connections.split(',')]
+    print(f'{args.path}, {args.workers} worker(s), {args.duration:.0f}s per run')
+    print(f'{"server":<6} {"conns":>6} {"req/s":>9} {"p50 ms":>8} {"p99 ms":>8} '
+          f'{"errors":>7} {"reconnects":>10} {"RSS MiB":>8} {"KiB/conn":>9}')
+
+    for kind in args.servers.split(','):
+        server = Server(kind, args.workers)
+        try:
+            server.wait_ready(args.path)
+            # Warm up so lazy imports and caches are not counted as per-connection memory
+            run_load(server, args.path, min(levels), 1)
+            idle = server.rss()
+            for connections in levels:
+                stats, peak = run_load(server, args.path, connections, args.duration)
+                latencies = sorted(stats['latencies'])
+                count = len(latencies)
+                p50 = latencies[count // 2] * 1000 if count else float('nan')
+                p99 = latencies[min(count - 1, int(count * 0.99))] * 1000 if count else float('nan')
+                print(
+                    f'{kind:<6} {connections:>6} {count / args.duration:>9.0f} {p50:>8.1f} {p99:>8.1f} '
+                    f'{stats["errors"]:>7} {stats["connects"] - connections:>10} '
+                    f'{peak / 2**20:>8.1f} {max(0, peak - idle) / connections / 1024:>9.1f}'
+                )
+        finally:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Import-time and cold-start report for a web worker.
+
+Each run starts a fresh interpreter, loads config.wsgi the way gunicorn does
+and serves one request straight through the WSGI callable. The report shows
+the time to a loaded app and to the first response, worker RSS, which heavy
+optional modules got imported, and the slowest imports (from -X importtime).
+
+Usage (from backend/, after `python manage.py migrate`):
+    python benchmarks/cold_start.py
+    python benchmarks/cold_start.py --runs 10 --path /api/v1/jobs/categories/
+    python benchmarks/cold_start.py --max-first-response-ms 1500   # exit 1 on regression
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+# Only photo uploads, S3 storage and timesheets need these
+HEAVY_MODULES = ['PIL', 'pillow_heif', 'boto3', 'botocore', 'storages.backends.s3boto3', 'numpy']
+
+PROBE = """
+import json, os, sys, time
+started = time.perf_counter()
+from config.wsgi import application
+loaded = time.perf_counter()
+
+from wsgiref.util import setup_testing_defaults
+environ = {'PATH_INFO': sys.argv[1], 'HTTP_HOST': 'localhost'}
+setup_testing_defaults(environ)
+status = []
+body = b''.join(application(environ, lambda s, h, exc_info=None: status.append(s)))
+answered = time.perf_counter()
+
+rss = 0
+with open('/proc/self/status') as f:
+    for line in f:
+        if line.startswith('VmRSS:'):
+            rss = int(line.split()[1]) * 1024
+print(json.dumps({
+    'app_ms': (loaded - started) * 1000,
+    'first_response_ms': (answered - started) * 1000,
+    'status': status[0] if status else None,
+    'rss': rss,
+    'modules': sorted(m for m in json.loads(sys.argv[2]) if m in sys.modules),
+}))
+"""
+
+
+def probe(path, env):
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE, path, json.dumps(HEAVY_MODULES)],
+        cwd=BACKEND, env=env, capture_output=True, text=True, check=True,
+    )
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+    data['process_ms'] = (time.perf_counter() - started) * 1000
+    return data
+
+
+def import_times(env):
+    """(self_us, cumulative_us, module) for every import while loading the app."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import config.wsgi'],
+        cwd=BACKEND, env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', default='/api/v1/employees/', help='First request (default: the healthcheck)')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='Slowest imports to list')
+    parser.add_argument('--max-first-response-ms', type=float, help='Fail if the median exceeds this')
+    args = parser.parse_args()
+
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='config.settings', DEBUG='False',
+               ALLOWED_HOSTS='localhost', STALE_ENTRY_SWEEP_MINUTES='0')
+
+    runs = [probe(args.path, env) for _ in range(args.runs)]
+    status = {run['status'] for run in runs}
+
+    def median(key):
+        return statistics.median(run[key] for run in runs)
+
+    print(f'Cold start, {args.runs} runs, first request GET {args.path} -> {", ".join(sorted(status))}')
+    print(f'  interpreter + app + first response  {median("process_ms"):8.1f} ms')
+    print(f'  app loaded (import config.wsgi)      {median("app_ms"):8.1f} ms')
+    print(f'  first response                       {median("first_response_ms"):8.1f} ms')
+    print(f'  worker RSS                           {median("rss") / 2**20:8.1f} MiB')
+    print(f'  heavy modules loaded                 {", ".join(runs[0]["modules"]) or "none"}')
+
+    rows = import_times(env)
+    print(f'\nSlowest imports while loading config.wsgi (total {max(r[1] for r in rows) / 1000:.1f} ms)')
+    print(f'  {"self ms":>8} {"cumul ms":>9}  module')
+    for self_us, cumulative_us, name in sorted(rows, key=lambda r: r[0], reverse=True)[:args.top]:
+        print(f'  {self_us / 1000:>8.1f} {cumulative_us / 1000:>9.1f}  {name.strip()}')
+
+    if args.max_first_response_ms and median('first_response_ms') > args.max_first_response_ms:
+        print(f'\nFAIL: first response {median("first_response_ms"):.1f} ms > {args.max_first_response_ms:.1f} ms')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Microbenchmark the values()-based entry rows against TimeEntrySerializer.
+
+Times serializing a /time-entries/ page and an export-sized list three ways:
+the viewset's old path (serializer over select_related, tags fetched per
+row), the serializer with tags prefetched, and api.entry_rows.build_rows.
+Database time is included since it is part of what each path costs.
+
+Usage (from backend/):
+    python benchmarks/entry_rows.py
+    python benchmarks/entry_rows.py --entries 20000 --rows 50,500,5000
+"""
+import argparse
+import time
+
+from serialization import seed, setup_database  # also configures Django
+
+
+def best(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=5000)
+    parser.add_argument('--rows', default='50,2000', help='Comma-separated row counts')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from api.entry_rows import time_entry_rows
+    from api.models import TimeEntry
+    from api.serializers import TimeEntrySerializer
+
+    setup_database()
+    seed(args.entries)
+    base = TimeEntry.objects.select_related('employee', 'job_category', 'job_code')
+
+    paths = [
+        ('serializer', lambda rows: TimeEntrySerializer(base[:rows], many=True).data),
+        ('serializer+prefetch', lambda rows: TimeEntrySerializer(
+            base.select_related('job_code__category').prefetch_related('activity_tags__role')[:rows], many=True
+        ).data),
+        ('entry_rows', lambda rows: time_entry_rows(TimeEntry.objects.all()[:rows])),
+    ]
+
+    for rows in [int(n) for n in args.rows.split(',')]:
+        print(f'\n{rows} rows')
+        print(f'  {"path":<20} {"ms":>9} {"us/row":>8} {"queries":>8}')
+        baseline = None
+        for label, fn in paths:
+            connection.queries_log.clear()
+            with CaptureQueriesContext(connection) as queries:
+                fn(rows)
+            elapsed = best(lambda: fn(rows), args.repeat)
+            baseline = baseline or elapsed
+            print(f'  {label:<20} {elapsed * 1000:>9.2f} {elapsed / rows * 1e6:>8.1f} {len(queries):>8}'
+                  f'   x{baseline / elapsed:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Benchmark API renderers, parsers and response compression on real payloads.
+
+Builds a throwaway in-memory database with synthetic staff and entries, then
+produces the payloads the API actually returns (a /time-entries/ page, a
+large export-sized entry list, and the insights endpoints) and times:
+
+- rendering with DRF's JSONRenderer, ORJSONRenderer and MessagePackRenderer
+- parsing the result back with DRF's JSONParser, ORJSONParser and MessagePackParser
+- gzip/brotli compression of the JSON body (at the middleware's settings)
+
+Usage (from backend/):
+    python benchmarks/serialization.py
+    python benchmarks/serialization.py --entries 20000 --repeat 50
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+
+def setup_database():
+    """Create an in-memory test database for the benchmark run."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def seed(entries=5000, employees=40, seed=0):
+    """Synthetic staff, roles, tags and closed entries spread over the last 90 days."""
+    from django.utils import timezone
+    from api.models import ActivityTag, Employee, JobCode, JobCodeCategory, TimeEntry
+
+    rng = random.Random(seed)
+    staff = Employee.objects.bulk_create(
+        Employee(first_name=f'First{i}', last_name=f'Last{i}') for i in range(employees)
+    )
+    categories = JobCodeCategory.objects.bulk_create(
+        JobCodeCategory(name=name, alias=str(i)) for i, name in enumerate(['Kitchen', 'WRP', 'Front Desk', 'Studio'])
+    )
+    codes = JobCode.objects.bulk_create(
+        JobCode(category=category, name=f'{category.name} job {i}', alias=f'{category.alias}{i}')
+        for category in categories for i in range(5)
+    )
+    tags = ActivityTag.objects.bulk_create(
+        ActivityTag(name=f'Tag {i}', role=categories[i % 4] if i % 3 else None) for i in range(12)
+    )
+
+    now = timezone.now()
+    rows = []
+    for _ in range(entries):
+        code = rng.choice(codes)
+        start = now - timedelta(days=rng.uniform(1, 90))
+        rows.append(TimeEntry(
+            employee=rng.choice(staff), job_category=code.category, job_code=code,
+            start_time=start, end_time=start + timedelta(hours=rng.uniform(1, 8)),
+            description=rng.choice(['', 'Prep for Saturday brunch', 'Inventory and restock']),
+        ))
+    created = TimeEntry.objects.bulk_create(rows, batch_size=1000)
+
+    Through = TimeEntry.activity_tags.through
+    Through.objects.bulk_create(
+        [Through(timeentry_id=entry.id, activitytag_id=tag.id)
+         for entry in created for tag in rng.sample(tags, rng.randint(0, 3))],
+        batch_size=2000,
+    )
+    return created
+
+
+def payloads(export_rows):
+    """(name, data) pairs as the API views produce them."""
+    from rest_framework.test import APIClient
+    from api.models import TimeEntry
+    from api.serializers import TimeEntrySerializer
+
+    client = APIClient()
+    page = client.get('/api/v1/time-entries/').data
+    queryset = TimeEntry.objects.select_related('employee', 'job_category', 'job_code__category') \
+        .prefetch_related('activity_tags__role')[:export_rows]
+    export = TimeEntrySerializer(queryset, many=True).data
+
+    return [
+        ('time-entries page (50)', page),
+        (f'entry export ({export_rows})', export),
+        ('insights/role-hours', client.get('/api/v1/insights/role-hours/').data),
+        ('insights/patterns', client.get('/api/v1/insights/patterns/').data),
+    ]
+
+
+def best(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=5000)
+    parser.add_argument('--export-rows', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from api.compression import brotli, compress
+    from api.renderers import MessagePackParser, MessagePackRenderer, ORJSONParser, ORJSONRenderer
+
+    setup_database()
+    seed(args.entries)
+
+    formats = [
+        ('drf json', JSONRenderer(), JSONParser()),
+        ('orjson', ORJSONRenderer(), ORJSONParser()),
+        ('msgpack', MessagePackRenderer(), MessagePackParser()),
+    ]
+
+    for name, data in payloads(args.export_rows):
+        print(f'\n{name}')
+        print(f'  {"format":<10} {"render ms":>10} {"parse ms":>9} {"bytes":>10}')
+        baseline = None
+        json_body = None
+        for label, renderer, body_parser in formats:
+            body = renderer.render(data)
+            render = best(lambda: renderer.render(data), args.repeat)
+            parse = best(lambda: body_parser.parse(io.BytesIO(body)), args.repeat)
+            baseline = baseline or render
+            json_body = json_body or body
+            print(f'  {label:<10} {render * 1000:>10.2f} {parse * 1000:>9.2f} {len(body):>10,}'
+                  f'   x{baseline / render:.1f} render')
+
+        encodings = ['gzip'] + (['br'] if brotli is not None else [])
+        for encoding in encodings:
+            compressed = compress(json_body, encoding)
+            elapsed = best(lambda: compress(json_body, encoding), max(3, args.repeat // 4))
+            print(f'  {"json+" + encoding:<10} {elapsed * 1000:>10.2f} {"":>9} {len(compressed):>10,}'
+                  f'   {len(json_body) / len(compressed):.1f}x smaller')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark the vectorized timesheet engine on synthetic data.
+
+Usage (from backend/):
+    python benchmarks/timesheet_engine.py --employees 2000 --days 90
+"""
+import argparse
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api.timesheets import compute  # noqa: E402
+
+TZ = 'America/New_York'
+
+
+def synthesize(employees, days, start_date, seed=0):
+    """Two shifts per employee per day; 10% of shifts get an interruption."""
+    rng = np.random.default_rng(seed)
+    origin = datetime.combine(start_date, datetime.min.time(), tzinfo=ZoneInfo(TZ)).timestamp()
+
+    n = employees * days * 2
+    employee = np.repeat(np.arange(employees), days * 2)
+    day = np.tile(np.repeat(np.arange(days), 2), employees)
+    shift = np.tile([0, 1], employees * days)
+
+    start = origin + day * 86400 + (7 + shift * 6) * 3600 + rng.integers(0, 3600, n)
+    end = start + rng.integers(3, 7, n) * 3600
+    parent = np.full(n, -1)
+
+    interrupted = np.flatnonzero(rng.random(n) < 0.1)
+    i_start = start[interrupted] + 1800
+    i_end = i_start + rng.integers(600, 3600, len(interrupted))
+
+    return (
+        np.concatenate([employee, employee[interrupted]]),
+        np.concatenate([start, i_start]),
+        np.concatenate([end, i_end]),
+        np.concatenate([parent, interrupted]),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--employees', type=int, default=2000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    start_date = date(2026, 1, 5)
+    end_date = start_date + timedelta(days=args.days - 1)
+    arrays = synthesize(args.employees, args.days, start_date)
+    print(f"{args.employees} employees x {args.days} days = {len(arrays[0]):,} entries")
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        sheet = compute(*arrays, start_date, end_date, tz_name=TZ)
+        timings.append(time.perf_counter() - started)
+
+    print(f"compute: best {min(timings) * 1000:.1f} ms, median {sorted(timings)[len(timings) // 2] * 1000:.1f} ms")
+    print(f"total hours: {sheet.weekly_seconds.sum() / 3600:,.0f}, "
+          f"overtime hours: {sheet.overtime_seconds.sum() / 3600:,.0f}")
+
+
+if __name__ == '__main__':
+    main()
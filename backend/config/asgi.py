@@ -8,9 +8,20 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
+import sys
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Polling endpoints are served by async views under ASGI
+os.environ.setdefault('ASYNC_READ_VIEWS', 'True')
 
 application = get_asgi_application()
+
+# Periodic stale-entry sweep (no-op unless STALE_ENTRY_SWEEP_MINUTES is set).
+# uvicorn imports this module in each spawned worker; under gunicorn the
+# post_worker_init hook in gunicorn.conf.py starts it instead.
+if 'gunicorn' not in sys.modules:
+    from api.sweeper import start_scheduler
+
+    start_scheduler()
@@ -0,0 +1,102 @@
+"""
+Serving the React app shell (index.html) for client-side routes.
+
+The shell is read once per process and kept in memory with gzip and brotli
+variants and a strong ETag per variant. A stat() per request reloads it
+after a new build. The shell is served with `no-cache`, so browsers
+revalidate it every time and get a 304 when it is unchanged. The hashed
+bundles it references are immutable and cached for a year by WhiteNoise
+(see WHITENOISE_IMMUTABLE_FILE_TEST in settings).
+"""
+import gzip
+import hashlib
+import os
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from api.compression import brotli, choose_encoding
+
+SHELL_CACHE_CONTROL = 'no-cache'
+
+
+class Shell:
+    """One build of index.html with its precompressed variants."""
+
+    def __init__(self, path, stamp):
+        with open(path, 'rb') as f:
+            content = f.read()
+
+        self.stamp = stamp
+        self.last_modified = http_date(stamp[0] / 1e9)
+        digest = hashlib.sha256(content).hexdigest()[:32]
+
+        # encoding -> (body, etag); each representation needs its own strong ETag
+        self.variants = {'identity': (content, f'"{digest}"')}
+        self.variants['gzip'] = (gzip.compress(content, 9, mtime=0), f'"{digest}-gz"')
+        if brotli is not None:
+            self.variants['br'] = (brotli.compress(content, quality=11), f'"{digest}-br"')
+
+    def negotiate(self, accept_encoding):
+        """Pick the smallest variant the client accepts."""
+        available = tuple(encoding for encoding in ('br', 'gzip') if encoding in self.variants)
+        return choose_encoding(accept_encoding, available) or 'identity'
+
+
+_lock = threading.Lock()
+_shell = None
+
+
+def get_shell():
+    """The current shell, reloaded if index.html changed on disk; None if it is missing."""
+    global _shell
+    path = settings.FRONTEND_INDEX_PATH
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+
+    stamp = (st.st_mtime_ns, st.st_size)
+    shell = _shell
+    if shell is not None and shell.stamp == stamp:
+        return shell
+
+    with _lock:
+        if _shell is None or _shell.stamp != stamp:
+            _shell = Shell(path, stamp)
+        return _shell
+
+
+def _matches(if_none_match, etag):
+    if if_none_match.strip() == '*':
+        return True
+    # Weak comparison, as If-None-Match requires
+    return any(tag.strip().removeprefix('W/') == etag for tag in if_none_match.split(','))
+
+
+@require_safe
+def serve_frontend(request):
+    """Serve the React frontend index.html for all non-API routes."""
+    shell = get_shell()
+    if shell is None:
+        return HttpResponse('Frontend not built. Run: cd frontend && npm run build', status=404)
+
+    encoding = shell.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    body, etag = shell.variants[encoding]
+
+    if _matches(request.META.get('HTTP_IF_NONE_MATCH', ''), etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='text/html; charset=utf-8')
+        response['Content-Length'] = len(body)
+        if encoding != 'identity':
+            response['Content-Encoding'] = encoding
+
+    response['ETag'] = etag
+    response['Last-Modified'] = shell.last_modified
+    response['Cache-Control'] = SHELL_CACHE_CONTROL
+    response['Vary'] = 'Accept-Encoding'
+    return response
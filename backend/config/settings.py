@@ -3,7 +3,12 @@ Django settings for config project.
 """
 
 from pathlib import Path
+import atexit
 import os
+import shutil
+import sys
+import tempfile
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -44,11 +49,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.tracing.TracingMiddleware',
+    'api.metrics.MetricsMiddleware',
+    'api.profiling.ProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'api.compression.CompressionMiddleware',
+    'api.middleware.AsyncWhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'api.db_router.ReplicaRoutingMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -73,14 +83,48 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
+
+# Serve the polling endpoints from async views (api/async_views.py); config/asgi.py turns this on
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS', 'False').lower() == 'true'
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # atomic() blocks take the write lock up front, so a block that reads before
+            # writing waits out the busy timeout behind another writer instead of failing
+            # with "database is locked" when it upgrades its read lock
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Optional read replica for reporting endpoints (see api/db_router.py).
+# Locally this is a SQLite snapshot kept fresh by `manage.py refresh_replica --every 30`.
+REPLICA_DB_ALIAS = None
+if os.environ.get('REPLICA_DATABASE_PATH'):
+    REPLICA_DB_ALIAS = 'replica'
+    DATABASES[REPLICA_DB_ALIAS] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['REPLICA_DATABASE_PATH'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['api.db_router.ReplicaRouter']
+
+# Read-only requests (regexes on the path) served from the replica
+REPLICA_READ_PATHS = [
+    r'^/api/v1/insights/',
+    r'^/api/v1/timesheets/',
+    r'^/api/v1/time-entries/overlaps/',
+    r'^/api/v1/search/',
+    r'^/admin/api/\w+/$',
+]
+# After a write, the client reads from the primary for this long
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', '60'))
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -121,7 +165,7 @@ if USE_S3_STORAGE:
     # Use S3 for media files
     STORAGES = {
         "default": {
-            "BACKEND": "storages.backends.s3boto3.S3Boto3Storage",
+            "BACKEND": "api.storage.TracedS3Storage",
             "OPTIONS": {
                 "location": AWS_LOCATION,
             },
@@ -135,15 +179,98 @@ else:
     # Local storage for development
     MEDIA_URL = 'media/'
     MEDIA_ROOT = BASE_DIR / 'media'
+    STORAGES = {
+        "default": {
+            "BACKEND": "api.storage.TracedFileSystemStorage",
+        },
+        "staticfiles": {
+            "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+        },
+    }
 
 # Frontend build directory (served by whitenoise in production)
 WHITENOISE_ROOT = BASE_DIR / 'staticfiles' / 'frontend'
+# App shell served for client-side routes (config/frontend.py)
+FRONTEND_INDEX_PATH = WHITENOISE_ROOT / 'index.html'
+# Vite's content-hashed bundles (assets/index-B3x9kZ1a.js) and Django's manifest
+# names never change, so browsers may cache them for a year without revalidating
+WHITENOISE_IMMUTABLE_FILE_TEST = r'^/?(?:assets/.+-[\w-]{8}|static/.+\.[0-9a-f]{12})\.\w+$'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Directory for caches every worker on the host shares. `manage.py test` gets a
+# throwaway one so the suite never touches the dev or production cache.
+if len(sys.argv) > 1 and sys.argv[1] == 'test':
+    SHARED_CACHE_DIR = tempfile.mkdtemp(prefix='bridgetime-test-cache-')
+    atexit.register(shutil.rmtree, SHARED_CACHE_DIR, True)
+else:
+    SHARED_CACHE_DIR = os.environ.get('SHARED_CACHE_DIR', str(BASE_DIR / '.cache'))
+
+# Caches
+# 'local' is per-process and holds hot, cheap-to-rebuild state (throttle buckets)
+# 'shared' is visible to every worker on the host (version stamps)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bridgetime-default',
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bridgetime-local',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': SHARED_CACHE_DIR,
+    },
+    # PIN attempt buckets (api/throttling.py), one set for all workers
+    'pin_throttle': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(SHARED_CACHE_DIR, 'pin_throttle'),
+        # Culling would refill buckets early
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+# Reference data (employees, jobs, tags) is cached per worker, keyed by a stamp in this cache
+REFDATA_VERSION_CACHE = 'shared'
+
+# Request/SQL metrics (api/metrics.py): each process writes a snapshot here, GET /metrics sums them
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(CACHES['shared']['LOCATION'], 'metrics'))
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', '5'))
+
+# Slow-query log (api/slowlog.py): statements slower than this many ms (0 = off), rotating JSON-lines file
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '100'))
+SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG', str(BASE_DIR / 'logs' / 'slow_queries.log'))
+SLOW_QUERY_LOG_BYTES = int(os.environ.get('SLOW_QUERY_LOG_BYTES', str(5 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.environ.get('SLOW_QUERY_LOG_BACKUPS', '3'))
+
+# ?profile=1 with the admin key (api/profiling.py): reports kept here, newest PROFILE_KEEP
+PROFILE_DIR = os.environ.get('PROFILE_DIR', str(BASE_DIR / 'logs' / 'profiles'))
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', '50'))
+PROFILE_TOP_FUNCTIONS = int(os.environ.get('PROFILE_TOP_FUNCTIONS', '40'))
+
+# Request tracing (api/tracing.py): sampled traces appended to TRACE_FILE as OTLP/JSON lines
+TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'False').lower() == 'true'
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', '1.0'))
+TRACE_SERVICE_NAME = os.environ.get('TRACE_SERVICE_NAME', 'bridgetime-api')
+TRACE_FILE = os.environ.get('TRACE_FILE', str(BASE_DIR / 'logs' / 'traces.jsonl'))
+TRACE_FILE_BYTES = int(os.environ.get('TRACE_FILE_BYTES', str(20 * 1024 * 1024)))
+TRACE_FILE_BACKUPS = int(os.environ.get('TRACE_FILE_BACKUPS', '3'))
+
+# PIN throttling (token buckets checked before any PIN hashing). The cache must be
+# shared by the workers, or every worker would allow a full burst of its own.
+PIN_THROTTLE_CACHE = 'pin_throttle'
+PIN_THROTTLE_EMPLOYEE_BURST = int(os.environ.get('PIN_THROTTLE_EMPLOYEE_BURST', '5'))
+PIN_THROTTLE_EMPLOYEE_PER_MINUTE = float(os.environ.get('PIN_THROTTLE_EMPLOYEE_PER_MINUTE', '5'))
+PIN_THROTTLE_CLIENT_BURST = int(os.environ.get('PIN_THROTTLE_CLIENT_BURST', '20'))
+PIN_THROTTLE_CLIENT_PER_MINUTE = float(os.environ.get('PIN_THROTTLE_CLIENT_PER_MINUTE', '30'))
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = os.environ.get('CORS_ALLOWED_ORIGINS', 'http://localhost:5173,http://127.0.0.1:5173').split(',')
 CORS_ALLOW_ALL_ORIGINS = os.environ.get('CORS_ALLOW_ALL', 'False').lower() == 'true'
+# Kiosks identify themselves for the session endpoints (api/views.py request_device)
+CORS_ALLOW_HEADERS = (*default_headers, 'x-device-key')
 
 # REST Framework settings
 REST_FRAMEWORK = {
@@ -152,8 +279,51 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 50,
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'api.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.ORJSONParser',
+        'api.renderers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# API responses at least this large are gzip/brotli compressed (api/compression.py)
+API_COMPRESSION_PATH_PREFIX = '/api/'
+API_COMPRESSION_MIN_BYTES = int(os.environ.get('API_COMPRESSION_MIN_BYTES', '1024'))
+
+# Timesheets / overtime
+TIMESHEET_WEEK_START = int(os.environ.get('TIMESHEET_WEEK_START', '0'))  # 0=Monday
+OVERTIME_WEEKLY_HOURS = float(os.environ.get('OVERTIME_WEEKLY_HOURS', '40'))
+OVERTIME_DAILY_HOURS = float(os.environ['OVERTIME_DAILY_HOURS']) if os.environ.get('OVERTIME_DAILY_HOURS') else None
+
+# Stale entry sweeper: entries open longer than this are closed and flagged for review
+STALE_ENTRY_HOURS = int(os.environ.get('STALE_ENTRY_HOURS', '16'))
+# Run the sweeper inside each web worker every N minutes (0 = only via close_stale_entries)
+STALE_ENTRY_SWEEP_MINUTES = int(os.environ.get('STALE_ENTRY_SWEEP_MINUTES', '0'))
+
+# Closed entries older than this move to the archive tables (archive_entries command)
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '120'))
+
+# /changes/ delta feed page size (default, and the most a client may ask for with ?limit=)
+CHANGES_FEED_LIMIT = 500
+CHANGES_FEED_MAX_LIMIT = 5000
+
+# /search/ results (default, and the most a client may ask for with ?limit=), and words per snippet
+SEARCH_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+SEARCH_SNIPPET_WORDS = 12
+# Free-text matches ranked per search: the newest this many (see api/search.py)
+SEARCH_CANDIDATES = int(os.environ.get('SEARCH_CANDIDATES', '200'))
+
+# /typeahead/ results (default, and the most a client may ask for with ?limit=)
+TYPEAHEAD_LIMIT = 10
+TYPEAHEAD_MAX_LIMIT = 50
+
 # Gusto API settings
 GUSTO_CLIENT_ID = os.environ.get('GUSTO_CLIENT_ID', '')
 GUSTO_CLIENT_SECRET = os.environ.get('GUSTO_CLIENT_SECRET', '')
@@ -1,22 +1,17 @@
 from django.contrib import admin
 from django.urls import path, include, re_path
-from django.views.generic import TemplateView
 from django.conf import settings
 from django.conf.urls.static import static
-from django.http import HttpResponse
-import os
 
-def serve_frontend(request):
-    """Serve the React frontend index.html for all non-API routes."""
-    index_path = settings.BASE_DIR / 'staticfiles' / 'frontend' / 'index.html'
-    if index_path.exists():
-        with open(index_path, 'r') as f:
-            return HttpResponse(f.read(), content_type='text/html')
-    return HttpResponse('Frontend not built. Run: cd frontend && npm run build', status=404)
+from api.views import metrics_view
+
+from .frontend import serve_frontend
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1/', include('api.urls')),
+    # Prometheus scrape target (Bearer ADMIN_API_KEY)
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 # Serve media files in development
@@ -0,0 +1,66 @@
+"""
+Gunicorn configuration (loaded automatically from the working directory).
+
+    gunicorn config.wsgi
+
+Workers and threads are sized from the CPUs actually available to the
+container; WEB_CONCURRENCY and GUNICORN_THREADS override them. The app is
+preloaded in the master so workers share its memory copy-on-write, and
+workers are recycled after a jittered number of requests so slow leaks never
+accumulate. Migrations run on boot, before gunicorn starts (Dockerfile CMD
+and Procfile), while the database is SQLite on the service's volume.
+"""
+import os
+
+
+def available_cpus():
+    """CPUs usable by this process, honouring affinity and a cgroup v2 quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+cpus = available_cpus()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Requests are short and mostly wait on SQLite or storage, so a few threads
+# per worker overlap that wait; processes scale the Python work across cores.
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', cpus * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True').lower() == 'true'
+
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    # Never share a database connection opened while preloading
+    from django.db import connections
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    # Periodic stale-entry sweep, started after the fork so the master never
+    # runs the thread; one worker per host wins the leader lock
+    from api.sweeper import start_scheduler
+    start_scheduler()
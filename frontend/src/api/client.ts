@@ -19,6 +19,7 @@ import type {
   SessionTagUpdateRequest,
   SessionSwitchResponse,
   ActiveSessionResponse,
+  ChangesResponse,
   InsightsRoleHoursResponse,
   InsightsTagDistributionResponse,
   InsightsPatternsResponse,
@@ -39,6 +40,28 @@ const api = axios.create({
   },
 });
 
+// Kiosks registered in the admin send their device key, so the session
+// endpoints only see that kiosk's sessions. Set per kiosk, or at build time.
+const DEVICE_KEY_STORAGE = 'bridgetime-device-key';
+
+export function getDeviceKey(): string | null {
+  return localStorage.getItem(DEVICE_KEY_STORAGE) ?? import.meta.env.VITE_DEVICE_KEY ?? null;
+}
+
+export function setDeviceKey(key: string | null): void {
+  if (key) {
+    localStorage.setItem(DEVICE_KEY_STORAGE, key);
+  } else {
+    localStorage.removeItem(DEVICE_KEY_STORAGE);
+  }
+}
+
+api.interceptors.request.use((config) => {
+  const key = getDeviceKey();
+  if (key) config.headers.set('X-Device-Key', key);
+  return config;
+});
+
 // Employees
 export async function getEmployees(): Promise<Employee[]> {
   const response = await api.get<PaginatedResponse<Employee>>('/employees/');
@@ -147,6 +170,15 @@ export async function getActiveSession(): Promise<TimeEntryDetail | null> {
   return response.data.active_session;
 }
 
+// Delta sync: pass back the returned cursor; ask again while has_more is true
+export async function getChanges(since: number, limit?: number): Promise<ChangesResponse> {
+  const params = new URLSearchParams({ since: String(since) });
+  if (limit) params.append('limit', String(limit));
+
+  const response = await api.get<ChangesResponse>(`/changes/?${params.toString()}`);
+  return response.data;
+}
+
 // Insights API
 export interface InsightsFilters {
   start_date?: string;
@@ -1,16 +1,21 @@
 import { useState } from 'react';
 import { RoleSelect, type RoleSelection } from './RoleSelect';
 import { ActiveSession } from './ActiveSession';
+import { EmployeeSelect } from './EmployeeSelect';
 import {
   useActiveSession,
   useSessionStart,
   useSessionStop,
   useSessionSwitch,
 } from '../hooks/useApi';
+import type { Employee } from '../types';
+
+const PERFORMER_KEY = 'bridgetime-performer-id';
 
 export function SessionTracker() {
-  const [performerName, setPerformerName] = useState(() => {
-    return localStorage.getItem('bridgetime-performer-name') ?? '';
+  const [performerId, setPerformerId] = useState<number | null>(() => {
+    const stored = localStorage.getItem(PERFORMER_KEY);
+    return stored ? Number(stored) : null;
   });
   const [showNameInput, setShowNameInput] = useState(false);
 
@@ -24,24 +29,25 @@ export function SessionTracker() {
     sessionStart.isPending || sessionStop.isPending || sessionSwitch.isPending;
 
   const handleRoleSelect = async (selection: RoleSelection) => {
-    // Save performer name
-    if (performerName) {
-      localStorage.setItem('bridgetime-performer-name', performerName);
+    // Sessions are recorded against an employee
+    if (performerId === null) {
+      setShowNameInput(true);
+      return;
     }
 
     if (activeSession) {
       // Switch to new role
       await sessionSwitch.mutateAsync({
+        employee_id: performerId,
         role_id: selection.role.id,
         job_code_id: selection.jobCode?.id,
-        performer_name: performerName,
       });
     } else {
       // Start new session
       await sessionStart.mutateAsync({
+        employee_id: performerId,
         role_id: selection.role.id,
         job_code_id: selection.jobCode?.id,
-        performer_name: performerName,
       });
     }
   };
@@ -50,12 +56,12 @@ export function SessionTracker() {
     await sessionStop.mutateAsync({});
   };
 
-  const handleNameChange = (name: string) => {
-    setPerformerName(name);
-    if (name) {
-      localStorage.setItem('bridgetime-performer-name', name);
+  const handlePerformerChange = (employee: Employee | null) => {
+    setPerformerId(employee?.id ?? null);
+    if (employee) {
+      localStorage.setItem(PERFORMER_KEY, String(employee.id));
     } else {
-      localStorage.removeItem('bridgetime-performer-name');
+      localStorage.removeItem(PERFORMER_KEY);
     }
   };
 
@@ -85,14 +91,7 @@ export function SessionTracker() {
 
         {showNameInput && (
           <div className="name-input-section">
-            <label htmlFor="performer-name">Your name (optional):</label>
-            <input
-              id="performer-name"
-              type="text"
-              value={performerName}
-              onChange={(e) => handleNameChange(e.target.value)}
-              placeholder="Who's working?"
-            />
+            <EmployeeSelect value={performerId} onChange={handlePerformerChange} />
           </div>
         )}
 
@@ -132,14 +131,7 @@ export function SessionTracker() {
 
       {showNameInput && (
         <div className="name-input-section">
-          <label htmlFor="performer-name">Your name (optional):</label>
-          <input
-            id="performer-name"
-            type="text"
-            value={performerName}
-            onChange={(e) => handleNameChange(e.target.value)}
-            placeholder="Who's working?"
-          />
+          <EmployeeSelect value={performerId} onChange={handlePerformerChange} />
         </div>
       )}
 
@@ -54,6 +54,7 @@ export interface TimeEntry {
   interrupted_entry: number | null;
   is_paused: boolean;
   interruption_reason: string;
+  needs_review: boolean;
   created_at: string;
   updated_at: string;
 }
@@ -119,10 +120,11 @@ export interface InterruptedStopResponse {
 }
 
 // New session-based API types
+// Sessions belong to the kiosk sending X-Device-Key (see api/client.ts)
 export interface SessionStartRequest {
+  employee_id: number;
   role_id: number;
   job_code_id?: number;
-  performer_name?: string;
   activity_tag_ids?: number[];
 }
 
@@ -131,9 +133,9 @@ export interface SessionStopRequest {
 }
 
 export interface SessionSwitchRequest {
+  employee_id: number;
   role_id: number;
   job_code_id?: number;
-  performer_name?: string;
 }
 
 export interface SessionTagUpdateRequest {
@@ -149,6 +151,23 @@ export interface ActiveSessionResponse {
   active_session: TimeEntryDetail | null;
 }
 
+// Delta sync feed (/changes/)
+export type ChangeModel = 'employee' | 'job_code' | 'activity_tag' | 'time_entry' | 'time_entry_photo';
+
+export type Change =
+  | { model: 'employee'; id: number; deleted: false; data: Employee }
+  | { model: 'job_code'; id: number; deleted: false; data: JobCode & { category: number } }
+  | { model: 'activity_tag'; id: number; deleted: false; data: ActivityTag }
+  | { model: 'time_entry'; id: number; deleted: false; data: TimeEntry }
+  | { model: 'time_entry_photo'; id: number; deleted: false; data: TimeEntryPhoto }
+  | { model: ChangeModel; id: number; deleted: true; data: null };
+
+export interface ChangesResponse {
+  cursor: number;
+  has_more: boolean;
+  changes: Change[];
+}
+
 // Insights types
 export interface RoleHoursData {
   role_id: number;